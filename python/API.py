@@ -1,23 +1,76 @@
+import json
 import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
 
 import flask as f
-from datetime import datetime as dt
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 
-from vars import BASE_PATH, MODE, PORT
+from vars import (BASE_PATH, MODE, PORT, UPLOAD_DIR, UPLOAD_MAX_MB, UPLOAD_JSON_MODE, DB_AUTO_MIGRATE, LOG_FORMAT,
+                  METRICS_TOKEN, NDJSON_MAX_MB)
 from auth import get_auth
-from db_functions import fetch_data, execute_query, save_match
+from db_functions import fetch_data, execute_query, save_match, validate_match_data, known_duplicate
+from analytics import parse_filters, parse_date_range, report_page
+from extractData import extract_data, extract_round
+from rawArchive import encode_document
+from bulkExport import FORMATS, check_export, export_stream
 from initializeDatabase import initialize_db
+from playerCareer import CAREER_COLUMNS
+from playerIdentity import cached_players, PLAYER_IDENTITY_VERSION
+from jobs import submit_upload, submit_round_upload, get_job
+from roundIngest import save_round
+from batchWriter import get_writer
+from ndjsonIngest import ingest_ndjson, decompressor, UnsupportedEncoding
+from metrics import REQUEST_DURATION, AUTH_DURATION, render_metrics
+from logFormat import configure_logging
 
-print("Starting R6 Replay Analyzer API")
+request_log = logging.getLogger("r6.request")
+
+logging.info("Starting R6 Replay Analyzer API")
+
+class StreamingUploadRequest(f.Request):
+    """Schreibt hochgeladene Dateien beim Parsen des Multipart-Bodys direkt in einen
+    Upload-Ordner pro Request, statt sie im Speicher zu puffern."""
+    upload_dir = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.upload_dir is None:
+            os.makedirs(UPLOAD_DIR, exist_ok=True)
+            self.upload_dir = Path(tempfile.mkdtemp(dir=UPLOAD_DIR))
+        name = Path(filename or "upload").name
+        path = self.upload_dir / name
+        counter = 1
+        while path.exists():
+            path = self.upload_dir / f"{Path(name).stem}_{counter}{Path(name).suffix}"
+            counter += 1
+        return open(path, "wb+")
 
 app = f.Flask(__name__)
+app.request_class = StreamingUploadRequest
+app.config["MAX_CONTENT_LENGTH"] = int(UPLOAD_MAX_MB * 1024 * 1024)
 
 CORS(app) # Script muss nicht auf demselben Server laufen wie API
 
+if DB_AUTO_MIGRATE:
+    # Schema beim Start aktualisieren; /initialize bleibt für manuelle Läufe erhalten
+    try:
+        initialize_db()
+    except Exception as e:
+        logging.error(f"Schema migration on startup failed: {e}")
+
+@app.before_request
+def start_timer():
+    f.g.request_start = time.perf_counter()
+
 @app.before_request
 def authenticate():
-    print(f"Authenticating request to {f.request.path} at {dt.now().isoformat()}")
+    if f.request.path == f"{BASE_PATH}/metrics":
+        # Prometheus hat kein JWT, /metrics prüft METRICS_TOKEN selbst
+        return
 
     if MODE == 'development':
         f.g.user = {'name': 'Elperdano', 'isAdmin': True, 'teamID': 6}
@@ -27,16 +80,55 @@ def authenticate():
     if not token:
         f.abort(401, description="Unauthorized: No token provided")
         
-    user = get_auth(token)
+    with AUTH_DURATION.time():
+        user = get_auth(token)
     if not user:
         f.abort(401, description="Unauthorized: Invalid token")
 
     f.g.user = user
 
+@app.after_request
+def log_request(response: f.Response) -> f.Response:
+    # Erst messen, wenn der Body gesendet ist: bei gestreamten Antworten (/upload_ndjson,
+    # /export) läuft die eigentliche Arbeit im Generator nach diesem Hook
+    start = f.g.get("request_start", time.perf_counter())
+    method, path = f.request.method, f.request.path
+    endpoint = f.request.url_rule.rule if f.request.url_rule else "unmatched"
+    team_id = (f.g.get("user") or {}).get("teamID")
+
+    def observe():
+        duration = time.perf_counter() - start
+        REQUEST_DURATION.observe(duration, method=method, endpoint=endpoint, status=response.status_code)
+        request_log.info("request", extra={"method": method,
+                                           "path": path,
+                                           "status": response.status_code,
+                                           "duration_ms": round(duration * 1000, 2),
+                                           "team_id": team_id})
+
+    response.call_on_close(observe)
+    return response
+
+@app.teardown_request
+def remove_unused_upload(exception=None):
+    # Abgebrochene oder ungültige Uploads nicht auf der Platte liegen lassen
+    upload_dir = getattr(f.request, "upload_dir", None)
+    if upload_dir is not None:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
 @app.route(f'{BASE_PATH}/', methods=['GET'])
 def heartbeat():
     return "Authenticated", 200
 
+@app.route(f'{BASE_PATH}/metrics', methods=['GET'])
+def metrics() -> f.Response:
+    """
+    Laufzeit-Metriken (Histogramme pro Request, Auth, Extraktionsschritt, Schreib-Region
+    und Pool-Wartezeit) im Prometheus-Textformat.
+    """
+    if METRICS_TOKEN and f.request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        f.abort(401, description="Unauthorized")
+    return f.Response(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.route(f'{BASE_PATH}/initialize', methods=['POST'])
 def initialize():
     message, status_code = initialize_db()
@@ -44,45 +136,277 @@ def initialize():
 
 @app.route(f'{BASE_PATH}/upload', methods=['POST'])
 def upload_replays():
-    # TODO: implement
-    return "Not implemented", 501
+    """
+    Nimmt die .rec Dateien eines Matches als Multipart-Upload entgegen und startet
+    einen Hintergrund-Job (parse -> extract -> save). Gibt sofort die Job-ID zurück.
+    """
+    files = [file for _, file in f.request.files.items(multi=True)]
+    for file in files:
+        file.close()
+    if f.request.upload_dir is None or not any(Path(file.filename or "").suffix == ".rec" for file in files):
+        f.abort(400, description="Bad Request: No .rec files provided")
+
+    # Der Upload-Ordner gehört ab jetzt dem Job
+    upload_dir, f.request.upload_dir = f.request.upload_dir, None
+    job_id = submit_upload(upload_dir, f.g.user['teamID'])
+    return {"job_id": job_id, "status_url": f"{BASE_PATH}/jobs/{job_id}"}, 202
+
+@app.route(f'{BASE_PATH}/upload_round', methods=['POST'])
+def upload_round():
+    """
+    Nimmt die .rec Datei einer einzelnen Runde entgegen und hängt sie im Hintergrund an ihr
+    Match an (roundIngest.py). Die erste Runde legt das Match an. Gibt sofort die Job-ID zurück.
+    """
+    files = [file for _, file in f.request.files.items(multi=True)]
+    for file in files:
+        file.close()
+    rec_files = [file for file in files if Path(file.filename or "").suffix == ".rec"]
+    if f.request.upload_dir is None or len(rec_files) != 1:
+        f.abort(400, description="Bad Request: Exactly one .rec file required")
+
+    upload_dir, f.request.upload_dir = f.request.upload_dir, None
+    job_id = submit_round_upload(upload_dir, f.g.user['teamID'])
+    return {"job_id": job_id, "status_url": f"{BASE_PATH}/jobs/{job_id}"}, 202
+
+@app.route(f'{BASE_PATH}/upload_round_json', methods=['POST'])
+def upload_round_json():
+    """
+    Hängt eine Runde im Format von parseRound (mit Match_Info) an ihr Match an.
+    Gibt match_id und Rundennummer zurück, 201 wenn die Runde das Match angelegt hat.
+    """
+    data = f.request.get_json()
+    if not isinstance(data, dict) or not isinstance(data.get("Match_Info"), dict):
+        f.abort(400, description="Bad Request: Round JSON with Match_Info required")
+    try:
+        data = extract_round(data)
+    except Exception as e:
+        f.abort(400, description=f"Bad Request: Round could not be extracted ({type(e).__name__}: {e})")
+    return save_round(data, f.g.user['teamID'])
+
+@app.route(f'{BASE_PATH}/jobs/<job_id>', methods=['GET'])
+def job_status(job_id: str):
+    """Gibt den Status eines Upload-Jobs des eigenen Teams zurück."""
+    job = get_job(job_id)
+    if job is None or job["team_id"] != f.g.user['teamID']:
+        f.abort(404, description="Not Found: Unknown job")
+    return {key: value for key, value in job.items() if key != "team_id"}, 200
+
+def upload_match_id(data) -> str | None:
+    """Match ID eines Uploads, als Rohdokument (Match_Info) oder als extrahierte Daten (match_data)."""
+    if not isinstance(data, dict):
+        return None
+    for key, field in (("Match_Info", "Match ID"), ("match_data", "match_id")):
+        if isinstance(data.get(key), dict) and isinstance(data[key].get(field), str):
+            return data[key][field]
+    return None
 
 @app.route(f'{BASE_PATH}/upload_json', methods=['POST'])
 def upload_json():
     data = f.request.get_json()
     if not data:
         f.abort(400, description="Bad Request: No JSON data provided")
+    if known_duplicate(upload_match_id(data)):
+        # Wiederholter Upload: ablehnen, bevor extrahiert oder die Datenbank gefragt wird
+        f.abort(409, description="Conflict: Match already exists.")
+    raw = None
+    if isinstance(data, dict) and "Match_Info" in data:
+        # Rohdokument von r6-dissect: hier extrahieren und in RawMatch archivieren
+        raw = encode_document(data)
+        try:
+            data = extract_data(data)
+        except Exception as e:
+            f.abort(400, description=f"Bad Request: Match could not be extracted ({type(e).__name__}: {e})")
+    error = validate_match_data(data)
+    if error:
+        f.abort(400, description=f"Bad Request: {error}")
+
+    if UPLOAD_JSON_MODE == "batched":
+        # Speichern übernimmt der Batch-Writer, der Request kehrt sofort zurück
+        if not get_writer().submit(data, f.g.user['teamID'], raw):
+            return f.Response("Service Unavailable: Upload queue is full, retry later", 503,
+                              headers={"Retry-After": "5"})
+        return "JSON data accepted", 202
 
     # Process the JSON data
-    save_match(data, f.g.user['teamID'])
+    save_match(data, f.g.user['teamID'], raw)
 
     return "JSON data processed successfully", 200
 
-@app.route(f'{BASE_PATH}/get_all_player', methods=['GET'])
-def get_all_player() -> dict[list[dict[str, str]]]:
+@app.route(f'{BASE_PATH}/upload_ndjson', methods=['POST'])
+def upload_ndjson():
     """
-    Gibt alle Spielernamen und Ubisoft IDs zurück, sortiert nach Spielernamen.
-    Es wird immer der aktuellste Name zurückgegeben, auch wenn sich der Name geändert hat.
+    Importiert viele Matches als NDJSON (eine r6-dissect Match-JSON pro Zeile), optional
+    mit Content-Encoding gzip oder zstd. Antwortet als NDJSON-Stream: pro Match eine Zeile
+    {"line", "match_id", "status", "error"} mit inserted / duplicate / failed, sobald das
+    Ergebnis feststeht, zum Schluss eine Zeile {"summary": {...}}.
+    Für den Body gilt NDJSON_MAX_MB statt der allgemeinen Grenze UPLOAD_MAX_MB.
     """
+    # Vor dem ersten Zugriff auf den Body setzen
+    max_length = int(NDJSON_MAX_MB * 1024 * 1024) if NDJSON_MAX_MB > 0 else None
+    f.request.max_content_length = max_length
+    if max_length is not None and (f.request.content_length or 0) > max_length:
+        f.abort(413, description=f"Request Entity Too Large: NDJSON uploads are limited to {NDJSON_MAX_MB:g} MB")
+    encoding = f.request.headers.get("Content-Encoding")
+    try:
+        decompressor(encoding)
+    except UnsupportedEncoding as e:
+        f.abort(415, description=f"Unsupported Media Type: {e}")
+
+    team_id = f.g.user['teamID']
 
-    query = """SELECT p.username as username, p.ubisoft_id as uid
-            FROM player p
-                INNER JOIN (
-                    SELECT ubisoft_id, MAX(timestamp) as max_timestamp
-                    FROM player
-                    GROUP BY
-                        ubisoft_id
-                ) sub ON p.ubisoft_id = sub.ubisoft_id
-                AND p.timestamp = sub.max_timestamp
-            ORDER BY p.username;"""
-    data, error = fetch_data(query, ["username","uid"])
+    def generate():
+        summary = {"inserted": 0, "duplicate": 0, "failed": 0}
+        try:
+            for result in ingest_ndjson(f.request.stream, team_id, encoding):
+                summary[result["status"]] += 1
+                yield json.dumps(result, separators=(",", ":")) + "\n"
+        except RequestEntityTooLarge:
+            # Body ohne Content-Length (chunked), die Grenze wird erst beim Lesen erreicht
+            yield json.dumps({"summary": summary, "error": "Request Entity Too Large"}) + "\n"
+            return
+        except Exception as e:
+            # Status und Header sind schon gesendet, der Abbruch steht in der letzten Zeile
+            logging.error(f"NDJSON upload of team {team_id} failed: {e}")
+            yield json.dumps({"summary": summary, "error": "Internal Server Error"}) + "\n"
+            return
+        yield json.dumps({"summary": summary}) + "\n"
+
+    # Der Request-Body wird erst beim Senden der Antwort gelesen
+    return f.Response(f.stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route(f'{BASE_PATH}/player_career', methods=['GET'])
+def player_career():
+    """
+    Gibt die Karriere-Statistiken aller Spieler des eigenen Teams aus der Tabelle PlayerCareer zurück.
+    """
+    columns = ["ubisoft_id", *CAREER_COLUMNS]
+    query = f"""SELECT {", ".join(columns)}
+            FROM PlayerCareer
+            WHERE team_id = %s
+            ORDER BY ubisoft_id;"""
+    data, error = fetch_data(query, columns, (f.g.user['teamID'],))
 
     if error:
-        print("ERROR")
+        logging.error(f"Database error during player career query: {error}")
         f.abort(500, description="Internal Server Error")
 
     return {"players": data}, 200
 
+def analytics_response(name: str):
+    """Eine Seite des Reports aus analytics.py für das eigene Team."""
+    try:
+        page, error = report_page(name, f.g.user['teamID'], parse_filters(f.request.args))
+    except ValueError as e:
+        f.abort(400, description=f"Bad Request: {e}")
+
+    if error:
+        logging.error(f"Database error during {name} analytics query: {error}")
+        f.abort(500, description="Internal Server Error")
+
+    return page, 200
+
+@app.route(f'{BASE_PATH}/stats/players', methods=['GET'])
+def stats_players():
+    """
+    Statistiken pro Spieler (Ubisoft ID) über alle Matches des eigenen Teams im Zeitraum.
+    Query-Parameter: from, to (YYYY-MM-DD, inklusiv), team (own/opponents), limit, cursor.
+    """
+    return analytics_response("players")
+
+@app.route(f'{BASE_PATH}/stats/operators', methods=['GET'])
+def stats_operators():
+    """
+    Gewonnene Runden, Kills und Tode pro Operator. Query-Parameter wie /stats/players.
+    """
+    return analytics_response("operators")
+
+@app.route(f'{BASE_PATH}/stats/maps', methods=['GET'])
+def stats_maps():
+    """
+    Gewonnene Matches und Runden des eigenen Teams pro Map. Query-Parameter: from, to, limit, cursor.
+    """
+    return analytics_response("maps")
+
+@app.route(f'{BASE_PATH}/stats/sites', methods=['GET'])
+def stats_sites():
+    """
+    Runden pro Map und Bombenspot, getrennt nach Angriff und Verteidigung des eigenen Teams.
+    Query-Parameter: from, to, limit, cursor.
+    """
+    return analytics_response("sites")
+
+@app.route(f'{BASE_PATH}/stats/win_conditions', methods=['GET'])
+def stats_win_conditions():
+    """
+    Runden pro Siegbedingung (z.B. KilledOpponents, DefusedBomb). Query-Parameter: from, to, limit, cursor.
+    """
+    return analytics_response("win_conditions")
+
+@app.route(f'{BASE_PATH}/export/<table>', methods=['GET'])
+def export(table: str) -> f.Response:
+    """
+    Exportiert eine Tabelle (matches, rounds, player_matches, player_rounds, events) des eigenen
+    Teams als Chunked-Response. Query-Parameter: format (csv, ndjson, arrow, parquet), from, to.
+    """
+    export_format = f.request.args.get("format", "csv")
+    try:
+        check_export(table, export_format)
+        date_from, date_to = parse_date_range(f.request.args)
+    except ValueError as e:
+        f.abort(400, description=f"Bad Request: {e}")
+
+    team_id = f.g.user['teamID']
+
+    def generate():
+        try:
+            yield from export_stream(table, team_id, export_format, date_from, date_to)
+        except Exception as e:
+            # Status und Header sind schon gesendet, die Antwort endet unvollständig
+            logging.error(f"Export of {table} failed: {e}")
+
+    mimetype, extension = FORMATS[export_format]
+    response = f.Response(generate(), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{table}.{extension}"'
+    return response
+
+@app.route(f'{BASE_PATH}/get_all_player', methods=['GET'])
+def get_all_player() -> f.Response:
+    """
+    Gibt alle Spielernamen und Ubisoft IDs des eigenen Teams zurück, sortiert nach Spielernamen.
+    Es wird immer der aktuellste Name zurückgegeben, auch wenn sich der Name geändert hat.
+    Die Antwort wird pro Team im Speicher gecacht (siehe playerIdentity.py) und unterstützt
+    bedingte Anfragen (If-None-Match -> 304).
+    """
+    team_id = f.g.user['teamID']
+
+    def load():
+        query = """SELECT username, ubisoft_id as uid
+                FROM PlayerIdentity
+                WHERE team_id = %s
+                ORDER BY username;"""
+        data, error = fetch_data(query, ["username","uid"], (team_id,))
+        if error:
+            logging.error(f"Database error during player query: {error}")
+            return None
+        return data
+
+    def version():
+        data, error = fetch_data(PLAYER_IDENTITY_VERSION, ["version"], (team_id,))
+        if error:
+            logging.error(f"Database error during player version query: {error}")
+            return None
+        return data[0]["version"]
+
+    cached = cached_players(team_id, load, version)
+    if cached is None:
+        f.abort(500, description="Internal Server Error")
+    etag, body = cached
+
+    response = f.Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(f.request)
+
 if __name__ == '__main__':
-    logging.basicConfig(level=logging.DEBUG if MODE == "development" else logging.INFO)
+    configure_logging(logging.DEBUG if MODE == "development" else logging.INFO, LOG_FORMAT)
     app.run(port=PORT, debug=(MODE == "development"))
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""Aggregierte Statistiken für die Analyse-Endpunkte der API.
+
+Alle Kennzahlen werden in SQL über PlayerMatch, PlayerRound und Rounds berechnet und sind auf
+die Matches eines Teams (Matches.team_id) beschränkt. Als eigenes Team gilt in jedem Match das
+Team des aufnehmenden Spielers (Matches.player_id), daraus ergeben sich "won" und der Filter
+team=own/opponents.
+
+Seiten werden per Keyset geblättert: next_cursor kodiert den Gruppierungsschlüssel der letzten
+Zeile, die nächste Seite beginnt mit WHERE key > cursor statt mit OFFSET. Schlüssel, die NULL
+sein können, werden als '' gruppiert, damit der Vergleich mit dem Cursor immer definiert ist.
+"""
+import base64
+import json
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from db_functions import fetch_data
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+TEAM_FILTERS = ("own", "opponents")
+# PlayerMatch des aufnehmenden Spielers. LEFT JOIN, damit Matches ohne dessen Zeile mitzählen;
+# mit team=own/opponents INNER JOIN, ohne own.team_index ist die Zuordnung nicht definiert.
+OWN_JOIN = "PlayerMatch own ON own.match_id = m.match_id AND own.player_id = m.player_id"
+
+@dataclass(frozen=True)
+class Report:
+    """Eine gruppierte Abfrage.
+
+    Args:
+        select (str): SELECT-Liste, die Aliase sind die Spalten der Antwort.
+        source (str): FROM mit Joins; Matches heißt m, {own_join} wird durch den Join auf das
+            PlayerMatch des aufnehmenden Spielers (own, siehe OWN_JOIN) ersetzt.
+        keys (tuple): (Ausdruck, Alias) der Gruppierung, zugleich Sortierung und Cursor.
+        team_column (str | None): team_index-Spalte, auf die team=own/opponents wirkt. Reports
+            ohne team_column lehnen den Filter ab.
+        partition_column (str | None): match_timestamp einer partitionierten Tabelle, damit der
+            Zeitraum auch dort filtert und nur die passenden Monats-Partitionen gelesen werden.
+    """
+    select: str
+    source: str
+    keys: tuple
+    team_column: str | None = None
+    partition_column: str | None = None
+
+    @property
+    def columns(self) -> list[str]:
+        return re.findall(r" AS (\w+)\s*(?:,|$)", self.select)
+
+REPORTS = {
+    "players": Report(
+        select="""COALESCE(p.ubisoft_id, '') AS ubisoft_id,
+                  MAX(pi.username) AS username,
+                  COUNT(*) AS matches,
+                  COUNT(*) FILTER (WHERE pm.win) AS won_matches,
+                  AVG(pm.win::int)::float8 AS win_rate,
+                  SUM(pm.won_rounds + pm.lost_rounds) AS rounds,
+                  SUM(pm.kills) AS kills,
+                  SUM(pm.deaths) AS deaths,
+                  SUM(pm.assists) AS assists,
+                  SUM(pm.headshots) AS headshots,
+                  AVG(pm.kost)::float8 AS kost,
+                  SUM(pm.oks) AS oks,
+                  SUM(pm.ods) AS ods,
+                  SUM(pm.refrags) AS refrags""",
+        source="""PlayerMatch pm
+                  INNER JOIN Matches m ON m.match_id = pm.match_id
+                  INNER JOIN Player p ON p.id = pm.player_id
+                  {own_join}
+                  LEFT JOIN PlayerIdentity pi ON pi.team_id = m.team_id AND pi.ubisoft_id = p.ubisoft_id""",
+        keys=(("COALESCE(p.ubisoft_id, '')", "ubisoft_id"),),
+        team_column="pm.team_index"),
+    "operators": Report(
+        select="""COALESCE(pr.operator, '') AS operator,
+                  BOOL_OR(pr.atk) AS atk,
+                  COUNT(*) AS rounds,
+                  COUNT(*) FILTER (WHERE pr.win) AS won_rounds,
+                  AVG(pr.win::int)::float8 AS win_rate,
+                  SUM(pr.kills) AS kills,
+                  COUNT(*) FILTER (WHERE pr.death) AS deaths,
+                  AVG(pr.kostpoint::int)::float8 AS kost""",
+        source="""PlayerRound pr
+                  INNER JOIN Rounds r ON r.id = pr.round_id
+                  INNER JOIN Matches m ON m.match_id = r.match_id
+                  {own_join}""",
+        keys=(("COALESCE(pr.operator, '')", "operator"),),
+        team_column="pr.team_index",
+        partition_column="pr.match_timestamp"),
+    "maps": Report(
+        select="""COALESCE(m.map, '') AS map,
+                  COUNT(DISTINCT m.match_id) AS matches,
+                  COUNT(DISTINCT m.match_id) FILTER (WHERE m.winner_team_index = own.team_index) AS won_matches,
+                  COUNT(*) AS rounds,
+                  COUNT(*) FILTER (WHERE r.winner_team_index = own.team_index) AS won_rounds,
+                  AVG((r.winner_team_index = own.team_index)::int)::float8 AS round_win_rate""",
+        source="""Rounds r
+                  INNER JOIN Matches m ON m.match_id = r.match_id
+                  {own_join}""",
+        keys=(("COALESCE(m.map, '')", "map"),)),
+    "sites": Report(
+        select="""COALESCE(m.map, '') AS map,
+                  COALESCE(r.site, '') AS site,
+                  COUNT(*) AS rounds,
+                  COUNT(*) FILTER (WHERE r.winner_team_index = own.team_index) AS won_rounds,
+                  COUNT(*) FILTER (WHERE r.atk_team_index = own.team_index) AS atk_rounds,
+                  COUNT(*) FILTER (WHERE r.atk_team_index = own.team_index
+                                     AND r.winner_team_index = own.team_index) AS atk_won_rounds,
+                  COUNT(*) FILTER (WHERE r.def_team_index = own.team_index) AS def_rounds,
+                  COUNT(*) FILTER (WHERE r.def_team_index = own.team_index
+                                     AND r.winner_team_index = own.team_index) AS def_won_rounds,
+                  AVG((r.winner_team_index = r.atk_team_index)::int)::float8 AS atk_win_rate""",
+        source="""Rounds r
+                  INNER JOIN Matches m ON m.match_id = r.match_id
+                  {own_join}""",
+        keys=(("COALESCE(m.map, '')", "map"), ("COALESCE(r.site, '')", "site"))),
+    "win_conditions": Report(
+        select="""COALESCE(r.win_condition, '') AS win_condition,
+                  COUNT(*) AS rounds,
+                  COUNT(*) FILTER (WHERE r.winner_team_index = own.team_index) AS won_rounds,
+                  COUNT(*) FILTER (WHERE r.winner_team_index <> own.team_index) AS lost_rounds,
+                  COUNT(*) FILTER (WHERE r.winner_team_index = r.atk_team_index) AS atk_won_rounds""",
+        source="""Rounds r
+                  INNER JOIN Matches m ON m.match_id = r.match_id
+                  {own_join}""",
+        keys=(("COALESCE(r.win_condition, '')", "win_condition"),)),
+}
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, length: int) -> list:
+    """Gibt die Schlüsselwerte eines Cursors zurück. ValueError bei ungültigem Cursor."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != length or not all(isinstance(value, str) for value in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+def parse_date_range(args) -> tuple[date | None, date | None]:
+    """Liest from und to (ISO-Datum, inklusiv) als halboffenen Bereich [date_from, date_to).
+
+    Raises:
+        ValueError: Ein Datum ist ungültig.
+    """
+    try:
+        date_from = date.fromisoformat(args["from"]) if args.get("from") else None
+        # bis einschließlich des Tages
+        date_to = date.fromisoformat(args["to"]) + timedelta(days=1) if args.get("to") else None
+    except ValueError:
+        raise ValueError("from and to must be dates (YYYY-MM-DD)")
+    return date_from, date_to
+
+def parse_filters(args) -> dict:
+    """Liest from, to (ISO-Datum, inklusiv), team, limit und cursor aus den Query-Parametern.
+
+    Raises:
+        ValueError: Ein Parameter ist ungültig.
+    """
+    filters = {"date_from": None, "date_to": None, "team": None, "limit": DEFAULT_LIMIT, "cursor": None}
+    filters["date_from"], filters["date_to"] = parse_date_range(args)
+    if args.get("team"):
+        if args["team"] not in TEAM_FILTERS:
+            raise ValueError(f"team must be one of {', '.join(TEAM_FILTERS)}")
+        filters["team"] = args["team"]
+    if args.get("limit"):
+        try:
+            filters["limit"] = int(args["limit"])
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if not 1 <= filters["limit"] <= MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    filters["cursor"] = args.get("cursor") or None
+    return filters
+
+def report_query(name: str, team_id: int, filters: dict) -> tuple[str, dict]:
+    """SQL und Parameter für eine Seite des Reports (eine Zeile mehr als limit, um das Ende zu erkennen).
+
+    Raises:
+        ValueError: Der Cursor ist ungültig oder der Report unterstützt den Filter team nicht.
+    """
+    report = REPORTS[name]
+    if filters["team"] and not report.team_column:
+        raise ValueError(f"team is not supported by the {name} report")
+    conditions = ["m.team_id = %(team_id)s"]
+    params = {"team_id": team_id, "limit": filters["limit"] + 1}
+    for bound, operator in (("date_from", ">="), ("date_to", "<")):
+        if filters[bound] is None:
+            continue
+        params[bound] = filters[bound]
+        conditions.append(f"m.timestamp {operator} %({bound})s")
+        if report.partition_column:
+            conditions.append(f"{report.partition_column} {operator} %({bound})s")
+    if filters["team"]:
+        conditions.append(f"{report.team_column} {'=' if filters['team'] == 'own' else '<>'} own.team_index")
+
+    key_expressions = [expression for expression, _ in report.keys]
+    if filters["cursor"]:
+        after = decode_cursor(filters["cursor"], len(report.keys))
+        placeholders = []
+        for index, value in enumerate(after):
+            params[f"after_{index}"] = value
+            placeholders.append(f"%(after_{index})s")
+        conditions.append(f"({', '.join(key_expressions)}) > ({', '.join(placeholders)})")
+
+    own_join = f"{'INNER' if filters['team'] else 'LEFT'} JOIN {OWN_JOIN}"
+    query = f"""SELECT {report.select}
+                FROM {report.source.format(own_join=own_join)}
+                WHERE {" AND ".join(conditions)}
+                GROUP BY {", ".join(key_expressions)}
+                ORDER BY {", ".join(key_expressions)}
+                LIMIT %(limit)s;"""
+    return query, params
+
+def report_page(name: str, team_id: int, filters: dict) -> tuple[dict | None, str | None]:
+    """Eine Seite des Reports als {name: [...], "next_cursor": str | None}.
+
+    Returns:
+        tuple: (Seite, None) oder (None, Fehlermeldung der Datenbank).
+
+    Raises:
+        ValueError: Der Cursor ist ungültig oder der Report unterstützt den Filter team nicht.
+    """
+    query, params = report_query(name, team_id, filters)
+    rows, error = fetch_data(query, REPORTS[name].columns, params)
+    if error:
+        return None, error
+    next_cursor = None
+    if len(rows) > filters["limit"]:
+        rows = rows[:filters["limit"]]
+        next_cursor = encode_cursor([rows[-1][alias] for _, alias in REPORTS[name].keys])
+    return {name: rows, "next_cursor": next_cursor}, None
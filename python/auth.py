@@ -1,11 +1,157 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
 import requests as rq
-from vars import REQUEST_URL
+from requests.adapters import HTTPAdapter
+from metrics import AUTH_REQUEST_DURATION, Gauge
+from vars import (REQUEST_URL, AUTH_CACHE_SIZE, AUTH_CACHE_TTL, AUTH_NEGATIVE_TTL,
+                  AUTH_TIMEOUT, AUTH_POOL_SIZE)
+
+class TokenCache:
+    """LRU-Cache für bereits geprüfte Tokens mit Ablaufzeit pro Eintrag.
+
+    Args:
+        max_size (int): Maximale Anzahl Einträge, danach wird der älteste verdrängt.
+        ttl (float): Maximale Lebensdauer eines Eintrags in Sekunden.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (user, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            return None
+
+    def record(self, hit: bool) -> None:
+        """Zählt eine Anfrage als Treffer (ohne Request an den Auth-Server) oder Fehlschlag."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key: str, user: dict, expires_in: float | None = None) -> None:
+        lifetime = self.ttl if expires_in is None else min(self.ttl, expires_in)
+        if lifetime <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + lifetime)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._entries),
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+_cache = TokenCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+# Vom Auth-Server abgelehnte Tokens (401/403), damit ungültige Tokens nicht jedes Mal geprüft werden
+_rejected = TokenCache(AUTH_CACHE_SIZE, AUTH_NEGATIVE_TTL)
+# Keep-Alive Verbindungen zum Auth-Server für Cache-Misses
+_session = rq.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=AUTH_POOL_SIZE))
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=AUTH_POOL_SIZE))
+# Gleichzeitige Prüfungen desselben Tokens warten auf die erste Anfrage und übernehmen deren Ergebnis
+_inflight = {}  # key -> _Pending
+_inflight_lock = threading.Lock()
+
+Gauge("r6_auth_cache_hit_ratio", "Share of token checks answered from the cache",
+      lambda: _cache.stats()["hit_rate"])
+Gauge("r6_auth_cache_lookups", "Token checks by cache result (since start)",
+      lambda: {"hit": _cache.stats()["hits"], "miss": _cache.stats()["misses"]}, label="result")
+Gauge("r6_auth_cache_entries", "Tokens in the cache", lambda: _cache.stats()["size"])
+
+def token_expires_in(token: str) -> float | None:
+    """Sekunden bis zum "exp"-Claim des JWT (ohne Signaturprüfung, nur für die Cache-Dauer)."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload))["exp"]
+        return float(exp) - time.time()
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+def cache_stats() -> dict:
+    """Größe, Treffer, Fehlschläge und Trefferquote des Token-Caches."""
+    return _cache.stats()
+
+class _Pending:
+    """Laufende Prüfung eines Tokens. user bzw. error gelten, sobald done gesetzt ist."""
+    __slots__ = ("done", "user", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.user = None
+        self.error = None
 
 def get_auth(token) -> dict["teamID": int, "name": str, "isAdmin": bool] | None:
     if not token:
         return None
-    response = rq.get(REQUEST_URL, headers={"Authorization": f"Bearer {token}"})
-    if response.status_code != 200:
-        return None
-    return response.json()
+    key = hashlib.sha256(token.encode()).hexdigest()
+    user = _cache.get(key)
+    if user is not None or _rejected.get(key) is not None:
+        _cache.record(hit=True)
+        return user
+
+    with _inflight_lock:
+        pending = _inflight.get(key)
+        if pending is None:
+            leader = _inflight[key] = _Pending()
+    if pending is not None:
+        if pending.done.wait(AUTH_TIMEOUT):
+            # Ergebnis der ersten Anfrage, auch wenn das Token ungültig war oder sie fehlschlug
+            _cache.record(hit=True)
+            if pending.error is not None:
+                raise pending.error
+            return pending.user
+        # Erste Anfrage hängt noch: selbst prüfen
+        _cache.record(hit=False)
+        return _request_auth(token)[0]
 
+    _cache.record(hit=False)
+    try:
+        user, status = _request_auth(token)
+        if user is not None:
+            _cache.put(key, user, token_expires_in(token))
+        elif status in (401, 403):
+            _rejected.put(key, {"status": status})
+        leader.user = user
+        return user
+    except Exception as e:
+        leader.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key)
+        leader.done.set()
+
+def _request_auth(token: str) -> tuple[dict | None, int]:
+    """Fragt den Auth-Server. Gibt den Benutzer (None = abgelehnt) und den Statuscode zurück."""
+    with AUTH_REQUEST_DURATION.time():
+        response = _session.get(REQUEST_URL, headers={"Authorization": f"Bearer {token}"}, timeout=AUTH_TIMEOUT)
+    if response.status_code != 200:
+        return None, response.status_code
+    return response.json(), response.status_code
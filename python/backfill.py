@@ -0,0 +1,187 @@
+"""Neu-Extraktion archivierter Matches nach einer Änderung an extractData.
+
+Alle Matches in RawMatch mit extractor_version < EXTRACTOR_VERSION werden in einem
+Prozess-Pool erneut mit extract_data verarbeitet. Pro Match werden in einer Transaktion die
+abgeleiteten Zeilen (Matches, Rounds, PlayerRound, PlayerMatch, Events) ersetzt, PlayerCareer
+der betroffenen Spieler neu berechnet und die Version in RawMatch hochgesetzt. Ein Abbruch
+verliert also höchstens die laufenden Matches, ein erneuter Aufruf macht beim Rest weiter.
+
+Matches, die vor dem Archiv importiert wurden, haben keinen Eintrag in RawMatch und werden
+nicht erfasst. Archive mit einer älteren Feldauswahl als streamDecode.MATCH_FIELDS_VERSION
+(RawMatch.field_set) enthalten nicht alle Felder, die extract_data jetzt liest. Sie werden
+nicht neu extrahiert, sondern gezählt und gemeldet; diese Matches müssen neu aus den Replays
+eingelesen werden.
+
+Aufruf:
+    python backfill.py [--team-id 6] [--workers 4] [--batch-size 50] [--limit 1000]
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from extractData import extract_data, EXTRACTOR_VERSION
+from streamDecode import MATCH_FIELDS_VERSION
+from rawArchive import decode_document
+from db_functions import transaction, write_match, prepare_partitions
+from playerCareer import rebuild_player_career
+from playerIdentity import invalidate_players
+from partitions import NO_TIMESTAMP
+
+# Archive, die alle aktuell gelesenen Felder enthalten (Parameter: MATCH_FIELDS_VERSION)
+COMPLETE_FIELD_SET = "(field_set IS NULL OR field_set >= %s)"
+
+def count_stale(team_id: int | None = None, version: int = EXTRACTOR_VERSION) -> int:
+    """Veraltete Matches, die aus dem Archiv neu extrahiert werden können."""
+    with transaction() as cur:
+        cur.execute(f"""SELECT COUNT(*) FROM RawMatch
+                        WHERE extractor_version < %s AND {COMPLETE_FIELD_SET}
+                          AND (%s::integer IS NULL OR team_id = %s);""",
+                    (version, MATCH_FIELDS_VERSION, team_id, team_id))
+        return cur.fetchone()[0]
+
+def count_too_narrow(team_id: int | None = None, version: int = EXTRACTOR_VERSION) -> int:
+    """Veraltete Matches, deren Archiv zu wenige Felder enthält (neu aus den Replays einlesen)."""
+    with transaction() as cur:
+        cur.execute(f"""SELECT COUNT(*) FROM RawMatch
+                        WHERE extractor_version < %s AND NOT {COMPLETE_FIELD_SET}
+                          AND (%s::integer IS NULL OR team_id = %s);""",
+                    (version, MATCH_FIELDS_VERSION, team_id, team_id))
+        return cur.fetchone()[0]
+
+def stale_batches(batch_size: int, team_id: int | None = None, version: int = EXTRACTOR_VERSION):
+    """Gibt veraltete Einträge mit vollständiger Feldauswahl aus RawMatch in Blöcken zurück, geblättert nach match_id.
+
+    Yields:
+        list[tuple]: (match_id, team_id, encoding, document) pro Match.
+    """
+    after = ""
+    while True:
+        with transaction() as cur:
+            cur.execute(f"""SELECT match_id, team_id, encoding, document
+                            FROM RawMatch
+                            WHERE extractor_version < %s AND match_id > %s AND {COMPLETE_FIELD_SET}
+                              AND (%s::integer IS NULL OR team_id = %s)
+                            ORDER BY match_id
+                            LIMIT %s;""",
+                        (version, after, MATCH_FIELDS_VERSION, team_id, team_id, batch_size))
+            rows = [(match_id, team, encoding, bytes(document)) for match_id, team, encoding, document in cur.fetchall()]
+        if not rows:
+            return
+        yield rows
+        after = rows[-1][0]
+
+def reextract(row: tuple) -> tuple[str, int, dict | None, str | None]:
+    """Läuft im Worker-Prozess: dekodiert das Rohdokument und extrahiert es neu."""
+    match_id, team_id, encoding, document = row
+    try:
+        return match_id, team_id, extract_data(decode_document(encoding, document)), None
+    except Exception as e:
+        return match_id, team_id, None, f"{type(e).__name__}: {e}"
+
+def swap_match(cur, match_id: str, team_id: int, data: dict, version: int = EXTRACTOR_VERSION) -> bool:
+    """Ersetzt die abgeleiteten Zeilen eines Matches durch data.
+
+    Gibt False zurück, wenn das Match inzwischen (z.B. von einem parallelen Lauf) aktualisiert wurde.
+    """
+    cur.execute("SELECT extractor_version FROM RawMatch WHERE match_id = %s FOR UPDATE;", (match_id,))
+    row = cur.fetchone()
+    if row is None or row[0] >= version:
+        return False
+
+    cur.execute("SELECT timestamp FROM Matches WHERE match_id = %s;", (match_id,))
+    row = cur.fetchone()
+    # Partitionsschlüssel der alten Zeilen, damit nur deren Monats-Partition gelesen wird
+    old_timestamp = (row[0] if row else None) or NO_TIMESTAMP
+    cur.execute("""SELECT DISTINCT p.ubisoft_id FROM PlayerMatch pm
+                   INNER JOIN Player p ON p.id = pm.player_id
+                   WHERE pm.match_id = %s;""", (match_id,))
+    ubisoft_ids = {ubisoft_id for ubisoft_id, in cur.fetchall()}
+
+    for table in ("Events", "PlayerRound"):
+        cur.execute(f"""DELETE FROM {table}
+                        WHERE round_id IN (SELECT id FROM Rounds WHERE match_id = %s)
+                          AND match_timestamp = %s;""", (match_id, old_timestamp))
+    for table in ("PlayerMatch", "Rounds", "Matches"):
+        cur.execute(f"DELETE FROM {table} WHERE match_id = %s;", (match_id,))
+
+    write_match(cur, data, team_id)
+    # write_match addiert zu PlayerCareer, nach dem Ersetzen wird neu berechnet
+    ubisoft_ids.update(player["ubisoft_id"] for player in data["player_data"].values())
+    rebuild_player_career(cur, team_id, sorted(ubisoft_ids))
+    cur.execute("UPDATE RawMatch SET extractor_version = %s WHERE match_id = %s;", (version, match_id))
+    return True
+
+def backfill(team_id: int | None = None, workers: int | None = None, batch_size: int = 50,
+             limit: int | None = None) -> dict:
+    """Extrahiert alle veralteten Matches neu und gibt eine Zusammenfassung zurück.
+
+    Während die Ergebnisse eines Blocks geschrieben werden, extrahiert der Pool schon den nächsten.
+    """
+    total = count_stale(team_id)
+    if limit is not None:
+        total = min(total, limit)
+    too_narrow = count_too_narrow(team_id)
+    if too_narrow:
+        logging.warning(f"Backfill: {too_narrow} archived matches lack fields of field set "
+                        f"{MATCH_FIELDS_VERSION} and need to be dissected again")
+    summary = {"total": total, "updated": 0, "skipped": 0, "failed": 0, "too_narrow": too_narrow}
+    start = time.perf_counter()
+
+    def write(futures) -> None:
+        for future in futures:
+            match_id, match_team_id, data, error = future.result()
+            if error is None:
+                try:
+                    prepare_partitions([data["match_data"].get("timestamp")])
+                    with transaction() as cur:
+                        swapped = swap_match(cur, match_id, match_team_id, data)
+                    summary["updated" if swapped else "skipped"] += 1
+                    if swapped:
+                        invalidate_players([match_team_id])
+                    continue
+                except Exception as e:
+                    error = getattr(e, "description", None) or str(e)
+            logging.error(f"Backfill of match {match_id} failed: {error}")
+            summary["failed"] += 1
+        done = summary["updated"] + summary["skipped"] + summary["failed"]
+        elapsed = time.perf_counter() - start
+        logging.info(f"Backfill: {done}/{total} matches, {done / elapsed:.1f} matches/s, "
+                     f"{summary['failed']} failed")
+
+    submitted = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        pending = None
+        for rows in stale_batches(batch_size, team_id):
+            if limit is not None:
+                rows = rows[:limit - submitted]
+            futures = [executor.submit(reextract, row) for row in rows]
+            submitted += len(rows)
+            if pending:
+                write(pending)
+            pending = futures
+            if limit is not None and submitted >= limit:
+                break
+        if pending:
+            write(pending)
+
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    summary["matches_per_second"] = round(summary["updated"] / summary["seconds"], 2) if summary["seconds"] else 0.0
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extrahiert archivierte Matches mit veralteter Extraktor-Version neu.")
+    parser.add_argument("--team-id", type=int, help="nur Matches dieses Teams")
+    parser.add_argument("--workers", type=int, help="Prozesse für extract_data, Standard ist die Anzahl der CPU-Kerne")
+    parser.add_argument("--batch-size", type=int, default=50, help="Matches pro Block aus RawMatch")
+    parser.add_argument("--limit", type=int, help="höchstens so viele Matches")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    result = backfill(args.team_id, args.workers, args.batch_size, args.limit)
+    print(f"Backfill abgeschlossen: {result['updated']} aktualisiert, {result['skipped']} übersprungen, "
+          f"{result['failed']} fehlgeschlagen von {result['total']} in {result['seconds']}s "
+          f"({result['matches_per_second']} Matches/s)")
+    if result["too_narrow"]:
+        print(f"{result['too_narrow']} Matches mit zu schmalem Archiv müssen neu aus den Replays eingelesen werden")
@@ -0,0 +1,188 @@
+"""Extraktion vieler Matches auf mehreren Prozessen (extract_many).
+
+Die Eingaben (Match-Dokumente oder Pfade zu JSON-Dateien, wie sie parse.py schreibt) werden in
+Blöcken von chunk_size an einen Prozess-Pool verteilt. Ein Block wird im Worker gelesen und
+extrahiert (mit backend="numpy" gemeinsam über extract_data_batch) und kommt als ExtractedBatch
+zurück. Es sind höchstens max_pending Blöcke gleichzeitig unterwegs, die Ergebnisse werden in
+der Reihenfolge der Eingabe geliefert; der Speicherbedarf hängt also nicht von der Anzahl ab.
+
+Aufruf:
+    python batchExtract.py json/*.json [--team-id 6] [--workers 4] [--chunk-size 16] [--archive]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+
+from extractData import extract_data
+from rawArchive import encode_document
+
+CHUNK_SIZE = 16
+
+@dataclass
+class ExtractedBatch:
+    """Ergebnis eines Blocks.
+
+    Args:
+        start (int): Position des ersten Dokuments des Blocks in der Eingabe.
+        matches (list[dict | None]): Pro Dokument das Ergebnis von extract_data, None bei einem Fehler.
+        raws (list[tuple[str, bytes, int | None] | None]): Pro Dokument das Rohdokument für RawMatch (nur mit archive).
+        errors (dict[int, str]): Position in der Eingabe -> Fehlermeldung.
+    """
+    start: int
+    matches: list
+    raws: list
+    errors: dict = field(default_factory=dict)
+
+    def entries(self, team_id: int) -> list[tuple]:
+        """Die erfolgreich extrahierten Matches als Eingabe für save_matches."""
+        return [(data, team_id, raw) for data, raw in zip(self.matches, self.raws) if data is not None]
+
+    def tables(self) -> dict[str, list]:
+        """Alle Zeilen des Blocks pro Tabelle, in der Reihenfolge der Matches.
+
+        Zeilen ohne eigene match_id (Spieler, Spieler-Runden, Events) werden als Tupel
+        (match_id, ubisoft_id, Datensatz) bzw. (match_id, Datensatz) geführt.
+        """
+        tables = {key: [] for key in ("match_data", "player_data", "rounds_data",
+                                      "player_rounds_data", "player_match_data", "events_data")}
+        for data in self.matches:
+            if data is None:
+                continue
+            match_id = data["match_data"]["match_id"]
+            tables["match_data"].append(data["match_data"])
+            tables["player_data"] += [(match_id, ubisoft_id, player) for ubisoft_id, player in data["player_data"].items()]
+            tables["rounds_data"] += data["rounds_data"]
+            tables["player_rounds_data"] += [(match_id, ubisoft_id, stats) for round_dict in data["player_rounds_data"]
+                                             for ubisoft_id, stats in round_dict.items()]
+            tables["player_match_data"] += data["player_match_data"].values()
+            tables["events_data"] += [(match_id, event) for event in data["events_data"]]
+        return tables
+
+def load_document(item) -> dict:
+    """Ein Match-Dokument oder der Pfad zu einer JSON-Datei mit einem Match."""
+    if isinstance(item, (str, os.PathLike)):
+        with open(item, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return item
+
+def extract_chunk(start: int, items: list, backend: str = "python", archive: bool = False) -> ExtractedBatch:
+    """Läuft im Worker-Prozess: liest und extrahiert einen Block. Fehler betreffen nur das jeweilige Dokument."""
+    batch = ExtractedBatch(start, [None] * len(items), [None] * len(items))
+    documents = []
+    for index, item in enumerate(items):
+        try:
+            document = load_document(item)
+            if archive:
+                # Vor extract_data, da correct_data das Dokument verändert
+                batch.raws[index] = encode_document(document)
+            documents.append((index, document))
+        except Exception as e:
+            batch.errors[start + index] = f"{type(e).__name__}: {e}"
+
+    if backend == "numpy" and documents:
+        from extractVectorized import extract_data_batch
+        try:
+            for (index, _), data in zip(documents, extract_data_batch([document for _, document in documents])):
+                batch.matches[index] = data
+            return batch
+        except Exception:
+            # Fehlerhaftes Dokument einzeln suchen
+            pass
+    for index, document in documents:
+        try:
+            batch.matches[index] = extract_data(document)
+        except Exception as e:
+            batch.errors[start + index] = f"{type(e).__name__}: {e}"
+    return batch
+
+def extract_many(documents, workers: int | None = None, chunk_size: int = CHUNK_SIZE, backend: str = "python",
+                 archive: bool = False, max_pending: int | None = None):
+    """Extrahiert viele Matches parallel und liefert die Ergebnisse blockweise in der Reihenfolge der Eingabe.
+
+    Args:
+        documents: Iterable von Match-Dokumenten (dict) oder Pfaden zu JSON-Dateien. Pfade werden erst
+            im Worker gelesen, so müssen nur die Ergebnisse zwischen den Prozessen kopiert werden.
+        workers (int | None): Anzahl der Prozesse, Standard ist die Anzahl der CPU-Kerne.
+            Mit 1 wird ohne Pool im aufrufenden Prozess extrahiert.
+        chunk_size (int): Dokumente pro Block (und pro Aufgabe an den Pool).
+        backend (str): "python" (extract_data) oder "numpy" (extractVectorized.extract_data_batch,
+            nicht schneller, siehe dort).
+        archive (bool): Zusätzlich das Rohdokument für RawMatch kodieren (ExtractedBatch.raws).
+        max_pending (int | None): Höchstens so viele Blöcke gleichzeitig in Arbeit, Standard 2 pro Prozess.
+
+    Yields:
+        ExtractedBatch: Ein Block nach dem anderen.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    workers = workers or os.cpu_count() or 1
+    items = iter(documents)
+
+    def chunks():
+        start = 0
+        while chunk := list(islice(items, chunk_size)):
+            yield start, chunk
+            start += len(chunk)
+
+    if workers == 1:
+        for start, chunk in chunks():
+            yield extract_chunk(start, chunk, backend, archive)
+        return
+
+    max_pending = max_pending or 2 * workers
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for start, chunk in chunks():
+            pending.append(executor.submit(extract_chunk, start, chunk, backend, archive))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Bei vorzeitigem Abbruch durch den Aufrufer keine weiteren Blöcke mehr starten
+        executor.shutdown(wait=True, cancel_futures=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extrahiert Match-JSON-Dateien (z.B. aus parse.py) parallel "
+                                                 "und speichert sie mit save_matches.")
+    parser.add_argument("paths", nargs="+", type=Path, help="JSON-Dateien oder Ordner mit JSON-Dateien")
+    parser.add_argument("--team-id", type=int, help="Team, dem die Matches zugeordnet werden (ohne: nur extrahieren)")
+    parser.add_argument("--workers", type=int, help="Prozesse, Standard ist die Anzahl der CPU-Kerne")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Matches pro Block und Transaktion")
+    parser.add_argument("--backend", choices=("python", "numpy"), default="python")
+    parser.add_argument("--archive", action="store_true", help="Rohdokumente in RawMatch archivieren")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    files = sorted(file for path in args.paths for file in (path.glob("*.json") if path.is_dir() else [path]))
+    if args.team_id is not None:
+        from db_functions import save_matches
+
+    counts = {"extracted": 0, "failed": 0}
+    saved = {"inserted": 0, "duplicate": 0, "failed": 0}
+    rows = {}
+    start = time.perf_counter()
+    for batch in extract_many(files, args.workers, args.chunk_size, args.backend, args.archive):
+        for position, error in batch.errors.items():
+            logging.error(f"{files[position]}: {error}")
+        counts["failed"] += len(batch.errors)
+        counts["extracted"] += len(batch.matches) - len(batch.errors)
+        for table, table_rows in batch.tables().items():
+            rows[table] = rows.get(table, 0) + len(table_rows)
+        if args.team_id is not None:
+            for result in save_matches(batch.entries(args.team_id)):
+                saved[result] += 1
+    elapsed = time.perf_counter() - start
+    print(f"{counts['extracted']} von {len(files)} Matches extrahiert in {elapsed:.2f}s "
+          f"({counts['extracted'] / elapsed if elapsed else 0:.1f} Matches/s), {counts['failed']} fehlgeschlagen")
+    print("Zeilen: " + ", ".join(f"{table} {count}" for table, count in rows.items()))
+    if args.team_id is not None:
+        print(f"Gespeichert: {saved['inserted']} neu, {saved['duplicate']} Duplikate, {saved['failed']} Fehler")
@@ -0,0 +1,105 @@
+"""Gebündeltes Schreiben von Matches im Hintergrund.
+
+Validierte Matches kommen in eine begrenzte Queue. Ein Writer-Thread sammelt bis zu
+batch_size Matches (oder wartet höchstens linger Sekunden nach dem ersten) und speichert
+sie mit save_matches in einer Transaktion.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from db_functions import save_matches
+from metrics import Gauge
+from vars import WRITER_QUEUE_SIZE, WRITER_BATCH_SIZE, WRITER_LINGER_MS
+
+class BatchWriter:
+    """Writer-Thread mit begrenzter Queue.
+
+    Args:
+        queue_size (int): Maximale Anzahl wartender Matches.
+        batch_size (int): Maximale Anzahl Matches pro Transaktion.
+        linger (float): Sekunden, die nach dem ersten Match auf weitere gewartet wird.
+    """
+
+    def __init__(self, queue_size: int, batch_size: int, linger: float):
+        self.batch_size = batch_size
+        self.linger = linger
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="batch-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, data: dict, team_id: int, raw: tuple[str, bytes, int | None] | None = None) -> bool:
+        """Stellt ein Match (optional mit Rohdokument für RawMatch) in die Queue.
+        Gibt False zurück, wenn die Queue voll ist."""
+        if self._stopped.is_set():
+            return False
+        try:
+            self._queue.put_nowait((data, team_id, raw))
+            return True
+        except queue.Full:
+            return False
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Nimmt keine Matches mehr an und schreibt die Queue leer."""
+        self._stopped.set()
+        self._thread.join(timeout)
+
+    def _next_batch(self) -> list[tuple]:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not (self._stopped.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                results = save_matches(batch)
+            except Exception:
+                # Ein unerwarteter Fehler darf den Writer-Thread nicht beenden, sonst läuft die Queue voll
+                match_ids = [data["match_data"].get("match_id") for data, _, _ in batch]
+                logging.exception(f"Batch writer: batch with matches {match_ids} failed")
+                results = ["failed"] * len(batch)
+            for (data, team_id, _), result in zip(batch, results):
+                match_id = data["match_data"].get("match_id")
+                if result == "failed":
+                    logging.error(f"Batch writer: match {match_id} of team {team_id} could not be saved")
+                else:
+                    logging.info(f"Batch writer: match {match_id} of team {team_id} {result}")
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer() -> BatchWriter:
+    """Gibt den Writer des Prozesses zurück und startet ihn beim ersten Aufruf."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = BatchWriter(WRITER_QUEUE_SIZE, WRITER_BATCH_SIZE, WRITER_LINGER_MS / 1000)
+    return _writer
+
+Gauge("r6_batch_writer_pending", "Matches waiting in the batch writer queue",
+      lambda: _writer.pending() if _writer is not None else None)
+
+@atexit.register
+def stop_writer() -> None:
+    """Schreibt beim Beenden des Prozesses noch wartende Matches."""
+    if _writer is not None:
+        _writer.stop(timeout=30)
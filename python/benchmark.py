@@ -0,0 +1,253 @@
+"""Micro-Benchmarks für Extraktion und Speicherung mit generierten Matches (matchGenerator.py).
+
+Gemessen werden correct_data, jede extract_*-Funktion, extract_data komplett, extract_data_batch
+(NumPy) für einen Block von BATCH_SIZE Matches und optional write_match gegen eine lokale
+Datenbank. Verglichen wird die schnellste Stichprobe (min_ms) mit der gespeicherten Baseline
+(benchmark_baseline.json), da sie am wenigsten von anderer Last abhängt. Verschlechterungen über der Toleranz werden markiert; --check bewertet nur Stufen ab
+MIN_GATED_MS, bei kürzeren Stufen liegt das Rauschen in der Größenordnung der Toleranz, und misst
+verdächtige Stufen erneut, bevor es mit Exit-Code 1 abbricht.
+
+Aufruf:
+    python benchmark.py                   # Vergleich mit der Baseline
+    python benchmark.py --db              # zusätzlich write_match (Datenbank aus den Env-Variablen der API)
+    python benchmark.py --save-baseline   # aktuelle Messung als Baseline speichern
+    python benchmark.py --check           # Exit-Code 1 bei Verschlechterung
+    python benchmark.py --memory 200      # Speicherbedarf von 200 extrahierten Matches (Datensätze vs. Dictionaries)
+"""
+import argparse
+import copy
+import gc
+import json
+import platform
+import statistics
+import sys
+import tracemalloc
+import uuid
+from pathlib import Path
+from time import perf_counter
+
+import extractData as ed
+from matchGenerator import generate_match
+from records import to_plain
+
+BASELINE_PATH = Path(__file__).parent / "benchmark_baseline.json"
+
+# Szenario -> Parameter für generate_match
+SCENARIOS = {
+    "regular": {"rounds": 9},
+    "overtime": {"rounds": 12, "overtime": 3, "incomplete_rounds": 1},
+}
+
+# Matches pro Aufruf von extract_data_batch (wie CHUNK_SIZE in batchExtract.py)
+BATCH_SIZE = 16
+
+# Team, unter dem write_match die Benchmark-Matches schreibt (alles wird zurückgerollt)
+BENCH_TEAM_ID = -1
+
+# Nur Stufen, deren Baseline mindestens so lange dauert, führen bei --check zum Fehler
+MIN_GATED_MS = 1.0
+# So oft misst --check verdächtige Benchmarks erneut
+RECHECKS = 2
+
+def prepare(match: dict) -> dict:
+    """Zwischenergebnisse der Pipeline, damit jede Stufe einzeln gemessen werden kann."""
+    data = ed.correct_data(copy.deepcopy(match))
+    player_data = ed.extract_player_data(data)
+    events_data = ed.extract_events_data(data, player_data)
+    round_index = ed.build_round_index(data, events_data)
+    player_rounds_data = ed.extract_player_rounds_data(data, round_index)
+    return {"data": data,
+            "player_data": player_data,
+            "events_data": events_data,
+            "round_index": round_index,
+            "player_rounds_data": player_rounds_data,
+            "match_data": ed.extract_match_data(data)}
+
+def extraction_benchmarks(match: dict) -> dict:
+    """Name -> (setup, fn). setup() liefert ungemessen frische Argumente für fn."""
+    state = prepare(match)
+    benchmarks = {
+        "correct_data": (lambda: (copy.deepcopy(match),), ed.correct_data),
+        "extract_match_data": (lambda: (state["data"],), ed.extract_match_data),
+        "extract_player_data": (lambda: (state["data"],), ed.extract_player_data),
+        "extract_events_data": (lambda: (copy.deepcopy(state["data"]), state["player_data"]), ed.extract_events_data),
+        "build_round_index": (lambda: (state["data"], state["events_data"]), ed.build_round_index),
+        "extract_rounds_data": (lambda: (state["data"], state["round_index"]), ed.extract_rounds_data),
+        "extract_player_rounds_data": (lambda: (state["data"], state["round_index"]), ed.extract_player_rounds_data),
+        "extract_player_match_data": (lambda: (state["data"], state["player_rounds_data"], state["match_data"],
+                                               state["player_data"], state["round_index"]),
+                                      ed.extract_player_match_data),
+        "extract_data": (lambda: (copy.deepcopy(match),), ed.extract_data),
+    }
+    try:
+        import numpy  # noqa: F401
+        from extractVectorized import extract_data_batch
+        # Das NumPy-Backend nur für Batches, gemessen wird ein ganzer Block wie in batchExtract.py
+        benchmarks[f"extract_data_batch[{BATCH_SIZE}]"] = (
+            lambda: ([copy.deepcopy(match) for _ in range(BATCH_SIZE)],), extract_data_batch)
+    except ImportError:
+        pass
+    return benchmarks
+
+def save_benchmark(match: dict):
+    """Schreibpfad von save_match (Duplikat-Prüfung und write_match) in einer Transaktion,
+    die danach zurückgerollt wird. So bleiben keine Benchmark-Zeilen in der Datenbank."""
+    from db_functions import get_connection, match_exists, write_match, prepare_partitions
+
+    extracted = ed.extract_data(copy.deepcopy(match))
+    prepare_partitions([extracted["match_data"].get("timestamp")])
+
+    def setup():
+        data = copy.deepcopy(extracted)
+        match_id = str(uuid.uuid4())
+        data["match_data"]["match_id"] = match_id
+        for table in ("rounds_data", "player_match_data"):
+            rows = data[table] if isinstance(data[table], list) else data[table].values()
+            for row in rows:
+                row["match_id"] = match_id
+        return data, BENCH_TEAM_ID
+
+    def write(data: dict, team_id: int):
+        with get_connection() as con:
+            try:
+                with con.cursor() as cur:
+                    match_exists(cur, data["match_data"]["match_id"])
+                    write_match(cur, data, team_id)
+            finally:
+                con.rollback()
+    return setup, write
+
+def measure(setup, fn, number: int, repeat: int) -> dict:
+    """Misst `repeat` Stichproben zu je `number` Aufrufen und gibt Zeiten pro Aufruf in ms zurück.
+    Wie bei timeit läuft die Garbage Collection während der Messung nicht."""
+    samples = []
+    for _ in range(repeat):
+        args = [setup() for _ in range(number)]
+        gc.collect()
+        gc.disable()
+        try:
+            start = perf_counter()
+            for arguments in args:
+                fn(*arguments)
+            samples.append((perf_counter() - start) / number * 1000)
+        finally:
+            gc.enable()
+    return {"median_ms": round(statistics.median(samples), 4), "min_ms": round(min(samples), 4)}
+
+def collect(db: bool) -> dict[str, tuple]:
+    """Alle Benchmarks: "Szenario/Name" -> (setup, fn, Datenbank-Benchmark)."""
+    benchmarks = {}
+    for scenario, params in SCENARIOS.items():
+        match = generate_match(seed=1, **params)
+        scenario_benchmarks = extraction_benchmarks(match)
+        if db:
+            scenario_benchmarks["write_match"] = save_benchmark(match)
+        for name, (setup, fn) in scenario_benchmarks.items():
+            benchmarks[f"{scenario}/{name}"] = (setup, fn, name == "write_match")
+    return benchmarks
+
+def run(benchmarks: dict[str, tuple], number: int, repeat: int) -> dict[str, dict]:
+    results = {}
+    for name, (setup, fn, db_bench) in benchmarks.items():
+        results[name] = measure(setup, fn, max(number // 4, 1) if db_bench else number,
+                                max(repeat // 3, 3) if db_bench else repeat)
+    return results
+
+def retained_bytes(matches: list[dict], convert) -> int:
+    """Speicher, den die extrahierten Matches nach convert belegen (nur noch lebende Objekte)."""
+    inputs = [copy.deepcopy(match) for match in matches]
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        extracted = [convert(ed.extract_data(match)) for match in inputs]
+        inputs.clear()
+        size = tracemalloc.get_traced_memory()[0] - before
+        del extracted
+        return size
+    finally:
+        tracemalloc.stop()
+
+def memory(count: int) -> dict[str, int]:
+    """Bytes pro extrahiertem Match, als Datensätze (records.py) und als reine Dictionaries."""
+    matches = [generate_match(seed=seed, **SCENARIOS["regular"]) for seed in range(count)]
+    return {"records": retained_bytes(matches, lambda data: data) // count,
+            "dicts": retained_bytes(matches, to_plain) // count}
+
+def machine() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine()}
+
+def compare(result: dict, reference: dict, tolerance: float) -> tuple[float, str]:
+    """Veränderung von min_ms gegenüber der Baseline und Markierung: "!" bewertet, "?" zu kurz zum Bewerten."""
+    change = result["min_ms"] / reference["min_ms"] - 1
+    if change <= tolerance:
+        return change, ""
+    return change, "!" if reference["min_ms"] >= MIN_GATED_MS else "?"
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Namen der bewerteten Benchmarks, die sich über die Toleranz verschlechtert haben."""
+    return [name for name, result in results.items()
+            if name in baseline and compare(result, baseline[name], tolerance)[1] == "!"]
+
+def recheck(benchmarks: dict[str, tuple], results: dict, baseline: dict, tolerance: float,
+            number: int, repeat: int) -> None:
+    """Misst verdächtige Benchmarks bis zu RECHECKS-mal erneut und behält jeweils das kleinere min_ms.
+    Eine Verschlechterung zählt nur, wenn sie sich in jeder Wiederholung bestätigt."""
+    for _ in range(RECHECKS):
+        suspects = regressions(results, baseline, tolerance)
+        if not suspects:
+            return
+        for name, result in run({name: benchmarks[name] for name in suspects}, number, repeat).items():
+            results[name] = {"median_ms": result["median_ms"],
+                             "min_ms": min(result["min_ms"], results[name]["min_ms"])}
+
+def report(results: dict, baseline: dict, tolerance: float) -> None:
+    """Gibt die Tabelle aus. Verglichen wird min_ms, "?" markiert Stufen unter MIN_GATED_MS."""
+    print(f"{'benchmark':45} {'median ms':>10} {'min ms':>10} {'baseline':>10} {'change':>8}")
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference:
+            change, flag = compare(result, reference, tolerance)
+            compared = f"{reference['min_ms']:10.3f} {change:+7.1%}{' ' + flag if flag else ''}"
+        else:
+            compared = f"{'-':>10} {'-':>8}"
+        print(f"{name:45} {result['median_ms']:10.3f} {result['min_ms']:10.3f} {compared}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks für extractData und write_match.")
+    parser.add_argument("--number", type=int, default=20, help="Aufrufe pro Stichprobe")
+    parser.add_argument("--repeat", type=int, default=15, help="Anzahl der Stichproben")
+    parser.add_argument("--db", action="store_true", help="write_match gegen die Datenbank messen (mit Rollback)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="erlaubte Verschlechterung (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Ergebnis als Baseline speichern")
+    parser.add_argument("--check", action="store_true", help="Exit-Code 1 bei Verschlechterung")
+    parser.add_argument("--memory", type=int, metavar="MATCHES",
+                        help="nur den Speicherbedarf so vieler extrahierter Matches messen")
+    args = parser.parse_args()
+
+    if args.memory:
+        usage = memory(args.memory)
+        for name, size in usage.items():
+            print(f"{name:10} {size / 1024:10.1f} KiB pro Match")
+        print(f"Ersparnis: {1 - usage['records'] / usage['dicts']:.1%}")
+        sys.exit(0)
+
+    benchmarks = collect(args.db)
+    results = run(benchmarks, args.number, args.repeat)
+    stored = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    if stored.get("machine") and stored["machine"] != machine():
+        print(f"Hinweis: Baseline wurde auf einem anderen System gemessen ({stored['machine']['platform']})")
+    baseline = stored.get("results", {})
+    if args.check:
+        recheck(benchmarks, results, baseline, args.tolerance, args.number, args.repeat)
+    report(results, baseline, args.tolerance)
+    regressed = regressions(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        merged = {**stored.get("results", {}), **results}
+        BASELINE_PATH.write_text(json.dumps({"machine": machine(), "results": merged}, indent=4) + "\n")
+        print(f"Baseline gespeichert: {BASELINE_PATH}")
+    if regressed:
+        print(f"Verschlechtert (> {args.tolerance:.0%}): {', '.join(regressed)}")
+        if args.check:
+            sys.exit(1)
@@ -0,0 +1,328 @@
+"""Export der Matches eines Teams als CSV, NDJSON, Arrow oder Parquet.
+
+Die Zeilen kommen per COPY (...) TO STDOUT direkt aus Postgres. COPY läuft in einem eigenen
+Thread und schreibt Blöcke in eine begrenzte Queue, aus der export_stream liest. So liegt nie
+der ganze Export im Speicher, und ein langsamer Client bremst COPY statt Speicher zu füllen.
+
+Arrow und Parquet brauchen pyarrow (optional). Sie werden aus dem CSV-Stream von COPY gebaut,
+die Spaltentypen kommen aus Postgres, nicht aus der Typ-Erkennung von pyarrow.
+
+Aufruf:
+    python bulkExport.py events --team-id 6 --from 2025-01-01 --to 2025-03-31 --format parquet -o events.parquet
+"""
+import io
+import logging
+import queue
+import threading
+
+from db_functions import get_connection
+
+# Tabelle -> (Abfrage, match_timestamp-Spalte einer partitionierten Tabelle für den Zeitraum)
+EXPORT_TABLES = {
+    "matches": ("""SELECT m.*
+                   FROM Matches m
+                   WHERE {where}
+                   ORDER BY m.timestamp, m.match_id""", None),
+    "rounds": ("""SELECT r.*
+                  FROM Rounds r
+                  INNER JOIN Matches m ON m.match_id = r.match_id
+                  WHERE {where}
+                  ORDER BY r.id""", None),
+    "player_matches": ("""SELECT p.ubisoft_id, p.username, pm.*
+                          FROM PlayerMatch pm
+                          INNER JOIN Matches m ON m.match_id = pm.match_id
+                          INNER JOIN Player p ON p.id = pm.player_id
+                          WHERE {where}
+                          ORDER BY pm.id""", None),
+    "player_rounds": ("""SELECT r.match_id, r.round_number, p.ubisoft_id, p.username, pr.*
+                         FROM PlayerRound pr
+                         INNER JOIN Rounds r ON r.id = pr.round_id
+                         INNER JOIN Matches m ON m.match_id = r.match_id
+                         INNER JOIN Player p ON p.id = pr.player_id
+                         WHERE {where}
+                         ORDER BY pr.id""", "pr.match_timestamp"),
+    "events": ("""SELECT r.match_id, r.round_number, actor.ubisoft_id AS player_ubisoft_id,
+                         target.ubisoft_id AS target_ubisoft_id, e.*
+                  FROM Events e
+                  INNER JOIN Rounds r ON r.id = e.round_id
+                  INNER JOIN Matches m ON m.match_id = r.match_id
+                  LEFT JOIN Player actor ON actor.id = e.player_id
+                  LEFT JOIN Player target ON target.id = e.target_player_id
+                  WHERE {where}
+                  ORDER BY e.id""", "e.match_timestamp"),
+}
+
+# Format -> (Content-Type, Dateiendung)
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+CHUNK_SIZE = 256 * 1024
+QUEUE_CHUNKS = 16
+# Zeilen pro Parquet Row Group
+PARQUET_ROW_GROUP = 128 * 1024
+
+class ExportError(ValueError):
+    """Ungültige Tabelle oder ein Format, das auf dem Server nicht verfügbar ist."""
+
+def check_export(table: str, export_format: str) -> None:
+    """Prüft Tabelle und Format vor dem Start des Streams. Wirft ExportError."""
+    if table not in EXPORT_TABLES:
+        raise ExportError(f"Unknown table {table!r}, expected one of {', '.join(EXPORT_TABLES)}")
+    if export_format not in FORMATS:
+        raise ExportError(f"Unknown format {export_format!r}, expected one of {', '.join(FORMATS)}")
+    if export_format in ("arrow", "parquet"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError(f"Format {export_format} requires pyarrow")
+
+def export_query(cur, table: str, team_id: int, date_from=None, date_to=None) -> str:
+    """SELECT der Tabelle für das Team und den Zeitraum [date_from, date_to), Werte eingesetzt."""
+    query, partition_column = EXPORT_TABLES[table]
+    conditions = ["m.team_id = %(team_id)s"]
+    params = {"team_id": team_id, "date_from": date_from, "date_to": date_to}
+    for bound, operator in (("date_from", ">="), ("date_to", "<")):
+        if params[bound] is None:
+            continue
+        conditions.append(f"m.timestamp {operator} %({bound})s")
+        if partition_column:
+            conditions.append(f"{partition_column} {operator} %({bound})s")
+    # COPY kennt keine Parameter, deshalb mit mogrify einsetzen
+    return cur.mogrify(query.format(where=" AND ".join(conditions)), params).decode()
+
+class _QueueWriter:
+    """Datei-Objekt für copy_expert: sammelt die Zeilen zu Blöcken und legt sie in die Queue."""
+
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.buffer = bytearray()
+
+    def write(self, data) -> int:
+        if self.cancelled.is_set():
+            raise InterruptedError("Export cancelled")
+        self.buffer += data.encode() if isinstance(data, str) else data
+        if len(self.buffer) >= CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self) -> None:
+        if self.buffer:
+            self._put(bytes(self.buffer))
+            self.buffer.clear()
+
+    def _put(self, item) -> None:
+        # Nicht endlos blockieren, wenn der Leser aufgegeben hat
+        while not self.cancelled.is_set():
+            try:
+                self.chunks.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+        raise InterruptedError("Export cancelled")
+
+class _QueueReader(io.RawIOBase):
+    """Lesbarer Stream über die Blöcke aus der Queue (für den CSV-Reader von pyarrow)."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.pending:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.pending = chunk
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+def copy_chunks(copy_sql_for):
+    """Führt COPY in einem Thread aus und gibt die Ausgabe in Blöcken zurück.
+
+    Args:
+        copy_sql_for: Funktion(cur) -> COPY-Befehl, wird auf der Export-Verbindung aufgerufen.
+
+    Raises:
+        Exception: Fehler von COPY werden beim Lesen erneut ausgelöst.
+    """
+    chunks = queue.Queue(maxsize=QUEUE_CHUNKS)
+    cancelled = threading.Event()
+    done = object()
+    errors = []
+
+    def produce():
+        writer = _QueueWriter(chunks, cancelled)
+        try:
+            with get_connection() as con:
+                try:
+                    with con.cursor() as cur:
+                        cur.copy_expert(copy_sql_for(cur), writer)
+                    con.rollback()
+                except BaseException:
+                    if cancelled.is_set():
+                        # COPY wurde mittendrin abgebrochen, die Verbindung nicht wiederverwenden
+                        con.close()
+                    raise
+            writer.flush()
+        except BaseException as e:
+            if not cancelled.is_set():
+                errors.append(e)
+        finally:
+            try:
+                writer._put(done)
+            except InterruptedError:
+                pass
+
+    thread = threading.Thread(target=produce, name="export-copy", daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                break
+            yield chunk
+        if errors:
+            raise errors[0]
+    finally:
+        cancelled.set()
+        thread.join()
+
+def column_schema(table: str, team_id: int):
+    """Arrow-Schema der Export-Abfrage aus den Postgres-Typen der Spalten."""
+    import pyarrow as pa
+
+    types = {16: pa.bool_(), 20: pa.int64(), 21: pa.int16(), 23: pa.int32(), 700: pa.float32(),
+             701: pa.float64(), 1114: pa.timestamp("us"), 1184: pa.timestamp("us", tz="UTC"), 1082: pa.date32()}
+    with get_connection() as con:
+        with con.cursor() as cur:
+            cur.execute(f"SELECT * FROM ({export_query(cur, table, team_id)}) export LIMIT 0;")
+            description = cur.description
+        con.rollback()
+    return pa.schema([(column.name, types.get(column.type_code, pa.string())) for column in description])
+
+def export_stream(table: str, team_id: int, export_format: str = "csv", date_from=None, date_to=None):
+    """Gibt den Export als Folge von bytes-Blöcken zurück (z.B. für eine Chunked-Response).
+
+    Args:
+        table (str): Schlüssel aus EXPORT_TABLES.
+        export_format (str): Schlüssel aus FORMATS.
+        date_from, date_to: Halboffener Zeitraum der Matches, None = unbegrenzt.
+
+    Raises:
+        ExportError: Tabelle oder Format ungültig (vor dem ersten Block).
+    """
+    check_export(table, export_format)
+    if export_format == "ndjson":
+        # CSV ohne Quoting: row_to_json enthält weder \x01/\x02 noch Zeilenumbrüche
+        options = "FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02'"
+        row = "row_to_json(export)"
+    else:
+        options = "FORMAT csv, HEADER" if export_format == "csv" else "FORMAT csv"
+        row = "export.*"
+
+    def copy_sql(cur) -> str:
+        query = export_query(cur, table, team_id, date_from, date_to)
+        return f"COPY (SELECT {row} FROM ({query}) export) TO STDOUT WITH ({options});"
+
+    chunks = copy_chunks(copy_sql)
+    if export_format in ("csv", "ndjson"):
+        return chunks
+    return _arrow_stream(chunks, column_schema(table, team_id), export_format)
+
+def _arrow_stream(chunks, schema, export_format: str):
+    """Wandelt den CSV-Stream von COPY in Arrow-IPC oder Parquet um."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    sink = _DrainSink()
+    reader = pa_csv.open_csv(
+        _QueueReader(chunks),
+        read_options=pa_csv.ReadOptions(column_names=schema.names, block_size=CHUNK_SIZE),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(column_types=schema, true_values=["t"], false_values=["f"],
+                                              null_values=[""], strings_can_be_null=True,
+                                              quoted_strings_can_be_null=False))
+    if export_format == "arrow":
+        writer = pa.ipc.new_stream(sink, schema)
+        for batch in reader:
+            writer.write_batch(batch)
+            yield sink.drain()
+        writer.close()
+    else:
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        pending, rows = [], 0
+        for batch in reader:
+            pending.append(batch)
+            rows += batch.num_rows
+            if rows >= PARQUET_ROW_GROUP:
+                writer.write_table(pa.Table.from_batches(pending, schema))
+                pending, rows = [], 0
+                yield sink.drain()
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending, schema))
+        writer.close()
+    yield sink.drain()
+
+class _DrainSink(io.RawIOBase):
+    """Ausgabe für die pyarrow-Writer, deren Inhalt nach jedem Batch abgeholt wird."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    from analytics import parse_date_range
+
+    parser = argparse.ArgumentParser(description="Exportiert Matches eines Teams aus der Datenbank.")
+    parser.add_argument("table", choices=list(EXPORT_TABLES))
+    parser.add_argument("--team-id", type=int, required=True)
+    parser.add_argument("--from", dest="date_from", help="erstes Datum (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="letztes Datum (YYYY-MM-DD), inklusiv")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv")
+    parser.add_argument("-o", "--output", help="Zieldatei, Standard ist stdout")
+    args = parser.parse_args()
+
+    try:
+        date_from, date_to = parse_date_range({"from": args.date_from, "to": args.date_to})
+        stream = export_stream(args.table, args.team_id, args.format, date_from, date_to)
+    except ValueError as e:
+        parser.error(str(e))
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for block in stream:
+            output.write(block)
+    except Exception as e:
+        logging.error(f"Export failed: {e}")
+        sys.exit(1)
+    finally:
+        if args.output:
+            output.close()
@@ -0,0 +1,97 @@
+"""Prüft mit EXPLAIN, welche Abfragen der API noch sequentielle Scans brauchen.
+
+Auf einer kleinen Testdatenbank bevorzugt der Planer Seq Scans auch dann, wenn ein Index
+existiert. Deshalb wird mit enable_seqscan = off geplant: Ein Seq Scan, der dann noch im
+Plan steht, bedeutet, dass kein passender Index vorhanden ist.
+
+Aufruf (auf einer Datenbank mit mindestens einem Match): python checkQueries.py
+"""
+import json
+import sys
+
+from analytics import REPORTS, parse_filters, report_query
+from db_functions import transaction
+
+# (Name, Abfrage); Platzhalter werden mit Werten aus der Datenbank gefüllt
+QUERIES = [
+    ("get_all_player",
+     """SELECT username, ubisoft_id FROM PlayerIdentity WHERE team_id = %(team_id)s ORDER BY username;"""),
+    ("player_career",
+     """SELECT * FROM PlayerCareer WHERE team_id = %(team_id)s ORDER BY ubisoft_id;"""),
+    ("match_exists",
+     """SELECT match_id FROM Matches WHERE match_id = %(match_id)s;"""),
+    ("match rounds",
+     """SELECT * FROM Rounds WHERE match_id = %(match_id)s ORDER BY round_number;"""),
+    ("match player rounds",
+     """SELECT pr.* FROM PlayerRound pr INNER JOIN Rounds r ON r.id = pr.round_id
+        WHERE r.match_id = %(match_id)s;"""),
+    ("match events",
+     """SELECT e.* FROM Events e INNER JOIN Rounds r ON r.id = e.round_id
+        WHERE r.match_id = %(match_id)s;"""),
+    ("match scoreboard",
+     """SELECT p.username, pm.* FROM PlayerMatch pm INNER JOIN Player p ON p.id = pm.player_id
+        WHERE pm.match_id = %(match_id)s;"""),
+    ("player history",
+     """SELECT pm.* FROM PlayerMatch pm INNER JOIN Player p ON p.id = pm.player_id
+        WHERE p.ubisoft_id = %(ubisoft_id)s;"""),
+    ("player latest name",
+     """SELECT username FROM Player WHERE ubisoft_id = %(ubisoft_id)s ORDER BY timestamp DESC LIMIT 1;"""),
+    ("player rounds",
+     """SELECT pr.* FROM PlayerRound pr WHERE pr.player_id = %(player_id)s;"""),
+    ("events in month",
+     """SELECT e.type, COUNT(*) FROM Events e
+        WHERE e.match_timestamp >= date_trunc('month', %(timestamp)s::timestamp)
+          AND e.match_timestamp < date_trunc('month', %(timestamp)s::timestamp) + interval '1 month'
+        GROUP BY e.type;"""),
+    ("player events",
+     """SELECT e.* FROM Events e WHERE e.player_id = %(player_id)s OR e.target_player_id = %(player_id)s;"""),
+]
+
+def sample_params(cur) -> dict | None:
+    """Werte für die Platzhalter aus einem beliebigen gespeicherten Match."""
+    cur.execute("""SELECT m.match_id, m.team_id, p.id, p.ubisoft_id, m.timestamp
+                   FROM Matches m INNER JOIN Player p ON p.id = m.player_id
+                   LIMIT 1;""")
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip(("match_id", "team_id", "player_id", "ubisoft_id", "timestamp"), row))
+
+def seq_scans(plan: dict) -> list[str]:
+    """Alle Tabellen, die im Plan (rekursiv) per Seq Scan gelesen werden."""
+    relations = [plan["Relation Name"]] if plan.get("Node Type") == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        relations += seq_scans(child)
+    return relations
+
+def check_queries() -> dict[str, list[str]] | None:
+    """Gibt pro Abfrage die Tabellen mit Seq Scan zurück, None bei leerer Datenbank."""
+    with transaction() as cur:
+        params = sample_params(cur)
+        if params is None:
+            return None
+        cur.execute("SET LOCAL enable_seqscan = off;")
+        result = {}
+        for name, query in QUERIES:
+            cur.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+            plan = cur.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            result[name] = seq_scans(plan[0]["Plan"])
+        # Analyse-Endpunkte mit Zeitraum (Monat des Beispiel-Matches)
+        month = params["timestamp"].strftime("%Y-%m") if params["timestamp"] else "1970-01"
+        filters = parse_filters({"from": f"{month}-01", "to": f"{month}-28"})
+        for name in REPORTS:
+            query, report_params = report_query(name, params["team_id"], filters)
+            cur.execute(f"EXPLAIN (FORMAT JSON) {query}", report_params)
+            result[f"analytics {name}"] = seq_scans(cur.fetchone()[0][0]["Plan"])
+        return result
+
+if __name__ == "__main__":
+    result = check_queries()
+    if result is None:
+        print("Keine Matches in der Datenbank, bitte zuerst Daten importieren.")
+        sys.exit(2)
+    for name, relations in result.items():
+        print(f"{'SEQ SCAN' if relations else 'ok':8}  {name}{': ' + ', '.join(relations) if relations else ''}")
+    sys.exit(1 if any(result.values()) else 0)
@@ -1,15 +1,191 @@
 ##### Datenbank-Abfragen
-import psycopg2
+import atexit
+import threading
+import time
+from contextlib import contextmanager
 
-from vars import DB_LOGIN
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.extras import execute_values
+
+from playerCareer import upsert_player_career
+from playerIdentity import upsert_player_identity, invalidate_players
+from knownMatches import is_known, remember_matches
+from partitions import missing_months, create_month_partitions, mark_months_ready, NO_TIMESTAMP
+from rawArchive import store_raw_match
+from records import as_records
+from metrics import DB_WRITE_DURATION, POOL_WAIT_DURATION, Gauge, Stopwatch
+from vars import DB_LOGIN, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT, DB_POOL_HEALTHCHECK_INTERVAL
 import logging
 import flask as f
 
+class PoolTimeout(Exception):
+    """Innerhalb des Timeouts wurde keine Verbindung frei."""
+
+class ConnectionPool:
+    """Thread-sicherer Pool von psycopg2-Verbindungen.
+
+    Args:
+        dsn (str): Verbindungsstring für psycopg2.connect.
+        min_size (int): Anzahl der Verbindungen, die offen gehalten werden.
+        max_size (int): Maximale Anzahl gleichzeitig ausgegebener Verbindungen.
+        timeout (float): Sekunden, die beim Ausleihen höchstens gewartet wird.
+        healthcheck_interval (float): Verbindungen, die länger ungenutzt waren,
+            werden vor der Ausgabe mit "SELECT 1" geprüft.
+    """
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10,
+                 timeout: float = 30.0, healthcheck_interval: float = 30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []  # (connection, zuletzt zurückgegeben)
+        self._in_use = 0
+        self._closed = False
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        return psycopg2.connect(self.dsn)
+
+    def _is_healthy(self, con, idle_since: float) -> bool:
+        if con.closed:
+            return False
+        if time.monotonic() - idle_since < self.healthcheck_interval:
+            return True
+        try:
+            with con.cursor() as cur:
+                cur.execute("SELECT 1;")
+            con.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Leiht eine geprüfte Verbindung aus. Wirft PoolTimeout, wenn keine frei wird."""
+        if self._closed:
+            raise PoolTimeout("Connection pool is closed")
+        with POOL_WAIT_DURATION.time():
+            return self._checkout()
+
+    def _checkout(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No database connection available within {self.timeout}s")
+        try:
+            while True:
+                with self._lock:
+                    con, idle_since = self._idle.pop() if self._idle else (None, None)
+                if con is None:
+                    con = self._connect()
+                elif not self._is_healthy(con, idle_since):
+                    logging.warning("Discarding broken database connection from pool")
+                    self._discard(con)
+                    continue
+                with self._lock:
+                    self._in_use += 1
+                return con
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, con) -> None:
+        """Gibt eine Verbindung zurück. Offene Transaktionen werden zurückgerollt."""
+        with self._lock:
+            self._in_use -= 1
+        try:
+            if not con.closed and con.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                con.rollback()
+        except psycopg2.Error:
+            self._discard(con)
+        else:
+            with self._lock:
+                keep = not self._closed and not con.closed
+                if keep:
+                    self._idle.append((con, time.monotonic()))
+            if not keep:
+                self._discard(con)
+        finally:
+            self._slots.release()
+
+    def _discard(self, con) -> None:
+        try:
+            con.close()
+        except psycopg2.Error:
+            pass
+
+    def close(self) -> None:
+        """Schließt alle freien Verbindungen; ausgeliehene werden bei Rückgabe geschlossen."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for con, _ in idle:
+            self._discard(con)
+
+    def stats(self) -> dict:
+        """Anzahl ausgeliehener und freier Verbindungen."""
+        with self._lock:
+            return {"in_use": self._in_use, "idle": len(self._idle)}
+
+    @contextmanager
+    def connection(self):
+        """Leiht eine Verbindung für die Dauer des with-Blocks aus."""
+        con = self.getconn()
+        try:
+            yield con
+        finally:
+            self.putconn(con)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Gibt den Pool des Prozesses zurück und legt ihn beim ersten Aufruf an."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_LOGIN, DB_POOL_MIN, DB_POOL_MAX,
+                                       DB_POOL_TIMEOUT, DB_POOL_HEALTHCHECK_INTERVAL)
+    return _pool
+
+@atexit.register
+def close_pool() -> None:
+    """Schließt den Pool, z.B. beim Beenden des Prozesses."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+Gauge("r6_db_pool_connections", "Pooled database connections by state",
+      lambda: _pool.stats() if _pool is not None else None, label="state")
+
+@contextmanager
+def get_connection():
+    """Leiht eine Verbindung aus dem Pool für die Dauer des with-Blocks aus."""
+    with get_pool().connection() as con:
+        yield con
+
+@contextmanager
+def transaction():
+    """Cursor auf einer Pool-Verbindung innerhalb einer Transaktion.
+
+    Commit beim Verlassen des Blocks, Rollback bei jeder Exception (auch f.abort).
+    """
+    with get_connection() as con:
+        with con, con.cursor() as cur:
+            yield cur
+
 def fetch_data(query: str, columns: list[str], params: tuple = None) -> tuple[list[dict] | None, None | str]:
     """Führt eine SQL-Abfrage aus und gibt die Ergebnisse zurück."""
     try:
-        with psycopg2.connect(DB_LOGIN) as con:
-            cur = con.cursor()
+        with transaction() as cur:
             cur.execute(query, params)
             rows = cur.fetchall()
             result = [dict(zip(columns, row)) for row in rows]
@@ -20,301 +196,379 @@ def fetch_data(query: str, columns: list[str], params: tuple = None) -> tuple[li
 def execute_query(query: str, params: tuple = None) -> tuple[bool, str | None]:
     """Führt SQL-Befehle aus, die keine Ergebnisse zurückgeben (CREATE, INSERT, UPDATE, DELETE)"""
     try:
-        with psycopg2.connect(DB_LOGIN) as con:
-            cur = con.cursor()
+        with transaction() as cur:
             cur.execute(query, params)
-            con.commit()
             return True, None
     except Exception as e:
         return False, str(e)
 
-def save_match(data: dict, team_id: int) -> tuple[str | None, None | int]:
+def save_match(data: dict, team_id: int, raw: tuple[str, bytes, int | None] | None = None) -> tuple[str | None, None | int]:
     """Speichert alle Daten eines Matches in der Datenbank.
+
+    Alle Tabellen werden über eine Verbindung in einer Transaktion geschrieben,
+    je Tabelle mit einem einzigen mehrzeiligen INSERT.
+
     Args:
         data (dict): Ein Dictionary mit allen Match-Daten. Siehe extractData.py für das Format.
         team_id (int): Die ID des Teams, dem das Match zugeordnet werden soll.
+        raw (tuple[str, bytes, int | None] | None): Das Rohdokument aus rawArchive.encode_document, wird in RawMatch archiviert.
     
     Returns:
         tuple[str | None, None | int]: Eine Erfolgsmeldung und der HTTP-Statuscode oder None und ein Fehlercode.
     """
+    match_id = data["match_data"].get("match_id")
+    prepare_partitions([data["match_data"].get("timestamp")])
+    try:
+        with transaction() as cur:
+            # region Check if Match already exists
+            try:
+                existing_match_id = match_exists(cur, match_id)
+            except psycopg2.Error as e:
+                logging.error(f"Database error during match existence check: {e}")
+                f.abort(500, description="Internal Server Error")
 
-    success, error = execute_query("BEGIN TRANSACTION;")
-    if error:
-        logging.error(f"Database error during initialization [BEGIN TRANSACTION]: {error}")
+            if existing_match_id:
+                logging.info(f"Match {match_id} already exists with ID {existing_match_id}.")
+                remember_matches([existing_match_id])
+                data["match_data"]["match.id"] = existing_match_id
+                f.abort(409, description="Conflict: Match already exists.")
+            logging.info(f"Match {match_id} does not exist yet.")
+            # endregion
+
+            write_match(cur, data, team_id, raw)
+            commit_start = time.perf_counter()
+        DB_WRITE_DURATION.observe(time.perf_counter() - commit_start, region="commit")
+    except (psycopg2.Error, PoolTimeout) as e:
+        logging.error(f"Database error during connect/commit: {e}")
         f.abort(500, description="Internal Server Error")
+    invalidate_players([team_id])
+    remember_matches([match_id])
+    return "Database initialized successfully.", 200
 
-    # region Check if Match already exists
-    match_id = data["match_data"].get("match_id")
-    query = "SELECT match_id FROM Matches WHERE match_id = %s;"
-    params = (match_id,)
-    result, error = fetch_data(query, ['match_id'], params)
-    if error:
-        logging.error(f"Database error during match existence check: {error}")
-        execute_query("ROLLBACK;")
-        f.abort(500, description="Internal Server Error")
+MATCH_DATA_KEYS = ("match_data", "player_data", "rounds_data",
+                   "player_rounds_data", "player_match_data", "events_data")
 
-    if result:  # Wenn Liste nicht leer ist
-        logging.info(f"Match {match_id} already exists with ID {result[0]['match_id']}.")
-        data["match_data"]["match.id"] = result[0]['match_id']
-        f.abort(409, description="Conflict: Match already exists.")
-    else:  # Wenn Liste leer ist (Match existiert nicht)
-        logging.info(f"Match {match_id} does not exist yet.")
-        execute_query("ROLLBACK;")
-    # endregion
+def validate_match_data(data) -> str | None:
+    """Prüft die Grundstruktur eines extrahierten Matches. Gibt eine Fehlermeldung oder None zurück."""
+    if not isinstance(data, dict):
+        return "Match data must be a JSON object"
+    missing = [key for key in MATCH_DATA_KEYS if key not in data]
+    if missing:
+        return f"Missing keys: {', '.join(missing)}"
+    if not data["match_data"].get("match_id"):
+        return "Missing match_data.match_id"
+    return None
 
-    # region Save Player
-    for ubisoft_id, player_data in data["player_data"].items():
-        query = """
-            INSERT INTO player (ubisoft_id, username, timestamp, team_id)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT (ubisoft_id, username, team_id) 
-            DO UPDATE SET 
-                timestamp = CASE 
-                    WHEN EXCLUDED.timestamp > Player.timestamp THEN EXCLUDED.timestamp 
-                    ELSE Player.timestamp 
-                END
-            RETURNING id;
-        """
-
-        params = (
-            player_data.get('ubisoft_id'),
-            player_data.get('username'), 
-            player_data.get('timestamp'),
-            team_id
-        )
-
-        result, error = fetch_data(query, ['id'], params)
-        if error:
-            logging.error(f"Database error during player insert/update: {error}")
-            execute_query("ROLLBACK;")
-            f.abort(500, description="Internal Server Error")
+def save_matches(matches: list[tuple]) -> list[str]:
+    """Speichert mehrere Matches in einer gemeinsamen Transaktion.
 
-        player_id = result[0]['id'] if result else None
-        
-        if not player_id:
-            logging.error(f"Failed to retrieve player ID after insert/update for Ubisoft ID {player_data.get('ubisoft_id')}")
-            execute_query("ROLLBACK;")
-            f.abort(500, description="Internal Server Error")
-        else:
-            data["player_data"][ubisoft_id]["player.id"] = player_id
-    # endregion
-
-    # region Save Match
-    match_info = data["match_data"]
-    query = """
-    INSERT INTO matches (match_id, player_id, timestamp, game_mode, map, match_type,
-    game_version, team_id, winner_team_index, team0_starting_side, prep_duration,
-    round_duration, plant_duration)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    RETURNING match_id;
-    """
+    Jedes Match läuft in einem eigenen Savepoint, ein Duplikat oder Fehler betrifft nur dieses Match.
 
-    recording_player_ubisoft_id = match_info.get("player_id")
-    recording_playerID = data["player_data"][recording_player_ubisoft_id]["player.id"]
-
-    params = (
-        match_info.get("match_id"),
-        recording_playerID,
-        match_info.get("timestamp"),
-        match_info.get("game_mode"),
-        match_info.get("map"),
-        match_info.get("match_type"),
-        match_info.get("game_version"),
-        team_id,
-        match_info.get("winner_team_index"),
-        match_info.get("team0_starting_side"),
-        match_info.get("prep_duration"),
-        match_info.get("round_duration"),
-        match_info.get("plant_duration"),
-    )
-
-    result, error = fetch_data(query, ['match_id'], params)
-
-    if error:
-        logging.error(f"Database error during match insert/update: {error}")
-        execute_query("ROLLBACK;")
+    Args:
+        matches (list[tuple]): Tupel aus Match-Daten (siehe save_match), team_id und optional
+            dem Rohdokument für RawMatch (rawArchive.encode_document).
+
+    Returns:
+        list[str]: Pro Match "inserted", "duplicate" oder "failed".
+    """
+    results = []
+    prepare_partitions(data["match_data"].get("timestamp") for data, *_ in matches)
+    try:
+        with transaction() as cur:
+            for data, team_id, *raw in matches:
+                match_id = data["match_data"].get("match_id")
+                cur.execute("SAVEPOINT save_match;")
+                try:
+                    if match_exists(cur, match_id):
+                        logging.info(f"Match {match_id} already exists.")
+                        results.append("duplicate")
+                    else:
+                        write_match(cur, data, team_id, raw[0] if raw else None)
+                        results.append("inserted")
+                    cur.execute("RELEASE SAVEPOINT save_match;")
+                except Exception as e:
+                    logging.error(f"Failed to save match {match_id}: {e}")
+                    cur.execute("ROLLBACK TO SAVEPOINT save_match;")
+                    results.append("failed")
+    except (psycopg2.Error, PoolTimeout) as e:
+        logging.error(f"Database error during batch commit: {e}")
+        return ["failed"] * len(matches)
+    invalidate_players(match[1] for match, result in zip(matches, results) if result == "inserted")
+    remember_matches(match[0]["match_data"].get("match_id")
+                     for match, result in zip(matches, results) if result != "failed")
+    return results
+
+def prepare_partitions(timestamps) -> None:
+    """Legt fehlende Monats-Partitionen für die Match-Zeitpunkte an, vor der Import-Transaktion.
+
+    Das Anlegen läuft in einer eigenen kurzen Transaktion, damit die Sperre der Elterntabellen
+    nicht bis zum Commit des Imports gehalten wird. Bei einem Fehler wird nur geloggt, der
+    Import scheitert dann am INSERT in die fehlende Partition.
+    """
+    months = missing_months(timestamps)
+    if not months:
+        return
+    try:
+        with transaction() as cur:
+            create_month_partitions(cur, months)
+    except (psycopg2.Error, PoolTimeout) as e:
+        logging.error(f"Database error while creating partitions for {sorted(months)}: {e}")
+        return
+    mark_months_ready(months)
+
+def match_exists(cur, match_id: str) -> str | None:
+    """Gibt die match_id zurück, falls das Match bereits gespeichert ist."""
+    cur.execute("SELECT match_id FROM Matches WHERE match_id = %s;", (match_id,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def load_match_ids() -> list[str] | None:
+    """Alle gespeicherten match_ids für knownMatches, None bei einem Datenbankfehler."""
+    try:
+        with transaction() as cur:
+            cur.execute("SELECT match_id FROM Matches;")
+            return [match_id for match_id, in cur.fetchall()]
+    except (psycopg2.Error, PoolTimeout) as e:
+        logging.error(f"Database error while loading known match IDs: {e}")
+        return None
+
+def known_duplicate(match_id: str | None) -> bool:
+    """Vorprüfung vor extract_data: True, wenn das Match sicher schon gespeichert ist.
+    False heißt nur "nicht bekannt", save_match prüft weiterhin in der Datenbank."""
+    return is_known(match_id, load_match_ids)
+
+def write_match(cur, data: dict, team_id: int, raw: tuple[str, bytes, int | None] | None = None) -> None:
+    """Schreibt alle Tabellen eines Matches mit dem übergebenen Cursor.
+
+    Transaktion, Duplikat-Prüfung und die Partitionen des Monats (prepare_partitions vor der
+    Transaktion) liegen beim Aufrufer. Bei einem Datenbankfehler
+    wird geloggt und mit 500 abgebrochen, der Aufrufer muss dann ein Rollback machen.
+    Die generierten IDs werden wie bisher als "player.id" / "round.id" in data eingetragen.
+    Tabellen aus Dictionaries (z.B. /upload_json) werden vorher in Datensätze umgewandelt (records.py).
+    Mit raw wird zusätzlich das Rohdokument in RawMatch archiviert (rawArchive.py).
+    """
+    as_records(data)
+    regions = Stopwatch(DB_WRITE_DURATION, "region")
+    region = regions.enter("player insert/update")
+    try:
+        # region Save Player
+        insert_players(cur, data, team_id)
+
+        region = regions.enter("player identity update")
+        upsert_player_identity(cur, data, team_id)
+        # endregion
+
+        # region Save Match
+        region = regions.enter("match insert/update")
+        match_info = data["match_data"]
+        recording_player_ubisoft_id = match_info.get("player_id")
+        recording_playerID = data["player_data"][recording_player_ubisoft_id]["player.id"]
+        cur.execute("""
+        INSERT INTO matches (match_id, player_id, timestamp, game_mode, map, match_type,
+        game_version, team_id, winner_team_index, team0_starting_side, prep_duration,
+        round_duration, plant_duration)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+        """, (
+            match_info.get("match_id"),
+            recording_playerID,
+            match_info.get("timestamp"),
+            match_info.get("game_mode"),
+            match_info.get("map"),
+            match_info.get("match_type"),
+            match_info.get("game_version"),
+            team_id,
+            match_info.get("winner_team_index"),
+            match_info.get("team0_starting_side"),
+            match_info.get("prep_duration"),
+            match_info.get("round_duration"),
+            match_info.get("plant_duration"),
+        ))
+        # endregion
+
+        # region Save rounds
+        region = regions.enter("round insert/update")
+        round_ids = insert_rounds(cur, data["rounds_data"])
+        # endregion
+
+        # region Save playerRound
+        region = regions.enter("playerRound insert/update")
+        # Partitionsschlüssel von PlayerRound und Events
+        match_timestamp = match_info.get("timestamp") or NO_TIMESTAMP
+        insert_player_rounds(cur, data, round_ids, match_timestamp)
+        # endregion
+
+        # region Save playerMatch
+        region = regions.enter("playerMatch insert/update")
+        insert_player_matches(cur, data, data["player_match_data"])
+        # endregion
+
+        # region Save Events
+        region = regions.enter("events insert/update")
+        insert_events(cur, data, round_ids, match_timestamp)
+        # endregion
+
+        # region Update PlayerCareer
+        region = regions.enter("playerCareer update")
+        upsert_player_career(cur, data, team_id)
+        # endregion
+
+        # region Archive raw match
+        if raw is not None:
+            region = regions.enter("raw match archive")
+            store_raw_match(cur, match_info.get("match_id"), team_id, raw)
+        # endregion
+    except psycopg2.Error as e:
+        logging.error(f"Database error during {region}: {e}")
         f.abort(500, description="Internal Server Error")
+    finally:
+        regions.stop()
+
+# Die insert_*-Funktionen schreiben je eine Tabelle mit einem mehrzeiligen INSERT (für write_match
+# und roundIngest.append_round). Datenbankfehler behandelt der Aufrufer.
+
+def insert_players(cur, data: dict, team_id: int) -> None:
+    """Legt die Spieler an bzw. aktualisiert deren Zeitstempel und trägt "player.id" in player_data ein."""
+    # Feste Reihenfolge nach dem Konfliktschlüssel, damit gleichzeitige Imports die Zeilen in derselben
+    # Reihenfolge sperren (sonst Deadlock mit PlayerIdentity / PlayerCareer in derselben Transaktion)
+    players = sorted(data["player_data"].values(),
+                     key=lambda player: (player.get("ubisoft_id") or "", player.get("username") or ""))
+    rows = execute_values(cur, """
+        INSERT INTO player (ubisoft_id, username, timestamp, team_id)
+        VALUES %s
+        ON CONFLICT (ubisoft_id, username, team_id) 
+        DO UPDATE SET 
+            timestamp = CASE 
+                WHEN EXCLUDED.timestamp > Player.timestamp THEN EXCLUDED.timestamp 
+                ELSE Player.timestamp 
+            END
+        RETURNING ubisoft_id, id;
+    """, [(
+        player_data.get('ubisoft_id'),
+        player_data.get('username'), 
+        player_data.get('timestamp'),
+        team_id
+    ) for player_data in players], page_size=max(len(players), 1), fetch=True)
+    player_ids = dict(rows)
 
-    else:
-        match_id = result[0]['match_id']
-    # endregion
-    
-    # region Save rounds
-    rounds_data = data["rounds_data"]
-    for i, round_data in enumerate(rounds_data):
-        query = """INSERT INTO rounds (match_id, round_number, site, winner_team_index, time_to_entry,
-        atk_team_index, def_team_index, ok_team_index, ok_refrag, clutch, win_condition)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        RETURNING id;
-        """
-
-        params = (
-            round_data.get("match_id"),
-            round_data.get("round_number"),
-            round_data.get("site"),
-            round_data.get("winner_team_index"),
-            round_data.get("time_to_entry"),
-            round_data.get("atk_team_index"),
-            round_data.get("def_team_index"),
-            round_data.get("ok_team_index"),
-            round_data.get("ok_refrag"),
-            round_data.get("clutch"),
-            round_data.get("win_condition"),
-        )
-
-        result, error = fetch_data(query, ['id'], params)
-        if error:
-            logging.error(f"Database error during round insert/update: {error}")
-            execute_query("ROLLBACK;")
+    for ubisoft_id, player_data in data["player_data"].items():
+        player_id = player_ids.get(player_data.get('ubisoft_id'))
+        if not player_id:
+            logging.error(f"Failed to retrieve player ID after insert/update for Ubisoft ID {player_data.get('ubisoft_id')}")
             f.abort(500, description="Internal Server Error")
-
-        round_id = result[0]['id'] if result else None
+        data["player_data"][ubisoft_id]["player.id"] = player_id
+
+def insert_rounds(cur, rounds_data: list) -> dict[int, int]:
+    """Schreibt die Runden, setzt db_id und gibt round_number -> Rounds.id zurück."""
+    rows = execute_values(cur, """INSERT INTO rounds (match_id, round_number, site, winner_team_index, time_to_entry,
+    atk_team_index, def_team_index, ok_team_index, ok_refrag, clutch, win_condition)
+    VALUES %s
+    RETURNING round_number, id;
+    """, [(
+        round_data.match_id,
+        round_data.round_number,
+        round_data.site,
+        round_data.winner_team_index,
+        round_data.time_to_entry,
+        round_data.atk_team_index,
+        round_data.def_team_index,
+        round_data.ok_team_index,
+        round_data.ok_refrag,
+        round_data.clutch,
+        round_data.win_condition,
+    ) for round_data in rounds_data], page_size=max(len(rounds_data), 1), fetch=True)
+    round_ids = dict(rows)
+
+    for round_data in rounds_data:
+        round_id = round_ids.get(round_data.round_number)
         if not round_id:
-            logging.error(f"Failed to retrieve round ID after insert/update for match ID {round_data.get('match_id')}")
-            execute_query("ROLLBACK;")
+            logging.error(f"Failed to retrieve round ID after insert/update for match ID {round_data.match_id}")
             f.abort(500, description="Internal Server Error")
+        round_data.db_id = round_id
+    return round_ids
 
-        rounds_data[i]["round.id"] = round_id
-    # endregion
-
-    # region Save playerRound
-    player_round_data = data["player_rounds_data"]
-    for round_dict in player_round_data:
+def insert_player_rounds(cur, data: dict, round_ids: dict[int, int], match_timestamp) -> None:
+    rows = []
+    for round_dict in data["player_rounds_data"]:
         for ubisoft_id, dic in round_dict.items():
-            query = """
-            INSERT INTO playerround (player_id, round_id, team_index, operator, spawn, kills, death,
-            headshots, plant, defuse, kostpoint, onevx, ok, od, win, atk, refrags, got_refraged)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id;
-            """
-
-            round_number = dic.get("round")
-            roundID = rounds_data[round_number - 1]["round.id"]
-            params = (
+            rows.append((
                 data["player_data"][ubisoft_id]["player.id"],
-                roundID,
-                dic.get("team_index"),
-                dic.get("operator"),
-                dic.get("spawn"),
-                dic.get("kills"),
-                dic.get("death"),
-                dic.get("headshots"),
-                dic.get("plant"),
-                dic.get("defuse"),
-                dic.get("kost"),
-                dic.get("onevx"),
-                dic.get("ok"),
-                dic.get("od"),
-                dic.get("win"),
-                dic.get("atk"),
-                dic.get("refrags"),
-                dic.get("got_refraged")
-            )
-
-            result, error = fetch_data(query, ['id'], params)
-            if error:
-                logging.error(f"Database error during playerRound insert/update: {error}")
-                execute_query("ROLLBACK;")
-                f.abort(500, description="Internal Server Error")
-
-            player_round_id = result[0]['id'] if result else None
-            if not player_round_id:
-                logging.error(f"Failed to retrieve playerRound ID after insert/update for round ID {roundID}")
-                execute_query("ROLLBACK;")
-                f.abort(500, description="Internal Server Error")
-    # endregion
-
-    # region Save playerMatch
-    player_match_data = data["player_match_data"]
-    for ubisoft_id, dic in player_match_data.items():
-        query = """
-        INSERT INTO playermatch (player_id, match_id, team_index, kills, assists, deaths,
-        headshots, kost, win, won_rounds, lost_rounds, won_atk_rounds, lost_atk_rounds,
-        won_def_rounds, lost_def_rounds, oks, oks_atk, ods, ods_atk, refrags, got_refraged)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        RETURNING id;
-        """
-
-        params = (
-            data["player_data"][ubisoft_id]["player.id"],
-            dic.get("match_id"),
-            dic.get("team_index"),
-            dic.get("kills"),
-            dic.get("assists"),
-            dic.get("deaths"),
-            dic.get("headshots"),
-            dic.get("kost"),
-            dic.get("win_match"),
-            dic.get("won_rounds"),
-            dic.get("lost_rounds"),
-            dic.get("atk_won_rounds"),
-            dic.get("atk_lost_rounds"),
-            dic.get("def_won_rounds"),
-            dic.get("def_lost_rounds"),
-            dic.get("oks"),
-            dic.get("oks_atk"),
-            dic.get("ods"),
-            dic.get("ods_atk"),
-            dic.get("refrags"),
-            dic.get("got_refraged")
-        )
-    
-        result, error = fetch_data(query, ['id'], params)
-        if error:
-            logging.error(f"Database error during playerMatch insert/update: {error}")
-            execute_query("ROLLBACK;")
-            f.abort(500, description="Internal Server Error")
-
-        player_match_id = result[0]['id'] if result else None
-        if not player_match_id:
-            logging.error(f"Failed to retrieve playerMatch ID after insert/update for player ID {ubisoft_id}")
-            execute_query("ROLLBACK;")
-            f.abort(500, description="Internal Server Error")
-    # endregion
-
-    # region Save Events
+                round_ids[dic.round],
+                dic.team_index,
+                dic.operator,
+                dic.spawn,
+                dic.kills,
+                dic.death,
+                dic.headshots,
+                dic.plant,
+                dic.defuse,
+                dic.kost,
+                dic.onevx,
+                dic.ok,
+                dic.od,
+                dic.win,
+                dic.atk,
+                dic.refrags,
+                dic.got_refraged,
+                match_timestamp
+            ))
+    execute_values(cur, """
+    INSERT INTO playerround (player_id, round_id, team_index, operator, spawn, kills, death,
+    headshots, plant, defuse, kostpoint, onevx, ok, od, win, atk, refrags, got_refraged, match_timestamp)
+    VALUES %s;
+    """, rows, page_size=max(len(rows), 1))
+
+def insert_player_matches(cur, data: dict, player_match_data: dict) -> None:
+    """Schreibt PlayerMatch für die Spieler in player_match_data (ubisoft_id -> PlayerMatchRecord)."""
+    rows = [(
+        data["player_data"][ubisoft_id]["player.id"],
+        dic.match_id,
+        dic.team_index,
+        dic.kills,
+        dic.assists,
+        dic.deaths,
+        dic.headshots,
+        dic.kost,
+        dic.win_match,
+        dic.won_rounds,
+        dic.lost_rounds,
+        dic.atk_won_rounds,
+        dic.atk_lost_rounds,
+        dic.def_won_rounds,
+        dic.def_lost_rounds,
+        dic.oks,
+        dic.oks_atk,
+        dic.ods,
+        dic.ods_atk,
+        dic.refrags,
+        dic.got_refraged
+    ) for ubisoft_id, dic in player_match_data.items()]
+    execute_values(cur, """
+    INSERT INTO playermatch (player_id, match_id, team_index, kills, assists, deaths,
+    headshots, kost, win, won_rounds, lost_rounds, won_atk_rounds, lost_atk_rounds,
+    won_def_rounds, lost_def_rounds, oks, oks_atk, ods, ods_atk, refrags, got_refraged)
+    VALUES %s;
+    """, rows, page_size=max(len(rows), 1))
+
+def insert_events(cur, data: dict, round_ids: dict[int, int], match_timestamp) -> None:
+    rows = []
     for event in data["events_data"]:
-        query = """
-        INSERT INTO events (round_id, player_id, target_player_id, type, phase, time_elapsed_seconds,
-        operator, refrag, got_refraged, headshot)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        RETURNING id;
-        """
-
-        round_number = event["round_number"]
-        roundID = rounds_data[round_number - 1]["round.id"]
-        player_ubisoft_id = event["player_ubisoft_id"]
-        target_ubisoft_id = event["target_player_ubisoft_id"]
-        params = (
-            roundID,
+        player_ubisoft_id = event.player_ubisoft_id
+        target_ubisoft_id = event.target_player_ubisoft_id
+        rows.append((
+            round_ids[event.round_number],
             data["player_data"][player_ubisoft_id]["player.id"],
             data["player_data"][target_ubisoft_id]["player.id"] if target_ubisoft_id else None,
-            event["type"],
-            event["phase"],
-            event["time_elapsed_seconds"],
-            event["operator"],
-            event["refrag"],
-            event["was_refraged"],
-            event["headshot"]
-        )
-
-        result, error = fetch_data(query, ['id'], params)
-        if error:
-            logging.error(f"Database error during events insert/update: {error}")
-            execute_query("ROLLBACK;")
-            f.abort(500, description="Internal Server Error")
-
-        event_id = result[0]['id'] if result else None
-        if not event_id:
-            logging.error(f"Failed to retrieve event ID after insert/update for round ID {roundID}")
-            execute_query("ROLLBACK;")
-            f.abort(500, description="Internal Server Error")
-    # endregion
-
-    # Commit if successful
-    success, error = execute_query("COMMIT;")
-    if error:
-        logging.error(f"Database error during initialization [COMMIT]: {error}")
-        execute_query("ROLLBACK;")
-        f.abort(500, description="Internal Server Error")
-    return "Database initialized successfully.", 200
+            event.type,
+            event.phase,
+            event.time_elapsed_seconds,
+            event.operator,
+            event.refrag,
+            event.was_refraged,
+            event.headshot,
+            match_timestamp
+        ))
+    execute_values(cur, """
+    INSERT INTO events (round_id, player_id, target_player_id, type, phase, time_elapsed_seconds,
+    operator, refrag, got_refraged, headshot, match_timestamp)
+    VALUES %s;
+    """, rows, page_size=max(len(rows), 1))
@@ -1,10 +1,14 @@
 from mapFunctions import map_maps
+from metrics import EXTRACT_DURATION, Stopwatch
+from records import EventRecord, RoundRecord, PlayerRoundRecord, PlayerMatchRecord
 
 global REFRAGTIME, prep_duration, round_duration, plant_duration
 REFRAGTIME = 7  # seconds
 prep_duration = 45
 round_duration = 180
 plant_duration = 45
+# Bei jeder Änderung an der Extraktion erhöhen, backfill.py extrahiert dann archivierte Matches neu
+EXTRACTOR_VERSION = 1
 
 def correct_data(data: dict) -> dict:
     # Check if last round(s) are valid
@@ -32,17 +36,94 @@ def extract_time_stamp(data: dict) -> str:
 def extract_data(data: dict) -> dict["match_data": dict, "player_data": dict, 
                                      "rounds_data": dict, "player_rounds_data": dict, 
                                      "player_match_data": dict, "events_data": list[dict]]:
+    """Extrahiert alle Tabellen eines Matches.
+
+    Args:
+        data (dict): Match-Daten im Format von r6-dissect (inkl. Match_Info).
+
+    Returns:
+        dict: Die Tabellen des Matches. Runden, Spieler-Runden, Spieler-Matches und Events sind
+            Datensätze aus records.py (keine dict-Instanzen); für JSON mit records.to_plain umwandeln.
+    """
+    # Dauer jedes Schritts für /metrics
+    steps = Stopwatch(EXTRACT_DURATION, "step")
+    steps.enter("correct_data")
     data = correct_data(data)
+    steps.enter("extract_match_data")
     match_data = extract_match_data(data)
+    steps.enter("extract_player_data")
     player_data = extract_player_data(data)
+    steps.enter("extract_events_data")
     events_data = extract_events_data(data, player_data)
-    rounds_data = extract_rounds_data(data, events_data)
-    player_rounds_data = extract_player_rounds_data(data, events_data)
-    player_match_data = extract_player_match_data(data, player_rounds_data, match_data, player_data)
+    steps.enter("build_round_index")
+    round_index = build_round_index(data, events_data)
+    steps.enter("extract_rounds_data")
+    rounds_data = extract_rounds_data(data, round_index)
+    steps.enter("extract_player_rounds_data")
+    player_rounds_data = extract_player_rounds_data(data, round_index)
+    steps.enter("extract_player_match_data")
+    player_match_data = extract_player_match_data(data, player_rounds_data, match_data, player_data, round_index)
+    steps.stop()
     return {"match_data": match_data, "player_data": player_data, 
             "rounds_data": rounds_data, "player_rounds_data": player_rounds_data, 
             "player_match_data": player_match_data, "events_data": events_data}
 
+def extract_round(data: dict) -> dict:
+    """Extrahiert eine einzelne Runde für das Anhängen an ein laufendes Match (roundIngest.py).
+
+    Die Runde wird wie ein Match mit nur dieser Runde extrahiert und danach auf ihre Nummer
+    (roundNumber von r6-dissect, ab 0 gezählt) umnummeriert. match_data beschreibt den Stand
+    nach der Runde (Gewinner aus dem Punktestand), player_match_data den Beitrag der Runde.
+
+    Args:
+        data (dict): Ausgabe von parseRound mit Match_Info (parseMatchInfo derselben .rec Datei).
+
+    Raises:
+        ValueError: roundNumber fehlt oder die Runde ist unvollständig.
+    """
+    round_number = data.get("roundNumber")
+    if not isinstance(round_number, int) or isinstance(round_number, bool) or round_number < 0:
+        raise ValueError("Round has no valid roundNumber")
+    round = {key: value for key, value in data.items() if key != "Match_Info"}
+    # Match-Statistiken aus den Statistiken der Runde, damit die Assists der Runde übernommen werden
+    match = correct_data({"Match_Info": data["Match_Info"],
+                          "rounds": [round],
+                          "stats": [{**player, "rounds": 1} for player in round.get("stats") or []]})
+    if not match["rounds"]:
+        raise ValueError("Round is incomplete")
+    extracted = extract_data(match)
+
+    ROUNDNUMBER = round_number + 1
+    for event in extracted["events_data"]:
+        event.round_number = ROUNDNUMBER
+    for round_data in extracted["rounds_data"]:
+        round_data.round_number = ROUNDNUMBER
+    for stats in extracted["player_rounds_data"][0].values():
+        stats.round = ROUNDNUMBER
+    return extracted
+
+def build_round_index(data: dict, events_data: list[dict]) -> list[dict]:
+    """Gruppiert alle Events einmalig nach Runde sowie nach Akteur und Ziel.
+
+    Jeder Eintrag der Liste gehört zu einer Runde (Index = round_number - 1) und enthält:
+        events: alle Events der Runde in zeitlicher Reihenfolge
+        by_actor: ubisoft_id -> Events, bei denen der Spieler der Akteur ist
+        by_target: ubisoft_id -> Events, bei denen der Spieler das Ziel ist
+        players: ubisoft_id -> Spielerobjekt der Runde aus den Rohdaten
+    """
+    round_index = [{"events": [],
+                    "by_actor": {},
+                    "by_target": {},
+                    "players": {player["profileID"]: player for player in round["players"]}
+                    } for round in data["rounds"]]
+    for event in events_data:
+        round_events = round_index[event.round_number - 1]
+        round_events["events"].append(event)
+        round_events["by_actor"].setdefault(event.player_ubisoft_id, []).append(event)
+        if event.target_player_ubisoft_id is not None:
+            round_events["by_target"].setdefault(event.target_player_ubisoft_id, []).append(event)
+    return round_index
+
 def extract_match_data(data: dict) -> dict:
     match_info = data["Match_Info"]
     ID = match_info["Match ID"]
@@ -99,7 +180,7 @@ def extract_player_data(data: dict) -> dict:
             break
     return player_dict
 
-def extract_rounds_data(data: dict, events_data: dict) -> list[dict]:
+def extract_rounds_data(data: dict, round_index: list[dict]) -> list[dict]:
     rounds_data = []
     match_info = data["Match_Info"]
     ID = match_info["Match ID"]
@@ -109,8 +190,9 @@ def extract_rounds_data(data: dict, events_data: dict) -> list[dict]:
         WINNERTEAMINDEX = 0 if round["teams"][0]["won"] else 1
         ATKTEAMINDEX = 0 if round["teams"][0]["role"] == "Attack" else 1
         DEFTEAMINDEX = 1 - ATKTEAMINDEX
-        # Find All Events of this Round
-        events_of_round = [event for event in events_data if event["round_number"] == ROUNDNUMBER]
+        # All Events of this Round
+        events_of_round = round_index[i]["events"]
+        events_by_target = round_index[i]["by_target"]
         TIMETOENTRY = None
         OKTEAMINDEX = None
         OKREFRAG = False
@@ -119,89 +201,111 @@ def extract_rounds_data(data: dict, events_data: dict) -> list[dict]:
         clutch_situation = None
         team0_player_count = [p["profileID"] for p in round["players"] if p["teamIndex"] == 0]
         team1_player_count = [p["profileID"] for p in round["players"] if p["teamIndex"] == 1]
-        for i, event in enumerate(events_of_round):
+        for event in events_of_round:
             # CLUTCH & OK TEAM INDEX
-            if event["type"] == "Kill" and event["target_player_ubisoft_id"] in team0_player_count:
+            if event.type == "Kill" and event.target_player_ubisoft_id in team0_player_count:
                 if OKTEAMINDEX is None:
                     OKTEAMINDEX = 1
-                team0_player_count.remove(event["target_player_ubisoft_id"])
+                team0_player_count.remove(event.target_player_ubisoft_id)
                 if len(team0_player_count) == 1 and clutch_situation is None:
                     if WINNERTEAMINDEX == 0:
                         CLUTCH = True
                         clutch_situation = True
-            if event["type"] == "Kill" and event["target_player_ubisoft_id"] in team1_player_count:
+            if event.type == "Kill" and event.target_player_ubisoft_id in team1_player_count:
                 if OKTEAMINDEX is None:
                     OKTEAMINDEX = 0
-                team1_player_count.remove(event["target_player_ubisoft_id"])
+                team1_player_count.remove(event.target_player_ubisoft_id)
                 if len(team1_player_count) == 1 and clutch_situation is None:
                     if WINNERTEAMINDEX == 1:
                         CLUTCH = True
                         clutch_situation = True
             
-            if event["type"] == "Death" and event["player_ubisoft_id"] in team0_player_count:
+            if event.type == "Death" and event.player_ubisoft_id in team0_player_count:
                 if OKTEAMINDEX is None: # FLORIN FRAGEN
                     OKTEAMINDEX = 1
-                team0_player_count.remove(event["player_ubisoft_id"])
+                team0_player_count.remove(event.player_ubisoft_id)
                 if len(team0_player_count) == 1 and clutch_situation is None:
                     if WINNERTEAMINDEX == 0:
                         CLUTCH = True
                         clutch_situation = True
-            if event["type"] == "Death" and event["player_ubisoft_id"] in team1_player_count:
+            if event.type == "Death" and event.player_ubisoft_id in team1_player_count:
                 if OKTEAMINDEX is None: # FLORIN FRAGEN
                     OKTEAMINDEX = 0
-                team1_player_count.remove(event["player_ubisoft_id"])
+                team1_player_count.remove(event.player_ubisoft_id)
                 if len(team1_player_count) == 1 and clutch_situation is None:
                     if WINNERTEAMINDEX == 1:
                         CLUTCH = True
                         clutch_situation = True
 
             # WINCONDITION
-            if event["type"] == "DefuserPlantComplete":
+            if event.type == "DefuserPlantComplete":
                 WINCONDITION = "plant"
             if (len(team0_player_count) == 0 or len(team1_player_count) == 0) and WINCONDITION == "time":
                 WINCONDITION = "kills"
 
             # OK REFRAG
-            if event["type"] == "Kill":
-                for next_event in events_of_round[i+1:]:
-                    if next_event["type"] == "Kill" and next_event["target_player_ubisoft_id"] == event["player_ubisoft_id"]:
-                        if next_event["refrag"]:
-                            if OKREFRAG is None:
-                                OKREFRAG = True
-                                break
+            if event.type == "Kill":
+                # Nur Kills, deren Ziel der aktuelle Killer ist, kommen in Frage
+                for next_event in events_by_target.get(event.player_ubisoft_id, []):
+                    if next_event.type == "Kill" and next_event.refrag:
+                        if OKREFRAG is None:
+                            OKREFRAG = True
+                            break
 
             # Time to entry
-            if event["type"] == "Kill" and TIMETOENTRY is None:
-                TIMETOENTRY = event["time_elapsed_seconds"]
-        rounds_data.append({"match_id":ID,
-                            "round_number":ROUNDNUMBER,
-                            "site":SITE,
-                            "winner_team_index":WINNERTEAMINDEX,
-                            "atk_team_index":ATKTEAMINDEX,
-                            "def_team_index":DEFTEAMINDEX,
-                            "time_to_entry":TIMETOENTRY,
-                            "ok_team_index":OKTEAMINDEX,
-                            "ok_refrag":OKREFRAG,
-                            "clutch":CLUTCH,
-                            "win_condition":WINCONDITION,
-                            })
+            if event.type == "Kill" and TIMETOENTRY is None:
+                TIMETOENTRY = event.time_elapsed_seconds
+        rounds_data.append(RoundRecord(match_id=ID,
+                                       round_number=ROUNDNUMBER,
+                                       site=SITE,
+                                       winner_team_index=WINNERTEAMINDEX,
+                                       atk_team_index=ATKTEAMINDEX,
+                                       def_team_index=DEFTEAMINDEX,
+                                       time_to_entry=TIMETOENTRY,
+                                       ok_team_index=OKTEAMINDEX,
+                                       ok_refrag=OKREFRAG,
+                                       clutch=CLUTCH,
+                                       win_condition=WINCONDITION))
     return rounds_data
 
-def extract_player_rounds_data(data: dict, events_data: list) -> list[dict]:
+def extract_player_rounds_data(data: dict, round_index: list[dict]) -> list[dict]:
     player_rounds_list = []
     for i, round in enumerate(data["rounds"]):
         round_dict = {}
-        # helper
+        # round number
+        ROUNDNUMBER = i + 1
+        events_of_round = round_index[i]["events"]
+        events_by_actor = round_index[i]["by_actor"]
+        events_by_target = round_index[i]["by_target"]
+        # helper: Opening Kill / Death und 1vX werden einmal pro Runde bestimmt
         first_kill_id = None
         first_death_id = None
+        onevx_situations = {}
+        team0_player_count = [p["profileID"] for p in round["players"] if p["teamIndex"] == 0]
+        team1_player_count = [p["profileID"] for p in round["players"] if p["teamIndex"] == 1]
+        for event in events_of_round:
+            if first_kill_id is None and first_death_id is None and event.type == "Kill":
+                first_kill_id = event.player_ubisoft_id
+            if first_death_id is None and event.type == "Kill":
+                first_death_id = event.target_player_ubisoft_id
+            if first_death_id is None and event.type == "Death":
+                first_death_id = event.player_ubisoft_id
+
+            if event.type == "Kill":
+                team0_player_count.remove(event.target_player_ubisoft_id) if event.target_player_ubisoft_id in team0_player_count else None
+                team1_player_count.remove(event.target_player_ubisoft_id) if event.target_player_ubisoft_id in team1_player_count else None
+            elif event.type == "Death":
+                team0_player_count.remove(event.player_ubisoft_id) if event.player_ubisoft_id in team0_player_count else None
+                team1_player_count.remove(event.player_ubisoft_id) if event.player_ubisoft_id in team1_player_count else None
+            # Der letzte Überlebende eines Teams bekommt beim ersten Auftreten die Anzahl der Gegner
+            if len(team0_player_count) == 1 and team0_player_count[0] not in onevx_situations:
+                onevx_situations[team0_player_count[0]] = len(team1_player_count)
+            if len(team1_player_count) == 1 and team1_player_count[0] not in onevx_situations:
+                onevx_situations[team1_player_count[0]] = len(team0_player_count)
+
         for player in round["players"]:
-            #helper
-            team0_player_count = [p["profileID"] for p in round["players"] if p["teamIndex"] == 0]
-            team1_player_count = [p["profileID"] for p in round["players"] if p["teamIndex"] == 1]
             # player id
             PLAYERUBISOFTID = player.get("profileID")
-            # round number
-            ROUNDNUMBER = i + 1
             # operator
             try:
                 OPERATOR = player["operator"]["name"] if player["operator"].get("name") else player["operator"]["id"] if player["operator"].get("id") else None
@@ -219,54 +323,31 @@ def extract_player_rounds_data(data: dict, events_data: list) -> list[dict]:
             KILLS = 0
             DEATH = False
             HEADSHOTS = 0
-            ONEVX = None
+            ONEVX = onevx_situations.get(PLAYERUBISOFTID)
             PLANT = False
             DEFUSE = False
-            OK = False
-            OD = False
+            OK = first_kill_id is not None and PLAYERUBISOFTID == first_kill_id
+            OD = first_death_id is not None and PLAYERUBISOFTID == first_death_id
             REFRAGS = 0
             GOTREFRAGED = False
-            for event in events_data:
-                if event["round_number"] != ROUNDNUMBER:
-                    continue
-                if first_kill_id is None and first_death_id is None and event["type"] == "Kill":
-                    first_kill_id = event["player_ubisoft_id"]
-                if first_death_id is None and event["type"] == "Kill":
-                    first_death_id = event["target_player_ubisoft_id"]
-                if first_death_id is None and event["type"] == "Death":
-                    first_death_id = event["player_ubisoft_id"]
-                if PLAYERUBISOFTID == first_kill_id:
-                    OK = True
-                if PLAYERUBISOFTID == first_death_id:
-                    OD = True
-
-                if event["type"] == "Kill":
-                    team0_player_count.remove(event["target_player_ubisoft_id"]) if event["target_player_ubisoft_id"] in team0_player_count else None
-                    team1_player_count.remove(event["target_player_ubisoft_id"]) if event["target_player_ubisoft_id"] in team1_player_count else None
-                    if event["player_ubisoft_id"] == PLAYERUBISOFTID:
-                        KILLS += 1
-                        if event["headshot"]:
-                            HEADSHOTS += 1
-                        if event["refrag"]:
-                            REFRAGS += 1
-                    elif event["target_player_ubisoft_id"] == PLAYERUBISOFTID:
-                        DEATH = True
-                        if event["was_refraged"]:
-                            GOTREFRAGED = True
-                
-                elif event["type"] == "Death":
-                    team0_player_count.remove(event["player_ubisoft_id"]) if event["player_ubisoft_id"] in team0_player_count else None
-                    team1_player_count.remove(event["player_ubisoft_id"]) if event["player_ubisoft_id"] in team1_player_count else None
-                    if event["player_ubisoft_id"] == PLAYERUBISOFTID:
-                        DEATH = True
-                if TEAMINDEX == 0 and ONEVX is None and len(team0_player_count) == 1 and PLAYERUBISOFTID in team0_player_count:
-                    ONEVX = len(team1_player_count)
-                elif TEAMINDEX == 1 and ONEVX is None and len(team1_player_count) == 1 and PLAYERUBISOFTID in team1_player_count:
-                    ONEVX = len(team0_player_count)
-                if event["type"] == "DefuserPlantComplete" and event["player_ubisoft_id"] == PLAYERUBISOFTID:
+            for event in events_by_actor.get(PLAYERUBISOFTID, []):
+                if event.type == "Kill":
+                    KILLS += 1
+                    if event.headshot:
+                        HEADSHOTS += 1
+                    if event.refrag:
+                        REFRAGS += 1
+                elif event.type == "Death":
+                    DEATH = True
+                elif event.type == "DefuserPlantComplete":
                     PLANT = True
-                if event["type"] == "DefuserDisableComplete" and event["player_ubisoft_id"] == PLAYERUBISOFTID:
+                elif event.type == "DefuserDisableComplete":
                     DEFUSE = True
+            for event in events_by_target.get(PLAYERUBISOFTID, []):
+                if event.type == "Kill" and event.player_ubisoft_id != PLAYERUBISOFTID:
+                    DEATH = True
+                    if event.was_refraged:
+                        GOTREFRAGED = True
             #kost
             KOST = False
             if KILLS >= 1:
@@ -276,103 +357,94 @@ def extract_player_rounds_data(data: dict, events_data: list) -> list[dict]:
             elif DEATH and GOTREFRAGED:
                 KOST = True
             
-            round_dict[PLAYERUBISOFTID] = {
-                "round": ROUNDNUMBER,
-                "operator": OPERATOR,
-                "spawn": SPAWN,
-                "win": WIN,
-                "atk": ATK,
-                "kills": KILLS,
-                "death": DEATH,
-                "headshots": HEADSHOTS,
-                "onevx": ONEVX,
-                "plant": PLANT,
-                "defuse": DEFUSE,
-                "ok": OK,
-                "od": OD,
-                "refrags": REFRAGS,
-                "got_refraged": GOTREFRAGED,
-                "kost": KOST,
-                "team_index": TEAMINDEX
-            }
+            round_dict[PLAYERUBISOFTID] = PlayerRoundRecord(
+                round=ROUNDNUMBER,
+                operator=OPERATOR,
+                spawn=SPAWN,
+                win=WIN,
+                atk=ATK,
+                kills=KILLS,
+                death=DEATH,
+                headshots=HEADSHOTS,
+                onevx=ONEVX,
+                plant=PLANT,
+                defuse=DEFUSE,
+                ok=OK,
+                od=OD,
+                refrags=REFRAGS,
+                got_refraged=GOTREFRAGED,
+                kost=KOST,
+                team_index=TEAMINDEX
+            )
         player_rounds_list.append(round_dict)
     return player_rounds_list
 
 def extract_player_match_data(data: dict, player_rounds_data: list, 
-                              match_data: dict, player_data: dict) -> dict:
+                              match_data: dict, player_data: dict, round_index: list[dict]) -> dict:
     player_match_data = {}
     MATCHID = data["Match_Info"]["Match ID"]
     for round_data in player_rounds_data:
         for i, (PLAYERID, stats) in enumerate(round_data.items()):
             if PLAYERID not in player_match_data:
-                TEAMINDEX = [player["teamIndex"] for player in data["rounds"][stats["round"]-1]["players"] if player["profileID"] == PLAYERID][0]
+                TEAMINDEX = round_index[stats.round-1]["players"][PLAYERID]["teamIndex"]
                 if match_data["winner_team_index"] is None:
                     WINMATCH = None
                 elif match_data["winner_team_index"] == TEAMINDEX:
                     WINMATCH = True
                 else:
                     WINMATCH = False
-                player_match_data[PLAYERID] = {
-                    "match_id": MATCHID,
-                    "player_id": PLAYERID,
-                    "rounds_played": 0,
-                    "team_index": TEAMINDEX,
-                    "kills": 0,
-                    "deaths": 0,
-                    "headshots": 0,
-                    "kost": 0,
-                    "win_match": WINMATCH,
-                    "won_rounds": 0,
-                    "lost_rounds": 0,
-                    "atk_won_rounds": 0,
-                    "atk_lost_rounds":0,
-                    "def_won_rounds":0,
-                    "def_lost_rounds":0,
-                    "oks":0,
-                    "oks_atk":0,
-                    "ods":0,
-                    "ods_atk":0,
-                    "refrags":0,
-                    "got_refraged":0
-                }
-            player_match_data[PLAYERID]["rounds_played"] += 1
-            player_match_data[PLAYERID]["kills"] += stats["kills"]
-            player_match_data[PLAYERID]["deaths"] += 1 if stats["death"] else 0
-            player_match_data[PLAYERID]["headshots"] += stats["headshots"]
-            player_match_data[PLAYERID]["kost"] += 1 if stats["kost"] else 0
-            player_match_data[PLAYERID]["oks"] += 1 if stats["ok"] else 0
-            player_match_data[PLAYERID]["ods"] += 1 if stats["od"] else 0
-            player_match_data[PLAYERID]["refrags"] += stats["refrags"]
-            player_match_data[PLAYERID]["got_refraged"] += 1 if stats["got_refraged"] else 0
-            if stats["win"]:
-                player_match_data[PLAYERID]["won_rounds"] += 1
-                if stats["atk"]:
-                    player_match_data[PLAYERID]["atk_won_rounds"] += 1
+                player_match_data[PLAYERID] = PlayerMatchRecord(match_id=MATCHID,
+                                                                player_id=PLAYERID,
+                                                                team_index=TEAMINDEX,
+                                                                win_match=WINMATCH)
+            player_match_data[PLAYERID].rounds_played += 1
+            player_match_data[PLAYERID].kills += stats.kills
+            player_match_data[PLAYERID].deaths += 1 if stats.death else 0
+            player_match_data[PLAYERID].headshots += stats.headshots
+            player_match_data[PLAYERID].kost += 1 if stats.kost else 0
+            player_match_data[PLAYERID].oks += 1 if stats.ok else 0
+            player_match_data[PLAYERID].ods += 1 if stats.od else 0
+            player_match_data[PLAYERID].refrags += stats.refrags
+            player_match_data[PLAYERID].got_refraged += 1 if stats.got_refraged else 0
+            if stats.win:
+                player_match_data[PLAYERID].won_rounds += 1
+                if stats.atk:
+                    player_match_data[PLAYERID].atk_won_rounds += 1
                 else:
-                    player_match_data[PLAYERID]["def_won_rounds"] += 1
+                    player_match_data[PLAYERID].def_won_rounds += 1
             else:
-                player_match_data[PLAYERID]["lost_rounds"] += 1
-                if stats["atk"]:
-                    player_match_data[PLAYERID]["atk_lost_rounds"] += 1
+                player_match_data[PLAYERID].lost_rounds += 1
+                if stats.atk:
+                    player_match_data[PLAYERID].atk_lost_rounds += 1
                 else:
-                    player_match_data[PLAYERID]["def_lost_rounds"] += 1
-            if stats["atk"]:
-                player_match_data[PLAYERID]["oks_atk"] += 1 if stats["ok"] else 0
-                player_match_data[PLAYERID]["ods_atk"] += 1 if stats["od"] else 0
+                    player_match_data[PLAYERID].def_lost_rounds += 1
+            if stats.atk:
+                player_match_data[PLAYERID].oks_atk += 1 if stats.ok else 0
+                player_match_data[PLAYERID].ods_atk += 1 if stats.od else 0
             
         
+    # Match-Statistiken nach Username, bei Duplikaten zählt der erste Eintrag
+    match_stats = {}
+    for player in data["stats"]:
+        match_stats.setdefault(player["username"], player)
     for PLAYERID, stats in player_match_data.items():
-        player_match_data[PLAYERID]["kost"] = round(stats["kost"] / stats["rounds_played"], 2) if stats["rounds_played"] > 0 else 0
+        player_match_data[PLAYERID].kost = round(stats.kost / stats.rounds_played, 2) if stats.rounds_played > 0 else 0
         username = player_data[PLAYERID]["username"] if PLAYERID in player_data else None
-        player_match_data[PLAYERID]["username"] = username
-        if [player["rounds"] for player in data["stats"] if player["username"] == username][0] == stats["rounds_played"]:
-            player_match_data[PLAYERID]["assists"] = [player["assists"] for player in data["stats"] if player["username"] == username][0]
+        player_match_data[PLAYERID].username = username
+        if match_stats[username]["rounds"] == stats.rounds_played:
+            player_match_data[PLAYERID].assists = match_stats[username]["assists"]
         else:
-            player_match_data[PLAYERID]["assists"] = None
+            player_match_data[PLAYERID].assists = None
     return player_match_data
 
 def extract_events_data(data: dict, player_data: dict) -> list[dict]:
     events = []
+    # Username -> ubisoft_id, bei doppelten Usernames zählt der erste Spieler
+    ubisoft_ids = {}
+    for uid, info in player_data.items():
+        ubisoft_ids.setdefault(info["username"], uid)
+    # ubisoft_id -> bisherige Kills des Spielers (neuester zuletzt) für die Refrag-Erkennung
+    kills_by_player = {}
     for i, round in enumerate(data["rounds"]):
         ROUNDNUMBER = i + 1
         # Give each event a phase
@@ -406,9 +478,9 @@ def extract_events_data(data: dict, player_data: dict) -> list[dict]:
         # extract event data
         for event in event_list:
             username = event["username"]
-            UBISOFTID = [uid for uid, info in player_data.items() if info["username"] == username][0]
+            UBISOFTID = ubisoft_ids[username]
             target_username = event.get("target")
-            TARGETUBISOFTID = [uid for uid, info in player_data.items() if info["username"] == target_username][0] if target_username else None
+            TARGETUBISOFTID = ubisoft_ids[target_username] if target_username else None
             TYPE = event["type"]["name"]
             PHASE = event["phase"]
             match PHASE:
@@ -424,47 +496,45 @@ def extract_events_data(data: dict, player_data: dict) -> list[dict]:
             # Refrag True if Killer dies within X seconds
             REFRAG = False
             if TYPE == "Kill":
-                for earlier_event in reversed(events):
-                    if earlier_event["type"] == "Kill":
-                        past_event_time = earlier_event["time_elapsed_seconds"]
-                        
-                        # Check if the TARGET of current kill was the KILLER in the earlier event
-                        if earlier_event["player_ubisoft_id"] == TARGETUBISOFTID:
-                            if earlier_event["phase"] == event["phase"]:
-                                # Same phase - simple time difference check
-                                time_diff = TIMEELAPSEDSECONDS - past_event_time
-                                if time_diff <= REFRAGTIME and time_diff >= 0:
-                                    REFRAG = True
-                                    events[events.index(earlier_event)]["was_refraged"] = True
-                                    break
-                                elif time_diff < 0:
-                                    # Events are out of order, stop looking
-                                    break
-                            elif earlier_event["phase"] == "round" and event["phase"] == "plant":
-                                # Transition from round to plant phase
-                                if plant_time is not None:
-                                    # Time from earlier kill to plant + time from plant start to current kill
-                                    time_diff = (round_duration - past_event_time) + TIMEELAPSEDSECONDS
-                                    if time_diff <= REFRAGTIME:
-                                        REFRAG = True
-                                        events[events.index(earlier_event)]["was_refraged"] = True
-                                        break
-                            # If we've gone too far back in time, stop searching
-                            elif earlier_event["phase"] != event["phase"]:
+                # Only earlier kills of the TARGET of the current kill are relevant, newest first
+                for earlier_event in reversed(kills_by_player.get(TARGETUBISOFTID, [])):
+                    past_event_time = earlier_event.time_elapsed_seconds
+                    if earlier_event.phase == event["phase"]:
+                        # Same phase - simple time difference check
+                        time_diff = TIMEELAPSEDSECONDS - past_event_time
+                        if time_diff <= REFRAGTIME and time_diff >= 0:
+                            REFRAG = True
+                            earlier_event.was_refraged = True
+                            break
+                        elif time_diff < 0:
+                            # Events are out of order, stop looking
+                            break
+                    elif earlier_event.phase == "round" and event["phase"] == "plant":
+                        # Transition from round to plant phase
+                        if plant_time is not None:
+                            # Time from earlier kill to plant + time from plant start to current kill
+                            time_diff = (round_duration - past_event_time) + TIMEELAPSEDSECONDS
+                            if time_diff <= REFRAGTIME:
+                                REFRAG = True
+                                earlier_event.was_refraged = True
                                 break
+                    # If we've gone too far back in time, stop searching
+                    elif earlier_event.phase != event["phase"]:
+                        break
             
             OPERATOR = event.get("operator")["name"] if event.get("operator") else None
-            events.append({"round_number": ROUNDNUMBER,
-                           "player_ubisoft_id": UBISOFTID,
-                           "target_player_ubisoft_id": TARGETUBISOFTID,
-                           "type": TYPE,
-                           "phase": PHASE,
-                           "time_elapsed_seconds": TIMEELAPSEDSECONDS,
-                           "refrag": REFRAG,
-                           "operator": OPERATOR,
-                           "was_refraged": False,
-                           "headshot": HEADSHOT
-                           })
+            events.append(EventRecord(round_number=ROUNDNUMBER,
+                                      player_ubisoft_id=UBISOFTID,
+                                      target_player_ubisoft_id=TARGETUBISOFTID,
+                                      type=TYPE,
+                                      phase=PHASE,
+                                      time_elapsed_seconds=TIMEELAPSEDSECONDS,
+                                      refrag=REFRAG,
+                                      operator=OPERATOR,
+                                      was_refraged=False,
+                                      headshot=HEADSHOT))
+            if TYPE == "Kill":
+                kills_by_player.setdefault(UBISOFTID, []).append(events[-1])
             
     return events
 
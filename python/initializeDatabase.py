@@ -1,14 +1,91 @@
 import requests as rq
+import psycopg2
 from vars import PORT, BASE_PATH
-from db_functions import execute_query
+from db_functions import transaction, get_connection, PoolTimeout
+from playerCareer import CREATE_PLAYER_CAREER_TABLE
+from playerIdentity import CREATE_PLAYER_IDENTITY_TABLE, FILL_PLAYER_IDENTITY, CREATE_PLAYER_IDENTITY_VERSION_TABLE
+from partitions import partition_tables, create_future_partitions
+from rawArchive import CREATE_RAW_MATCH_TABLE, CREATE_RAW_MATCH_INDEX, ADD_RAW_MATCH_FIELD_SET
 import logging
 import flask as f
 
+def run_step(cur, step: str, query: str) -> None:
+    """Führt einen Initialisierungsschritt aus und bricht bei Fehlern mit 500 ab (Rollback durch Aufrufer)."""
+    try:
+        cur.execute(query)
+    except psycopg2.Error as e:
+        logging.error(f"Database error during initialization [{step}]: {e}")
+        f.abort(500, description="Internal Server Error")
+
 def initialize_db():
-    success, error = execute_query("BEGIN TRANSACTION;")
-    if error:
-        logging.error(f"Database error during initialization [BEGIN TRANSACTION]: {error}")
+    """Bringt das Schema mit allen ausstehenden Migrationen auf den neuesten Stand
+    und legt die Partitionen der nächsten Monate an."""
+    try:
+        applied = migrate()
+        with transaction() as cur:
+            create_future_partitions(cur)
+    except (psycopg2.Error, PoolTimeout) as e:
+        logging.error(f"Database error during initialization [MIGRATE]: {e}")
         f.abort(500, description="Internal Server Error")
+    if applied:
+        logging.info(f"Applied schema migrations: {applied}")
+    return "Database initialized successfully.", 200
+
+# Schlüssel für pg_advisory_lock, damit parallel startende Prozesse nicht gleichzeitig migrieren
+MIGRATION_LOCK_ID = 716_500_001
+
+query_schema_version_table = """CREATE TABLE IF NOT EXISTS schema_version (
+                                 version INTEGER PRIMARY KEY,
+                                 description VARCHAR(255),
+                                 applied_at TIMESTAMP NOT NULL DEFAULT now()
+                             );"""
+
+def migrate() -> list[int]:
+    """Führt alle Migrationen aus MIGRATIONS aus, die noch nicht in schema_version stehen.
+
+    Transaktionale Migrationen laufen zusammen mit ihrem Eintrag in schema_version in einer
+    Transaktion. Die anderen laufen im Autocommit (z.B. CREATE INDEX CONCURRENTLY) und müssen
+    daher wiederholbar sein; ihre Version wird erst nach dem letzten Schritt eingetragen.
+
+    Returns:
+        list[int]: Die ausgeführten Versionen.
+    """
+    applied = []
+    with get_connection() as con:
+        con.autocommit = True
+        try:
+            with con.cursor() as cur:
+                cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_ID,))
+                try:
+                    cur.execute(query_schema_version_table)
+                    cur.execute("SELECT version FROM schema_version;")
+                    done = {row[0] for row in cur.fetchall()}
+                    for version, description, migration, transactional in MIGRATIONS:
+                        if version in done:
+                            continue
+                        logging.info(f"Applying schema migration {version}: {description}")
+                        if transactional:
+                            cur.execute("BEGIN;")
+                            try:
+                                migration(cur)
+                                cur.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s);",
+                                            (version, description))
+                                cur.execute("COMMIT;")
+                            except BaseException:
+                                cur.execute("ROLLBACK;")
+                                raise
+                        else:
+                            migration(cur)
+                            cur.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s);",
+                                        (version, description))
+                        applied.append(version)
+                finally:
+                    cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_ID,))
+        finally:
+            con.autocommit = False
+    return applied
+
+def create_tables(cur) -> None:
     # Create Player table
     query_player_table = """CREATE TABLE IF NOT EXISTS Player (
                             id SERIAL PRIMARY KEY,
@@ -17,11 +94,7 @@ def initialize_db():
                             timestamp TIMESTAMP,
                             team_id INTEGER
                         );"""
-    success, error = execute_query(query_player_table)
-    if error:
-        logging.error(f"Database error during initialization [CREATE TABLE Player]: {error}")
-        execute_query("ROLLBACK;")
-        f.abort(500, description="Internal Server Error")
+    run_step(cur, "CREATE TABLE Player", query_player_table)
     
     # Add unique constraint for Player table (ignore error if exists)
     query_player_constraint = """
@@ -29,11 +102,14 @@ def initialize_db():
         ADD CONSTRAINT unique_player_combination 
         UNIQUE (ubisoft_id, username, team_id);
     """
-    success, error = execute_query(query_player_constraint)
-    if error and "already exists" not in str(error):
-        logging.error(f"Database error during initialization [ADD CONSTRAINT Player]: {error}")
-        execute_query("ROLLBACK;")
-        f.abort(500, description="Internal Server Error")
+    cur.execute("SAVEPOINT player_constraint;")
+    try:
+        cur.execute(query_player_constraint)
+    except psycopg2.Error as e:
+        if "already exists" not in str(e):
+            logging.error(f"Database error during initialization [ADD CONSTRAINT Player]: {e}")
+            f.abort(500, description="Internal Server Error")
+        cur.execute("ROLLBACK TO SAVEPOINT player_constraint;")
 
     # Create table Matches
     query_matches_table = """CREATE TABLE IF NOT EXISTS Matches (
@@ -52,11 +128,7 @@ def initialize_db():
                              plant_duration INTEGER,
                              FOREIGN KEY (player_id) REFERENCES Player(id)
                         );"""
-    success, error = execute_query(query_matches_table)
-    if error:
-        logging.error(f"Database error during initialization [CREATE TABLE Matches]: {error}")
-        execute_query("ROLLBACK;")
-        f.abort(500, description="Internal Server Error")
+    run_step(cur, "CREATE TABLE Matches", query_matches_table)
     
     # Create table Rounds
     query_rounds_table = """CREATE TABLE IF NOT EXISTS Rounds (
@@ -74,11 +146,7 @@ def initialize_db():
                             win_condition VARCHAR(255),
                             FOREIGN KEY (match_id) REFERENCES Matches(match_id)
                         );"""
-    success, error = execute_query(query_rounds_table)
-    if error:
-        logging.error(f"Database error during initialization [CREATE TABLE Rounds]: {error}")
-        execute_query("ROLLBACK;")
-        f.abort(500, description="Internal Server Error")
+    run_step(cur, "CREATE TABLE Rounds", query_rounds_table)
     
     # Create table PlayerRound
     query_player_round_table = """CREATE TABLE IF NOT EXISTS PlayerRound (
@@ -104,11 +172,7 @@ def initialize_db():
                                   FOREIGN KEY (player_id) REFERENCES Player(id),
                                   FOREIGN KEY (round_id) REFERENCES Rounds(id)
                               );"""
-    success, error = execute_query(query_player_round_table)
-    if error:
-        logging.error(f"Database error during initialization [CREATE TABLE PlayerRound]: {error}")
-        execute_query("ROLLBACK;")
-        f.abort(500, description="Internal Server Error")
+    run_step(cur, "CREATE TABLE PlayerRound", query_player_round_table)
 
     # Create PlayerMatch table
     query_player_match_table = """CREATE TABLE IF NOT EXISTS PlayerMatch (
@@ -137,11 +201,7 @@ def initialize_db():
                                   FOREIGN KEY (player_id) REFERENCES Player(id),
                                   FOREIGN KEY (match_id) REFERENCES Matches(match_id)
                               );"""
-    success, error = execute_query(query_player_match_table)
-    if error:
-        logging.error(f"Database error during initialization [CREATE TABLE PlayerMatch]: {error}")
-        execute_query("ROLLBACK;")
-        f.abort(500, description="Internal Server Error")
+    run_step(cur, "CREATE TABLE PlayerMatch", query_player_match_table)
 
     # Create Events table
     query_events_table = """CREATE TABLE IF NOT EXISTS Events (
@@ -161,19 +221,71 @@ def initialize_db():
                             FOREIGN KEY (target_player_id) REFERENCES Player(id)
                         );"""
 
-    success, error = execute_query(query_events_table)
-    if error:
-        logging.error(f"Database error during initialization [CREATE TABLE Events]: {error}")
-        execute_query("ROLLBACK;")
-        f.abort(500, description="Internal Server Error")
+    run_step(cur, "CREATE TABLE Events", query_events_table)
 
-    # Commit if successful
-    success, error = execute_query("COMMIT;")
-    if error:
-        logging.error(f"Database error during initialization [COMMIT]: {error}")
-        execute_query("ROLLBACK;")
-        f.abort(500, description="Internal Server Error")
-    return "Database initialized successfully.", 200
+    # Create PlayerCareer rollup table
+    run_step(cur, "CREATE TABLE PlayerCareer", CREATE_PLAYER_CAREER_TABLE)
+
+    # Create PlayerIdentity table (current username per player and team)
+    run_step(cur, "CREATE TABLE PlayerIdentity", CREATE_PLAYER_IDENTITY_TABLE)
+    run_step(cur, "FILL PlayerIdentity", FILL_PLAYER_IDENTITY)
+
+def create_index_concurrently(cur, name: str, table: str, columns: str) -> None:
+    """Legt einen Index ohne Schreibsperre an (nur im Autocommit möglich).
+
+    Ein abgebrochener CREATE INDEX CONCURRENTLY hinterlässt einen ungültigen Index,
+    der vor dem erneuten Versuch entfernt wird.
+    """
+    cur.execute("""SELECT NOT i.indisvalid
+                   FROM pg_index i INNER JOIN pg_class c ON c.oid = i.indexrelid
+                   WHERE c.relname = %s;""", (name.lower(),))
+    row = cur.fetchone()
+    if row and row[0]:
+        logging.warning(f"Dropping invalid index {name}")
+        run_step(cur, f"DROP INDEX {name}", f"DROP INDEX CONCURRENTLY IF EXISTS {name};")
+    run_step(cur, f"CREATE INDEX {name}", f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns});")
+
+# Indizes für die Joins über Fremdschlüssel und die Namenssuche in Player
+FOREIGN_KEY_INDEXES = [
+    ("idx_rounds_match_id", "Rounds", "match_id"),
+    ("idx_playerround_round_id", "PlayerRound", "round_id"),
+    ("idx_playerround_player_id", "PlayerRound", "player_id"),
+    ("idx_events_round_id", "Events", "round_id"),
+    ("idx_events_player_id", "Events", "player_id"),
+    ("idx_events_target_player_id", "Events", "target_player_id"),
+    ("idx_playermatch_player_id", "PlayerMatch", "player_id"),
+    ("idx_playermatch_match_id", "PlayerMatch", "match_id"),
+    ("idx_player_ubisoft_id_timestamp", "Player", "ubisoft_id, timestamp"),
+]
+
+def create_foreign_key_indexes(cur) -> None:
+    for name, table, columns in FOREIGN_KEY_INDEXES:
+        create_index_concurrently(cur, name, table, columns)
+
+def create_analytics_indexes(cur) -> None:
+    # Analyse-Endpunkte (analytics.py) filtern Matches nach Team und Zeitraum
+    create_index_concurrently(cur, "idx_matches_team_id_timestamp", "Matches", "team_id, timestamp")
+
+def create_raw_match_table(cur) -> None:
+    run_step(cur, "CREATE TABLE RawMatch", CREATE_RAW_MATCH_TABLE)
+    run_step(cur, "CREATE INDEX RawMatch", CREATE_RAW_MATCH_INDEX)
+
+def add_raw_match_field_set(cur) -> None:
+    run_step(cur, "ALTER TABLE RawMatch", ADD_RAW_MATCH_FIELD_SET)
+
+def create_player_identity_version_table(cur) -> None:
+    run_step(cur, "CREATE TABLE PlayerIdentityVersion", CREATE_PLAYER_IDENTITY_VERSION_TABLE)
+
+# (Version, Beschreibung, Migration(cur), transaktional). Neue Migrationen nur hinten anhängen.
+MIGRATIONS = [
+    (1, "base schema", create_tables, True),
+    (2, "foreign key indexes", create_foreign_key_indexes, False),
+    (3, "partition Events and PlayerRound by month", partition_tables, True),
+    (4, "index Matches by team and timestamp", create_analytics_indexes, False),
+    (5, "raw match archive", create_raw_match_table, True),
+    (6, "player identity version per team", create_player_identity_version_table, True),
+    (7, "field set of archived raw matches", add_raw_match_field_set, True),
+]
 
 if __name__ == "__main__":
     url = f"http://localhost:{PORT}/{BASE_PATH}/initialize"
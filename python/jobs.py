@@ -0,0 +1,146 @@
+"""Hintergrund-Jobs für hochgeladene Replays: parse -> extract_data -> save_match
+(bzw. parseRound -> extract_round -> save_round für einzelne Runden).
+
+Jobs laufen auf einem Thread-Pool, damit das Parsen (mehrere Sekunden) keinen
+Request-Thread blockiert. Der Status eines Jobs kann über get_job abgefragt werden.
+"""
+import logging
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import HTTPException
+
+from parse import parseMatch, parseRound, parseMatchInfo
+from extractData import extract_data, extract_round
+from db_functions import save_match, known_duplicate
+from rawArchive import encode_document
+from roundIngest import save_round
+from metrics import PARSE_DURATION, Gauge
+from vars import UPLOAD_WORKERS, JOB_RETENTION
+
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def submit_upload(folder, team_id: int) -> str:
+    """Legt einen Job für einen Ordner mit .rec Dateien an und gibt die Job-ID zurück.
+
+    Der Ordner gehört ab jetzt dem Job und wird nach der Verarbeitung gelöscht.
+    """
+    return _submit(_run_upload, folder, team_id)
+
+def submit_round_upload(folder, team_id: int) -> str:
+    """Wie submit_upload, aber für einen Ordner mit der .rec Datei einer einzelnen Runde (roundIngest.py)."""
+    return _submit(_run_round_upload, folder, team_id)
+
+def _submit(run, folder, team_id: int) -> str:
+    prune_jobs()
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _jobs_lock:
+        _jobs[job_id] = {"id": job_id,
+                         "team_id": team_id,
+                         "status": "queued",
+                         "match_id": None,
+                         "error": None,
+                         "created": now,
+                         "updated": now}
+    _executor.submit(run, job_id, folder, team_id)
+    return job_id
+
+def get_job(job_id: str) -> dict | None:
+    """Gibt eine Kopie des Job-Status zurück oder None, wenn der Job unbekannt ist."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+def prune_jobs() -> None:
+    """Entfernt abgeschlossene Jobs, die älter als JOB_RETENTION Sekunden sind."""
+    cutoff = time.time() - JOB_RETENTION
+    with _jobs_lock:
+        for job_id in [job_id for job_id, job in _jobs.items()
+                       if job["status"] in ("done", "duplicate", "failed") and job["updated"] < cutoff]:
+            del _jobs[job_id]
+
+def job_counts() -> dict[str, int]:
+    """Anzahl der bekannten Jobs pro Status."""
+    counts = {}
+    with _jobs_lock:
+        for job in _jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+    return counts
+
+Gauge("r6_upload_jobs", "Known upload jobs by status", job_counts, label="status")
+
+def _update(job_id: str, **fields) -> None:
+    with _jobs_lock:
+        _jobs[job_id].update(fields, updated=time.time())
+
+def _run_upload(job_id: str, folder, team_id: int) -> None:
+    try:
+        _update(job_id, status="parsing")
+        with PARSE_DURATION.time():
+            data = parseMatch(folder)
+        if data is None:
+            _update(job_id, status="failed", error="Replay could not be parsed")
+            return
+        match_id = data.get("Match_Info", {}).get("Match ID")
+        if known_duplicate(match_id):
+            _update(job_id, status="duplicate", match_id=match_id, error="Conflict: Match already exists.")
+            return
+
+        _update(job_id, status="extracting")
+        # Vor extract_data archivieren, da correct_data das Dokument verändert
+        raw = encode_document(data)
+        data = extract_data(data)
+        match_id = data["match_data"].get("match_id")
+
+        _update(job_id, status="saving", match_id=match_id)
+        save_match(data, team_id, raw)
+        _update(job_id, status="done")
+    except HTTPException as e:
+        if e.code == 409:
+            _update(job_id, status="duplicate", error=e.description)
+        else:
+            _update(job_id, status="failed", error=e.description)
+    except Exception as e:
+        logging.exception(f"Upload job {job_id} failed")
+        _update(job_id, status="failed", error=str(e))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+def _run_round_upload(job_id: str, folder, team_id: int) -> None:
+    try:
+        _update(job_id, status="parsing")
+        rec_file = next(folder.glob("*.rec"))
+        with PARSE_DURATION.time():
+            data = parseRound(rec_file)
+            match_info = parseMatchInfo(rec_file)
+        if data is None or match_info is None:
+            _update(job_id, status="failed", error="Replay could not be parsed")
+            return
+
+        _update(job_id, status="extracting", match_id=match_info.get("Match ID"))
+        data["Match_Info"] = match_info
+        try:
+            data = extract_round(data)
+        except ValueError as e:
+            _update(job_id, status="failed", error=str(e))
+            return
+
+        _update(job_id, status="saving")
+        result, _ = save_round(data, team_id)
+        _update(job_id, status="done", round=result["round"])
+    except HTTPException as e:
+        if e.code == 409:
+            _update(job_id, status="duplicate", error=e.description)
+        else:
+            _update(job_id, status="failed", error=e.description)
+    except Exception as e:
+        logging.exception(f"Round upload job {job_id} failed")
+        _update(job_id, status="failed", error=str(e))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
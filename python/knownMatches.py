@@ -0,0 +1,74 @@
+"""Menge der gespeicherten match_ids im Prozess für die Duplikat-Vorprüfung beim Import.
+
+Die meisten Uploads sind Wiederholungen bereits gespeicherter Matches. Mit der Match ID aus
+Match_Info kann ein Duplikat abgelehnt werden, bevor extract_data läuft und eine Verbindung
+aus dem Pool geholt wird. Die Menge wird beim ersten Aufruf aus Matches geladen und nach
+jedem Commit eines Imports ergänzt.
+
+Die Menge ist exakt (kein Bloom-Filter), ein Treffer ist also immer ein echtes Duplikat.
+Matches, die ein anderer Prozess gespeichert hat, fehlen hier; für sie bleibt die Prüfung
+in save_match / save_matches zuständig, die das Ergebnis ebenfalls einträgt.
+"""
+import logging
+import threading
+import time
+
+from metrics import Gauge
+
+# Nach einem fehlgeschlagenen Laden wird so lange nicht erneut geladen
+RETRY_SECONDS = 30
+
+_known = set()
+_loaded = False
+_retry_at = 0.0
+_lookups = {"hit": 0, "miss": 0}
+_lock = threading.Lock()
+_load_lock = threading.Lock()
+
+def is_known(match_id: str | None, load) -> bool:
+    """Gibt True zurück, wenn das Match sicher schon gespeichert ist.
+
+    Args:
+        match_id (str | None): Match ID aus Match_Info bzw. match_data.
+        load: Funktion ohne Argumente, die alle gespeicherten match_ids liefert oder bei einem
+            Fehler None zurückgibt. Wird nur beim ersten Aufruf (bzw. nach einem Fehler) verwendet.
+    """
+    if not match_id:
+        return False
+    if not _loaded:
+        _load(load)
+    with _lock:
+        known = match_id in _known
+        _lookups["hit" if known else "miss"] += 1
+    return known
+
+def _load(load) -> None:
+    global _loaded, _retry_at
+    with _load_lock:
+        if _loaded or time.monotonic() < _retry_at:
+            return
+        start = time.perf_counter()
+        match_ids = load()
+        if match_ids is None:
+            _retry_at = time.monotonic() + RETRY_SECONDS
+            return
+        with _lock:
+            # remember_matches kann währenddessen schon eingetragen haben
+            _known.update(match_ids)
+            _loaded = True
+            size = len(_known)
+        logging.info(f"Loaded {size} known match IDs in {time.perf_counter() - start:.2f}s")
+
+def remember_matches(match_ids) -> None:
+    """Trägt gespeicherte Matches ein (nach dem Commit eines Imports aufrufen)."""
+    with _lock:
+        _known.update(match_id for match_id in match_ids if match_id)
+
+def stats() -> dict:
+    """Größe der Menge und Treffer / Fehlschläge der Vorprüfung."""
+    with _lock:
+        return {"size": len(_known), "loaded": _loaded, **_lookups}
+
+Gauge("r6_known_matches", "Match IDs in the duplicate pre-check set", lambda: stats()["size"])
+Gauge("r6_duplicate_precheck_lookups", "Duplicate pre-checks by result (since start)",
+      lambda: {"hit": stats()["hit"], "miss": stats()["miss"]}, label="result")
@@ -0,0 +1,47 @@
+"""Strukturierte Log-Ausgabe.
+
+Felder, die per logging.info(..., extra={...}) übergeben werden, erscheinen als eigene
+Schlüssel: im Format "json" als ein JSON-Objekt pro Zeile, im Format "text" als key=value.
+"""
+import json
+import logging
+from datetime import datetime, timezone
+
+# Attribute, die jeder LogRecord hat; alles andere stammt aus extra
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class StructuredFormatter(logging.Formatter):
+    """Formatter, der die extra-Felder eines LogRecords mit ausgibt.
+
+    Args:
+        json_output (bool): Eine JSON-Zeile pro Eintrag statt Text mit key=value.
+    """
+
+    def __init__(self, json_output: bool = False):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        self.json_output = json_output
+
+    def fields(self, record: logging.LogRecord) -> dict:
+        return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not self.json_output:
+            text = super().format(record)
+            extra = " ".join(f"{key}={value}" for key, value in self.fields(record).items())
+            return f"{text} {extra}" if extra else text
+        entry = {"time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+                 "level": record.levelname,
+                 "logger": record.name,
+                 "message": record.getMessage(),
+                 **self.fields(record)}
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level: int, log_format: str = "text") -> None:
+    """Richtet den Root-Logger mit dem StructuredFormatter ein ("text" oder "json")."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter(json_output=log_format == "json"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
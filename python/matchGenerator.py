@@ -0,0 +1,207 @@
+"""Deterministischer Generator für Match-JSON im Format von r6-dissect.
+
+Erzeugt rounds (mit teams, players, matchFeedback, stats), die Match-Statistiken und
+Match_Info wie parseMatch. Gleicher Seed und gleiche Parameter ergeben immer dasselbe Match,
+damit Benchmarks und Vergleiche zwischen Backends reproduzierbar sind.
+
+Beispiel:
+    python matchGenerator.py --seed 1 --rounds 9 --overtime 3 > match.json
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from mapFunctions import mapMappingDict
+
+ATTACKERS = ["Sledge", "Thatcher", "Ash", "Thermite", "Twitch", "Montagne", "Glaz", "Fuze",
+             "Blitz", "IQ", "Buck", "Blackbeard", "Capitao", "Hibana", "Jackal", "Ying",
+             "Zofia", "Dokkaebi", "Lion", "Finka", "Maverick", "Nomad", "Gridlock", "Nokk",
+             "Amaru", "Kali", "Iana", "Ace", "Zero", "Flores", "Osa", "Sens", "Grim", "Brava",
+             "Ram", "Deimos", "Striker"]
+DEFENDERS = ["Smoke", "Mute", "Castle", "Pulse", "Doc", "Rook", "Kapkan", "Tachanka", "Jager",
+             "Bandit", "Frost", "Valkyrie", "Caveira", "Echo", "Mira", "Lesion", "Ela",
+             "Vigil", "Maestro", "Alibi", "Clash", "Kaid", "Mozzie", "Warden", "Goyo", "Wamai",
+             "Oryx", "Melusi", "Aruni", "Thunderbird", "Thorn", "Azami", "Solis", "Fenrir",
+             "Tubarao", "Sentry", "Skopos"]
+SITES = ["1F Bar, 1F Stock Room", "2F CCTV, 2F Cash Room", "B Church, B Arsenal Room",
+         "2F Bedroom, 2F Gym"]
+
+PREP_SECONDS = 45
+ROUND_SECONDS = 180
+PLANT_SECONDS = 45
+
+def clock(seconds: int) -> str:
+    return f"{seconds // 60}:{seconds % 60:02}"
+
+def feedback(name: str, username: str, seconds: int, **fields) -> dict:
+    return {"type": {"name": name}, "time": clock(seconds), "timeInSeconds": seconds,
+            "username": username, **fields}
+
+def generate_match(seed: int = 0, rounds: int = 9, overtime: int = 0, events_per_round: int | None = None,
+                   swaps_per_round: int = 2, incomplete_rounds: int = 0, half_length: int = 3) -> dict:
+    """Erzeugt ein Match im Format von parseMatch.
+
+    Args:
+        seed (int): Startwert des Zufallsgenerators, bestimmt Spieler, Match-ID und Verlauf.
+        rounds (int): Anzahl der regulären Runden.
+        overtime (int): Anzahl zusätzlicher Overtime-Runden (Seitenwechsel jede Runde).
+        events_per_round (int | None): Höchstens so viele Kill/Death-Events pro Runde,
+            None = bis ein Team ausgelöscht ist oder die Zeit abläuft.
+        swaps_per_round (int): Höchstens so viele OperatorSwap-Events in der Vorbereitung.
+        incomplete_rounds (int): Unvollständige Runden am Ende, die correct_data entfernt.
+        half_length (int): Runden bis zum Seitenwechsel in der regulären Spielzeit.
+
+    Returns:
+        dict: Match-Daten mit rounds, stats und Match_Info.
+    """
+    rng = random.Random(seed)
+    profile_ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(10)]
+    usernames = [f"Player{seed}_{index}" for index in range(10)]
+    teams = [list(range(5)), list(range(5, 10))]
+    map_id = rng.choice(list(mapMappingDict))
+    match_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    started = datetime(2025, 1, 1, 18, 0, 0) + timedelta(days=seed % 365, minutes=rng.randrange(300))
+
+    score = [0, 0]
+    totals = {index: {"kills": 0, "deaths": 0, "headshots": 0} for index in range(10)}
+    round_list = []
+    for number in range(rounds + overtime + incomplete_rounds):
+        if number < rounds:
+            atk = (number // half_length) % 2
+        else:
+            atk = (number - rounds) % 2
+        incomplete = number >= rounds + overtime
+
+        players = []
+        for team_index, members in enumerate(teams):
+            pool = ATTACKERS if team_index == atk else DEFENDERS
+            operators = rng.sample(pool, len(members))
+            for index, operator in zip(members, operators):
+                players.append({"id": rng.getrandbits(63),
+                                "profileID": profile_ids[index],
+                                "username": usernames[index],
+                                "teamIndex": team_index,
+                                "operator": {"name": operator, "id": rng.getrandbits(40)},
+                                "heroName": rng.getrandbits(40),
+                                "alliance": team_index,
+                                "spawn": rng.choice(SITES).split(",")[0] if team_index == atk else ""})
+
+        events = []
+        for swap in range(rng.randint(0, swaps_per_round)):
+            index = rng.randrange(10)
+            pool = ATTACKERS if index in teams[atk] else DEFENDERS
+            events.append(feedback("OperatorSwap", usernames[index], PREP_SECONDS - 5 - 3 * swap,
+                                   operator={"name": rng.choice(pool)}))
+
+        alive = [list(teams[0]), list(teams[1])]
+        round_stats = {index: {"kills": 0, "died": False, "headshots": 0} for index in range(10)}
+        remaining, planted, defused, fights = ROUND_SECONDS - rng.randint(3, 25), False, False, 0
+        while alive[0] and alive[1] and (events_per_round is None or fights < events_per_round):
+            if not planted and remaining < ROUND_SECONDS - 60 and rng.random() < 0.12:
+                events.append(feedback("DefuserPlantComplete", usernames[rng.choice(alive[atk])], remaining))
+                planted, remaining = True, PLANT_SECONDS
+            remaining -= rng.choice([1, 2, 2, 3, 4, 5, 6, 8, 10, 15, 25])
+            if remaining < 0:
+                break
+            fights += 1
+            if rng.random() < 0.05:
+                # Tod ohne Gegner (Fallschaden, eigene Gadgets)
+                side = rng.randrange(2)
+                victim = alive[side].pop(rng.randrange(len(alive[side])))
+                round_stats[victim]["died"] = True
+                events.append(feedback("Death", usernames[victim], remaining))
+                continue
+            side = rng.randrange(2)
+            killer = rng.choice(alive[side])
+            victim = alive[1 - side].pop(rng.randrange(len(alive[1 - side])))
+            headshot = rng.random() < 0.45
+            round_stats[killer]["kills"] += 1
+            round_stats[killer]["headshots"] += int(headshot)
+            round_stats[victim]["died"] = True
+            events.append(feedback("Kill", usernames[killer], remaining, target=usernames[victim],
+                                   headshot=headshot))
+        if planted and alive[1 - atk] and rng.random() < 0.35:
+            events.append(feedback("DefuserDisableComplete", usernames[rng.choice(alive[1 - atk])],
+                                   max(remaining - 1, 0)))
+            defused = True
+
+        if planted:
+            winner, condition = (1 - atk, "DisabledDefuser") if defused else (atk, "DefusedBomb")
+        elif not alive[1 - atk]:
+            winner, condition = atk, "KilledOpponents"
+        elif not alive[atk]:
+            winner, condition = 1 - atk, "KilledOpponents"
+        else:
+            winner, condition = 1 - atk, "Time"
+        if not incomplete:
+            score[winner] += 1
+            for index, stats in round_stats.items():
+                totals[index]["kills"] += stats["kills"]
+                totals[index]["deaths"] += int(stats["died"])
+                totals[index]["headshots"] += stats["headshots"]
+
+        stats_list = [{"username": usernames[index],
+                       "kills": stats["kills"],
+                       "died": stats["died"],
+                       "assists": 0,
+                       "headshots": stats["headshots"],
+                       "headshotPercentage": round(100 * stats["headshots"] / stats["kills"], 2) if stats["kills"] else 0}
+                      for index, stats in round_stats.items()]
+        round_list.append({
+            "gameVersion": "Y10S2",
+            "codeVersion": 9876543,
+            "timestamp": (started + timedelta(minutes=4 * number)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "matchType": {"name": "Ranked", "id": 8},
+            "map": {"name": mapMappingDict[map_id], "id": int(map_id)},
+            "site": rng.choice(SITES),
+            "recordingPlayerID": rng.getrandbits(63),
+            "gamemode": {"name": "Bomb", "id": 327933806},
+            "roundsPerMatch": rounds,
+            "roundsPerMatchOvertime": overtime,
+            "roundNumber": number,
+            "overtimeRoundNumber": max(number - rounds + 1, 0),
+            "teams": [{"name": "YOUR TEAM" if team_index == 0 else "OPPONENTS",
+                       "score": score[team_index],
+                       "won": team_index == winner,
+                       "winCondition": condition if team_index == winner else None,
+                       "role": "Attack" if team_index == atk else "Defense"}
+                      for team_index in range(2)],
+            "players": players,
+            "matchFeedback": events,
+            # Unvollständige Runden haben weniger Statistiken und werden von correct_data entfernt
+            "stats": stats_list[:5] if incomplete else stats_list,
+        })
+
+    played = rounds + overtime
+    return {
+        "rounds": round_list,
+        "stats": [{"username": usernames[index],
+                   "rounds": played,
+                   "kills": totals[index]["kills"],
+                   "deaths": totals[index]["deaths"],
+                   "assists": rng.randint(0, played // 2),
+                   "headshots": totals[index]["headshots"],
+                   "headshotPercentage": round(100 * totals[index]["headshots"] / totals[index]["kills"], 2)
+                   if totals[index]["kills"] else 0}
+                  for index in range(10)],
+        "Match_Info": {"Match ID": match_id,
+                       "Recording Player": (usernames[0], profile_ids[0]),
+                       "Timestamp": f"{started:%Y-%m-%d %H:%M:%S} +0000",
+                       "Game Mode": "Bomb",
+                       "Match Type": "Ranked",
+                       "Version": "Y10S2"},
+    }
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Erzeugt ein synthetisches r6-dissect Match als JSON.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=9)
+    parser.add_argument("--overtime", type=int, default=0)
+    parser.add_argument("--events", type=int, default=None, help="max. Kill/Death-Events pro Runde")
+    parser.add_argument("--incomplete", type=int, default=0, help="unvollständige Runden am Ende")
+    args = parser.parse_args()
+    print(json.dumps(generate_match(args.seed, args.rounds, args.overtime, args.events,
+                                    incomplete_rounds=args.incomplete), indent=4))
@@ -0,0 +1,159 @@
+"""Laufzeit-Metriken im Prometheus-Textformat.
+
+Histogramme für Requests, Auth, die Schritte von extract_data, die Schreib-Regionen von
+write_match und die Wartezeit auf Datenbankverbindungen. Gauges werden beim Abruf von
+/metrics über Callbacks gelesen (z.B. Trefferquote des Token-Caches).
+"""
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+# Sekunden, von Cache-Treffern bis zu langen Parser-Läufen
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Histogram:
+    """Histogramm mit festen Buckets und optionalen Labels.
+
+    Args:
+        name (str): Metrikname (mit Einheit, z.B. ..._seconds).
+        documentation (str): Text für die HELP-Zeile.
+        labels (tuple): Namen der Labels, die observe() als Keyword-Argumente erwartet.
+        buckets (tuple): Obere Grenzen der Buckets in aufsteigender Reihenfolge.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # Label-Werte -> [Bucket-Zähler..., Summe]
+        self._lock = threading.Lock()
+        register(self)
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Misst die Dauer des with-Blocks (auch wenn er mit einer Exception endet)."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket_labels = _label_text(self.labels, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {values[-1]}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {cumulative}")
+        return lines
+
+class Gauge:
+    """Wert, der erst beim Abruf über eine Funktion gelesen wird.
+
+    Args:
+        read: Funktion ohne Argumente, die eine Zahl oder ein Dict {Label-Wert: Zahl} liefert.
+        label (str | None): Name des Labels, wenn read ein Dict liefert.
+    """
+
+    def __init__(self, name: str, documentation: str, read, label: str | None = None):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.label = label
+        register(self)
+
+    def render(self) -> list[str]:
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        if isinstance(value, dict):
+            for label_value, number in sorted(value.items()):
+                lines.append(f"{self.name}{_label_text((self.label,), (label_value,))} {_number(number)}")
+        else:
+            lines.append(f"{self.name} {_number(value)}")
+        return lines
+
+class Stopwatch:
+    """Misst aufeinanderfolgende Abschnitte, z.B. die Regionen von write_match.
+
+    enter() schließt den vorherigen Abschnitt ab und gibt den neuen Namen zurück,
+    damit er wie bisher für Fehlermeldungen in einer Variable stehen kann.
+    """
+
+    def __init__(self, histogram: Histogram, label: str):
+        self.histogram = histogram
+        self.label = label
+        self._current = None
+        self._start = 0.0
+
+    def enter(self, name: str) -> str:
+        self.stop()
+        self._current = name
+        self._start = perf_counter()
+        return name
+
+    def stop(self) -> None:
+        if self._current is not None:
+            self.histogram.observe(perf_counter() - self._start, **{self.label: self._current})
+            self._current = None
+
+def register(metric) -> None:
+    with _registry_lock:
+        _registry.append(metric)
+
+def render_metrics() -> str:
+    """Alle registrierten Metriken im Prometheus-Textformat (Version 0.0.4)."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+REQUEST_DURATION = Histogram("r6_request_duration_seconds", "HTTP request duration",
+                             ("method", "endpoint", "status"))
+AUTH_DURATION = Histogram("r6_auth_duration_seconds", "Token check in authenticate, including cache lookup")
+AUTH_REQUEST_DURATION = Histogram("r6_auth_request_duration_seconds", "Requests to the auth server (cache misses)")
+EXTRACT_DURATION = Histogram("r6_extract_duration_seconds", "Duration of each extract_data step", ("step",))
+PARSE_DURATION = Histogram("r6_parse_duration_seconds", "r6-dissect parsing of an uploaded match")
+DB_WRITE_DURATION = Histogram("r6_db_write_duration_seconds", "Duration of each table write region in save_match",
+                              ("region",))
+POOL_WAIT_DURATION = Histogram("r6_db_pool_wait_seconds", "Wait for a pooled database connection")
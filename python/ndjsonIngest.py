@@ -0,0 +1,137 @@
+"""Streaming-Import vieler Matches als NDJSON (eine r6-dissect Match-JSON pro Zeile).
+
+Der Request-Body wird in Blöcken gelesen, optional mit gzip oder zstd dekomprimiert und
+zeilenweise dekodiert. Jedes Match wird einzeln extrahiert und in Chunks mit save_matches
+gespeichert, sodass nie der ganze Batch im Speicher liegt.
+"""
+import json
+import zlib
+
+from extractData import extract_data
+from db_functions import save_matches, validate_match_data, known_duplicate
+from rawArchive import encode_document
+from vars import NDJSON_CHUNK_SIZE, NDJSON_MAX_LINE_MB
+
+READ_SIZE = 64 * 1024
+
+class UnsupportedEncoding(Exception):
+    """Die Kompression des Bodys wird nicht unterstützt."""
+
+def decompressor(encoding: str | None):
+    """Gibt den Dekompressor für die Content-Encoding zurück (None = unkomprimiert).
+
+    Returns:
+        zlib-decompressobj für gzip/deflate, zstandard.ZstdDecompressor für zstd.
+    """
+    encoding = (encoding or "identity").lower()
+    if encoding == "identity":
+        return None
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        # 32 + MAX_WBITS erkennt gzip- und zlib-Header automatisch
+        return zlib.decompressobj(32 + zlib.MAX_WBITS)
+    if encoding == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise UnsupportedEncoding("zstd requires the zstandard package")
+        return zstandard.ZstdDecompressor()
+    raise UnsupportedEncoding(f"Unsupported Content-Encoding: {encoding}")
+
+def iter_blocks(stream, encoding: str | None = None):
+    """Liest einen (komprimierten) Stream und gibt ihn dekomprimiert in Blöcken von höchstens READ_SIZE Bytes zurück.
+
+    Die Ausgabe des Dekompressors ist begrenzt, ein stark komprimierter Block wird also nicht
+    auf einmal entpackt.
+    """
+    decoder = decompressor(encoding)
+    if decoder is None:
+        while block := stream.read(READ_SIZE):
+            yield block
+    elif hasattr(decoder, "unconsumed_tail"):
+        while data := stream.read(READ_SIZE):
+            while data:
+                block = decoder.decompress(data, READ_SIZE)
+                if block:
+                    yield block
+                data = decoder.unconsumed_tail
+        if block := decoder.flush():
+            yield block
+    else:
+        reader = decoder.stream_reader(stream, read_size=READ_SIZE, read_across_frames=True)
+        while block := reader.read(READ_SIZE):
+            yield block
+
+def iter_lines(stream, encoding: str | None = None, max_line_bytes: int = int(NDJSON_MAX_LINE_MB * 1024 * 1024)):
+    """Liest einen (komprimierten) Stream blockweise und gibt die Zeilen als bytes zurück.
+
+    Zeilen über max_line_bytes werden als ValueError an ihrer Stelle zurückgegeben.
+    """
+    buffer = bytearray()  # angefangene Zeile
+    skipping = False  # Rest einer zu langen Zeile überspringen
+    for block in iter_blocks(stream, encoding):
+        newline = block.rfind(b"\n")
+        if newline < 0:
+            if not skipping:
+                buffer += block
+            if len(buffer) > max_line_bytes:
+                yield ValueError(f"Line exceeds {max_line_bytes} bytes")
+                skipping = True
+                buffer = bytearray()
+            continue
+        buffer += block[:newline]
+        lines = bytes(buffer).split(b"\n")
+        buffer = bytearray(block[newline + 1:])
+        for line in lines:
+            if skipping:
+                skipping = False
+                continue
+            yield line if len(line) <= max_line_bytes else ValueError(f"Line exceeds {max_line_bytes} bytes")
+    if buffer and not skipping:
+        # letzte Zeile ohne abschließenden Zeilenumbruch
+        yield bytes(buffer) if len(buffer) <= max_line_bytes else ValueError(f"Line exceeds {max_line_bytes} bytes")
+
+def ingest_ndjson(stream, team_id: int, encoding: str | None = None, chunk_size: int = NDJSON_CHUNK_SIZE):
+    """Importiert alle Matches eines NDJSON-Streams.
+
+    Yields:
+        dict: Pro nichtleerer Zeile {"line", "match_id", "status", "error"} mit
+            status "inserted", "duplicate" oder "failed". Ein fehlerhaftes Match bricht
+            den Batch nicht ab.
+    """
+    chunk = []  # (line_number, extracted data, raw document for RawMatch)
+
+    def flush():
+        results = save_matches([(data, team_id, raw) for _, data, raw in chunk])
+        for (line_number, data, _), status in zip(chunk, results):
+            yield {"line": line_number,
+                   "match_id": data["match_data"].get("match_id"),
+                   "status": status,
+                   "error": None if status != "failed" else "Database error"}
+        chunk.clear()
+
+    for line_number, line in enumerate(iter_lines(stream, encoding), start=1):
+        if isinstance(line, ValueError):
+            yield {"line": line_number, "match_id": None, "status": "failed", "error": str(line)}
+            continue
+        if not line.strip():
+            continue
+        match_id = None
+        try:
+            document = json.loads(line)
+            match_id = document.get("Match_Info", {}).get("Match ID")
+            if known_duplicate(match_id):
+                yield {"line": line_number, "match_id": match_id, "status": "duplicate", "error": None}
+                continue
+            raw = encode_document(document)
+            data = extract_data(document)
+            error = validate_match_data(data)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        if error:
+            yield {"line": line_number, "match_id": match_id, "status": "failed", "error": error}
+            continue
+        chunk.append((line_number, data, raw))
+        if len(chunk) >= chunk_size:
+            yield from flush()
+    if chunk:
+        yield from flush()
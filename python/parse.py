@@ -1,37 +1,150 @@
 # This example prints operators from a replay.
 
 import json
+import logging
+import os
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 import re
 
-r6_dissect_path = Path(__file__).parent.parent / "parser_win" / "r6-dissect.exe"
+from parseCache import ParseCache
+from streamDecode import decode, MATCH_FIELDS, ROUND_FIELDS, MATCH_FIELDS_VERSION, FIELD_SET_KEY
 
-def parseRound(input_path):
+# Pfad zu r6-dissect, z.B. ein Stub-Parser für Tests unter Linux
+r6_dissect_path = Path(os.environ.get("R6_DISSECT_PATH", Path(__file__).parent.parent / "parser_win" / "r6-dissect.exe"))
+# Timeout pro r6-dissect Aufruf in Sekunden (None = kein Timeout)
+PARSE_TIMEOUT = float(os.environ["R6_DISSECT_TIMEOUT"]) if os.environ.get("R6_DISSECT_TIMEOUT") else None
+# Nur die von extractData genutzten Felder der Ausgabe behalten (R6_DISSECT_PRUNE=0 = vollständige Ausgabe)
+PRUNE_OUTPUT = os.environ.get("R6_DISSECT_PRUNE", "1") != "0"
+# Cache der Parser-Ausgabe (None = deaktiviert, siehe parseCache.py)
+parse_cache = ParseCache.from_env()
+
+def runDissect(args: list, timeout: float | None = PARSE_TIMEOUT, executable=None) -> subprocess.CompletedProcess | None:
+    """Startet r6-dissect mit den Argumenten. Gibt None zurück, wenn der Timeout überschritten wird."""
+    try:
+        return subprocess.run([executable or r6_dissect_path, *args], capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        logging.error(f"r6-dissect {' '.join(args)} nach {timeout}s abgebrochen")
+        return None
+
+def runDissectJson(args: list, fields: dict | None, timeout: float | None = PARSE_TIMEOUT, executable=None) -> dict | None:
+    """Startet r6-dissect und dekodiert stdout schon beim Lesen (siehe streamDecode.py).
+
+    Args:
+        fields (dict | None): Zu behaltende Felder (MATCH_FIELDS / ROUND_FIELDS), None = alles.
+
+    Returns:
+        dict | None: Das dekodierte JSON, None bei Timeout, Fehlercode oder ungültiger Ausgabe.
+    """
+    process = subprocess.Popen([executable or r6_dissect_path, *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # stderr parallel lesen, damit r6-dissect nicht an einer vollen Pipe hängen bleibt
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    reader.start()
+    timed_out = threading.Event()
+
+    def expire():
+        timed_out.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, expire) if timeout is not None else None
+    if timer is not None:
+        timer.start()
+    killed = False
+    try:
+        document, error = decode(process.stdout, fields), None
+    except ValueError as e:
+        document, error = None, e
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            # Ausgabe ist ohnehin unbrauchbar, nicht auf das Ende warten
+            process.kill()
+            killed = True
+    finally:
+        if timer is not None:
+            timer.cancel()
+        process.stdout.close()
+    returncode = process.wait()
+    reader.join()
+
+    if timed_out.is_set():
+        logging.error(f"r6-dissect {' '.join(args)} nach {timeout}s abgebrochen")
+        return None
+    if returncode != 0 and not killed:
+        logging.error(f"r6-dissect {' '.join(args)} fehlgeschlagen: {b''.join(stderr).decode(errors='replace')}")
+        return None
+    if error is not None:
+        logging.error(f"Ungültige Ausgabe von r6-dissect {' '.join(args)}: {error}")
+        return None
+    return document
+
+def cachedParse(kind: str, input_path, executable, parse):
+    """Gibt das Ergebnis aus dem Parse-Cache zurück oder ruft parse() auf und speichert es."""
+    if parse_cache is None:
+        return parse()
+    if not PRUNE_OUTPUT and kind != "info":
+        # Gekürzte und vollständige Ausgabe getrennt cachen
+        kind = f"{kind}-full"
+    try:
+        key = parse_cache.key(kind, input_path, executable or r6_dissect_path)
+    except OSError as e:
+        logging.warning(f"Parse-Cache nicht verfügbar: {e}")
+        return parse()
+    result = parse_cache.get(key)
+    if result is not None and not (isinstance(result, dict) and "Match_Info" in result and result["Match_Info"] is None):
+        # Ältere Einträge ohne Match-Info werden neu geparst
+        return result
+    result = parse()
+    if result is not None:
+        try:
+            parse_cache.put(key, result)
+        except OSError as e:
+            logging.warning(f"Parse-Cache konnte nicht geschrieben werden: {e}")
+    return result
+
+def parseRound(input_path, timeout: float | None = PARSE_TIMEOUT, executable=None):
     """Gibt JSON direkt zur Konsole aus (wie r6-dissect ohne -o Parameter)"""
-    output = subprocess.run([r6_dissect_path, str(input_path)], capture_output=True, text=True)
-    if output.returncode == 0:
-        # JSON String parsen und als Python Dictionary zurückgeben
-        return json.loads(output.stdout)
-    else:
-        print(f"Fehler: {output.stderr}")
+    return cachedParse("round", input_path, executable, lambda: dissectRound(input_path, timeout, executable))
+
+def dissectRound(input_path, timeout: float | None = PARSE_TIMEOUT, executable=None):
+    return runDissectJson([str(input_path)], ROUND_FIELDS if PRUNE_OUTPUT else None, timeout, executable)
+
+def parseMatch(input_path, timeout: float | None = PARSE_TIMEOUT, executable=None):
+    """Gibt Match JSON direkt zur Konsole aus
+
+    Match-Info (--info) und kompletter Dump laufen als zwei parallele r6-dissect Prozesse.
+    Vom Dump werden nur die Felder aus streamDecode.MATCH_FIELDS behalten (siehe PRUNE_OUTPUT).
+    """
+    return cachedParse("match", input_path, executable, lambda: dissectMatch(input_path, timeout, executable))
+
+def dissectMatch(input_path, timeout: float | None = PARSE_TIMEOUT, executable=None):
+    with ThreadPoolExecutor(max_workers=1) as info_executor:
+        match_info_future = info_executor.submit(dissectMatchInfo, input_path, timeout, executable)
+        match_data = runDissectJson([str(input_path)], MATCH_FIELDS if PRUNE_OUTPUT else None, timeout, executable)
+        match_info = match_info_future.result()
+    if match_data is None:
         return None
-    
-def parseMatch(input_path):
-    """Gibt Match JSON direkt zur Konsole aus"""
-    match_info = parseMatchInfo(input_path)
-    output = subprocess.run([r6_dissect_path, str(input_path)], capture_output=True, text=True)
-    if output.returncode == 0:
-        match_data = json.loads(output.stdout)
-        match_data["Match_Info"] = match_info
-        return match_data
-    else:
-        print(f"Fehler: {output.stderr}")
+    if match_info is None:
+        # Ohne Match-Info ist das Ergebnis unbrauchbar und darf nicht in den Parse-Cache
+        logging.error(f"r6-dissect --info {input_path} fehlgeschlagen, Match wird verworfen")
         return None
-    
-def parseMatchInfo(input_path):
+    match_data["Match_Info"] = match_info
+    if PRUNE_OUTPUT:
+        # Für RawMatch: das Dokument enthält nur die Felder dieser Version von MATCH_FIELDS
+        match_data[FIELD_SET_KEY] = MATCH_FIELDS_VERSION
+    return match_data
+
+def parseMatchInfo(input_path, timeout: float | None = PARSE_TIMEOUT, executable=None):
     """Gibt Match-Info als Dictionary zurück"""
-    output = subprocess.run([r6_dissect_path, "--info", str(input_path)], capture_output=True, text=True)
+    return cachedParse("info", input_path, executable, lambda: dissectMatchInfo(input_path, timeout, executable))
+
+def dissectMatchInfo(input_path, timeout: float | None = PARSE_TIMEOUT, executable=None):
+    output = runDissect(["--info", str(input_path)], timeout, executable)
+    if output is None:
+        return None
     if output.returncode == 0:
         info = {}
         lines = output.stderr.strip().split('\n')
@@ -56,13 +169,50 @@ def parseMatchInfo(input_path):
                     elif key == "Timestamp":
                         # Pattern: "YYYY-MM-DD HH:MM:SS +ZZZZ"
                         value = " ".join(value.split()[:-1])
-                        
+
                     info[key] = value
         return info
     else:
-        print(f"Fehler: {output.stderr}")
+        logging.error(f"r6-dissect --info {input_path} fehlgeschlagen: {output.stderr}")
         return None
 
+def parseMatches(matchfolders, workers: int | None = None, timeout: float | None = PARSE_TIMEOUT, executable=None):
+    """Parst mehrere Match-Ordner parallel.
+
+    Es laufen höchstens `workers` Matches gleichzeitig (je zwei r6-dissect Prozesse),
+    neue Ordner werden erst gestartet, wenn ein Match fertig ist.
+
+    Args:
+        matchfolders: Iterable von Match-Ordnern.
+        workers (int | None): Anzahl paralleler Matches, Standard ist die Anzahl der CPU-Kerne.
+        timeout (float | None): Timeout pro r6-dissect Prozess in Sekunden.
+        executable: Pfad zu r6-dissect, Standard ist r6_dissect_path.
+
+    Yields:
+        tuple[str, dict | None, str | None]: Ordner, Match-Daten und Fehlermeldung, sobald ein Match fertig ist.
+    """
+    workers = workers or os.cpu_count() or 1
+    folders = iter(matchfolders)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        while True:
+            # Nachschub bis zur maximalen Anzahl laufender Matches
+            for matchfolder in folders:
+                running[executor.submit(parseMatch, matchfolder, timeout, executable)] = matchfolder
+                if len(running) >= workers:
+                    break
+            if not running:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                matchfolder = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    yield str(matchfolder), None, str(e)
+                    continue
+                yield str(matchfolder), result, None if result is not None else "r6-dissect failed"
+
 if __name__ == "__main__":
     # path: ../replays/
     replay_dir = Path(__file__).parent.parent / "replays"
@@ -79,11 +229,13 @@ if __name__ == "__main__":
     # 		print(parseRound(round))
     # 		break
 
-    for matchfolder in matches:
-        result = parseMatch(str(matchfolder))
+    workers = int(os.environ["PARSE_WORKERS"]) if os.environ.get("PARSE_WORKERS") else None
+    for matchfolder, result, error in parseMatches(matches, workers=workers):
+        if error:
+            print(f"Fehler in {matchfolder}: {error}")
 
         # save in folder json with matchname
         path = "json"
-        match_name = matchfolder.split("\\")[-1].split(".")[0]
+        match_name = Path(matchfolder).name.split(".")[0]
         with open(f"{path}/{match_name}.json", "w") as f:
-            json.dump(result, f, indent=4)
\ No newline at end of file
+            json.dump(result, f, indent=4)
@@ -0,0 +1,155 @@
+"""Inhaltsadressierter Cache für die Ausgabe von r6-dissect.
+
+Der Schlüssel ist ein Hash über die .rec Dateien (Name und Inhalt), die Art des Aufrufs
+(match, round, info) und die Version des Parsers. Gespeichert wird das Ergebnis von
+parseMatch / parseRound / parseMatchInfo als gzip-komprimiertes JSON. Wird die maximale
+Größe überschritten, werden die am längsten nicht genutzten Einträge gelöscht.
+
+Die Gesamtgröße wird im Speicher mitgezählt, das Verzeichnis wird nur beim ersten Schreiben,
+beim Überschreiten der Grenze und alle SWEEP_SECONDS durchsucht (andere Prozesse schreiben in
+dasselbe Verzeichnis). Verdrängt wird bis auf EVICT_TO der Grenze, damit nicht jeder weitere
+Eintrag wieder eine Suche auslöst.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+CHUNK_SIZE = 1024 * 1024
+SWEEP_SECONDS = 300
+EVICT_TO = 0.9
+
+class ParseCache:
+    """Cache-Verzeichnis mit größenbasierter Verdrängung (least recently used).
+
+    Args:
+        directory: Verzeichnis der Cache-Dateien.
+        max_bytes (int): Maximale Gesamtgröße der komprimierten Einträge.
+    """
+
+    def __init__(self, directory, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._versions = {}  # (executable, mtime, size) -> hash
+        self._total = None  # Gesamtgröße seit der letzten Suche, None = noch nicht gesucht
+        self._swept_at = 0.0
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Cache aus PARSE_CACHE_DIR / PARSE_CACHE_MAX_MB, None wenn PARSE_CACHE=0 gesetzt ist."""
+        if os.environ.get("PARSE_CACHE", "1") == "0":
+            return None
+        directory = os.environ.get("PARSE_CACHE_DIR") or Path(__file__).parent.parent / "parse_cache"
+        max_bytes = int(float(os.environ.get("PARSE_CACHE_MAX_MB", 2048)) * 1024 * 1024)
+        return cls(directory, max_bytes)
+
+    def parser_version(self, executable) -> str:
+        """Hash der r6-dissect Binary, damit ein Parser-Update alte Einträge ungültig macht."""
+        if os.environ.get("R6_DISSECT_VERSION"):
+            return os.environ["R6_DISSECT_VERSION"]
+        stat = os.stat(executable)
+        version_key = (str(executable), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            version = self._versions.get(version_key)
+        if version is None:
+            version = _hash_file(executable, hashlib.sha256()).hexdigest()
+            with self._lock:
+                self._versions[version_key] = version
+        return version
+
+    def key(self, kind: str, input_path, executable) -> str:
+        """Schlüssel für einen Aufruf von r6-dissect auf einem Match-Ordner oder einer Runde."""
+        input_path = Path(input_path)
+        digest = hashlib.sha256()
+        digest.update(f"{kind}\0{self.parser_version(executable)}\0".encode())
+        if input_path.is_dir():
+            rec_files = sorted(p for p in input_path.iterdir() if p.suffix == ".rec")
+        else:
+            rec_files = [input_path]
+        for rec_file in rec_files:
+            digest.update(f"{rec_file.name}\0{rec_file.stat().st_size}\0".encode())
+            _hash_file(rec_file, digest)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json.gz"
+
+    def get(self, key: str):
+        """Gibt das gespeicherte Ergebnis zurück oder None."""
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                result = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Beschädigter Eintrag, z.B. nach Abbruch beim Schreiben
+            path.unlink(missing_ok=True)
+            return None
+        # Zugriffszeit für die Verdrängung aktualisieren
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        return result
+
+    def put(self, key: str, result) -> None:
+        """Speichert ein Ergebnis und verdrängt alte Einträge, falls der Cache zu groß ist."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(result, f)
+        size = tmp_path.stat().st_size
+        try:
+            size -= path.stat().st_size
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._total is not None:
+                self._total += size
+            due = (self._total is None or self._total > self.max_bytes
+                   or time.monotonic() - self._swept_at > SWEEP_SECONDS)
+        if due:
+            self.evict()
+
+    def evict(self) -> None:
+        """Durchsucht das Verzeichnis und löscht, wenn max_bytes überschritten ist, die am längsten
+        nicht genutzten Einträge, bis höchstens EVICT_TO * max_bytes übrig sind."""
+        if not self._evict_lock.acquire(blocking=False):
+            # Eine Suche läuft schon
+            return
+        try:
+            entries = []
+            total = 0
+            for path in self.directory.glob("*/*.json.gz"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            if total > self.max_bytes:
+                for _, size, path in sorted(entries):
+                    path.unlink(missing_ok=True)
+                    total -= size
+                    if total <= self.max_bytes * EVICT_TO:
+                        break
+            with self._lock:
+                self._total = total
+                self._swept_at = time.monotonic()
+        finally:
+            self._evict_lock.release()
+
+def _hash_file(path, digest):
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest
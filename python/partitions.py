@@ -0,0 +1,268 @@
+"""Monatliche Range-Partitionierung von Events und PlayerRound nach Match-Zeitpunkt.
+
+Beide Tabellen bekommen die Spalte match_timestamp (= Matches.timestamp) als Partitionsschlüssel,
+damit Abfragen mit Datumsfilter nur die betroffenen Monate lesen. Partitionen werden beim Start
+für die nächsten Monate angelegt. Fehlt der Monat eines Matches, legt db_functions.prepare_partitions
+ihn vor der Import-Transaktion in einer eigenen kurzen Transaktion an, damit die Sperre der
+Elterntabelle nicht bis zum Commit des Matches gehalten wird.
+
+Alte Partitionen können abgehängt oder gelöscht werden:
+    python partitions.py retain <Monate> [--drop]
+Matches, Rounds und PlayerMatch bleiben dabei erhalten, es fallen nur Events und PlayerRound weg.
+"""
+import logging
+import re
+import threading
+from datetime import date, datetime
+
+import psycopg2
+
+from vars import PARTITION_PREMAKE_MONTHS
+
+# Partitionierte Tabellen mit ihren Indizes (Name, Spalten)
+PARTITIONED_TABLES = {
+    "events": [("idx_events_round_id", "round_id"),
+               ("idx_events_player_id", "player_id"),
+               ("idx_events_target_player_id", "target_player_id")],
+    "playerround": [("idx_playerround_round_id", "round_id"),
+                    ("idx_playerround_player_id", "player_id")],
+}
+
+# Partitionsschlüssel für Matches ohne Zeitstempel
+NO_TIMESTAMP = "1970-01-01 00:00:00"
+
+PARTITION_NAME = re.compile(r"^(events|playerround)_p(\d{4})_(\d{2})$")
+
+# Advisory Lock, unter dem Partitionen angelegt werden
+PARTITION_LOCK = "partitions"
+
+# Monate, deren Partitionen dieser Prozess schon angelegt oder vorgefunden hat
+_ready_months = set()
+_ready_lock = threading.Lock()
+
+def month_start(timestamp) -> date:
+    """Monatsanfang eines Zeitpunkts (datetime, date oder String "YYYY-MM-DD ...")."""
+    if isinstance(timestamp, (datetime, date)):
+        return date(timestamp.year, timestamp.month, 1)
+    text = str(timestamp)
+    return date(int(text[0:4]), int(text[5:7]), 1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year:04}_{month.month:02}"
+
+def ensure_partition(cur, table: str, month: date) -> None:
+    """Legt die Partition eines Monats an, falls sie noch nicht existiert.
+
+    Das Anlegen sperrt die Elterntabelle (ACCESS EXCLUSIVE) bis zum Ende der Transaktion.
+    Deshalb nie in einer Import-Transaktion aufrufen, sondern über create_month_partitions
+    in einer eigenen kurzen Transaktion.
+    """
+    name = partition_name(table, month)
+    cur.execute("SELECT relispartition FROM pg_class WHERE oid = to_regclass(%s);", (name,))
+    row = cur.fetchone()
+    if row is not None:
+        if not row[0]:
+            # Von apply_retention abgehängt: Zeilen dieses Monats werden nicht mehr angenommen
+            logging.warning(f"Partition {name} is detached, rows for {month:%Y-%m} cannot be stored")
+        return
+    cur.execute(f"""CREATE TABLE IF NOT EXISTS {name}
+                    PARTITION OF {table}
+                    FOR VALUES FROM (%s) TO (%s);""", (month, add_months(month, 1)))
+
+def missing_months(timestamps) -> set[date]:
+    """Monate der Match-Zeitpunkte, für die dieser Prozess noch keine Partitionen kennt.
+
+    Eine Partition, die apply_retention nach dem Anlegen löscht, bleibt hier bis zum
+    Neustart als vorhanden vermerkt; Imports in diesen Monat schlagen dann am INSERT fehl.
+    """
+    months = {month_start(timestamp or NO_TIMESTAMP) for timestamp in timestamps}
+    with _ready_lock:
+        return months - _ready_months
+
+def create_month_partitions(cur, months) -> None:
+    """Legt die Partitionen der Monate an. Gleichzeitige Aufrufe (auch aus anderen Prozessen)
+    laufen über den Advisory Lock PARTITION_LOCK nacheinander."""
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (PARTITION_LOCK,))
+    for month in sorted(months):
+        for table in PARTITIONED_TABLES:
+            ensure_partition(cur, table, month)
+
+def mark_months_ready(months) -> None:
+    """Vermerkt die Monate als vorhanden (nach dem Commit von create_month_partitions aufrufen)."""
+    with _ready_lock:
+        _ready_months.update(months)
+
+def create_future_partitions(cur, months: int = PARTITION_PREMAKE_MONTHS, today: date | None = None) -> None:
+    """Legt die Partitionen vom aktuellen Monat bis `months` Monate in die Zukunft an."""
+    current = month_start(today or date.today())
+    create_month_partitions(cur, [add_months(current, offset) for offset in range(months + 1)])
+
+def is_partitioned(cur, table: str) -> bool:
+    cur.execute("""SELECT 1 FROM pg_partitioned_table pt
+                   INNER JOIN pg_class c ON c.oid = pt.partrelid
+                   WHERE c.relname = %s;""", (table,))
+    return cur.fetchone() is not None
+
+def partition_tables(cur) -> None:
+    """Migration: baut Events und PlayerRound als partitionierte Tabellen neu auf.
+
+    Die bestehenden Zeilen werden mit dem Zeitpunkt ihres Matches in die neuen Tabellen
+    kopiert, Zeilen ohne Runde oder Match mit NO_TIMESTAMP (es geht keine Zeile verloren). Der Primärschlüssel wird zu (id, match_timestamp), weil er den
+    Partitionsschlüssel enthalten muss.
+    """
+    for table in PARTITIONED_TABLES:
+        if is_partitioned(cur, table):
+            continue
+        old = f"{table}_unpartitioned"
+        cur.execute(f"ALTER TABLE {table} RENAME TO {old};")
+        cur.execute(f"ALTER SEQUENCE {table}_id_seq RENAME TO {old}_id_seq;")
+        cur.execute(f"ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey;")
+        for index, _ in PARTITIONED_TABLES[table]:
+            cur.execute(f"DROP INDEX IF EXISTS {index};")
+
+        cur.execute(PARTITIONED_TABLE_QUERIES[table])
+        cur.execute(f"""SELECT DISTINCT date_trunc('month', COALESCE(m.timestamp, %s))::date
+                        FROM {old} t
+                            LEFT JOIN Rounds r ON r.id = t.round_id
+                            LEFT JOIN Matches m ON m.match_id = r.match_id;""", (NO_TIMESTAMP,))
+        for (month,) in cur.fetchall():
+            ensure_partition(cur, table, month)
+
+        columns = PARTITIONED_TABLE_COLUMNS[table]
+        cur.execute(f"""INSERT INTO {table} ({columns}, match_timestamp)
+                        SELECT {", ".join(f"t.{column.strip()}" for column in columns.split(","))}, COALESCE(m.timestamp, %s)
+                        FROM {old} t
+                            LEFT JOIN Rounds r ON r.id = t.round_id
+                            LEFT JOIN Matches m ON m.match_id = r.match_id;""", (NO_TIMESTAMP,))
+        cur.execute(f"SELECT setval('{table}_id_seq', COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false);")
+        cur.execute(f"DROP TABLE {old};")
+
+        for index, column in PARTITIONED_TABLES[table]:
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({column});")
+    create_future_partitions(cur)
+
+PARTITIONED_TABLE_COLUMNS = {
+    "events": "id, round_id, player_id, target_player_id, type, phase, time_elapsed_seconds, "
+              "operator, refrag, got_refraged, headshot",
+    "playerround": "id, player_id, round_id, team_index, operator, spawn, kills, death, headshots, "
+                   "plant, defuse, kostpoint, onevx, ok, od, win, atk, refrags, got_refraged",
+}
+
+PARTITIONED_TABLE_QUERIES = {
+    "events": """CREATE TABLE Events (
+                     id SERIAL,
+                     round_id INTEGER,
+                     player_id INTEGER,
+                     target_player_id INTEGER,
+                     type VARCHAR(255),
+                     phase VARCHAR(255),
+                     time_elapsed_seconds INTEGER,
+                     operator VARCHAR(255),
+                     refrag BOOLEAN,
+                     got_refraged BOOLEAN,
+                     headshot BOOLEAN,
+                     match_timestamp TIMESTAMP NOT NULL,
+                     PRIMARY KEY (id, match_timestamp),
+                     FOREIGN KEY (round_id) REFERENCES Rounds(id),
+                     FOREIGN KEY (player_id) REFERENCES Player(id),
+                     FOREIGN KEY (target_player_id) REFERENCES Player(id)
+                 ) PARTITION BY RANGE (match_timestamp);""",
+    "playerround": """CREATE TABLE PlayerRound (
+                          id SERIAL,
+                          player_id INTEGER,
+                          round_id INTEGER,
+                          team_index INTEGER,
+                          operator VARCHAR(255),
+                          spawn VARCHAR(255),
+                          kills INTEGER,
+                          death BOOLEAN,
+                          headshots INTEGER,
+                          plant BOOLEAN,
+                          defuse BOOLEAN,
+                          kostpoint BOOLEAN,
+                          oneVx INTEGER,
+                          ok BOOLEAN,
+                          od BOOLEAN,
+                          win BOOLEAN,
+                          atk BOOLEAN,
+                          refrags INTEGER,
+                          got_refraged BOOLEAN,
+                          match_timestamp TIMESTAMP NOT NULL,
+                          PRIMARY KEY (id, match_timestamp),
+                          FOREIGN KEY (player_id) REFERENCES Player(id),
+                          FOREIGN KEY (round_id) REFERENCES Rounds(id)
+                      ) PARTITION BY RANGE (match_timestamp);""",
+}
+
+def list_partitions(cur, attached: bool = True) -> list[tuple[str, str, date]]:
+    """Monatspartitionen als (Tabelle, Partition, Monatsanfang), älteste zuerst.
+
+    Mit attached=False werden stattdessen die von apply_retention abgehängten Tabellen geliefert.
+    """
+    cur.execute("""SELECT c.relname
+                   FROM pg_class c
+                   WHERE c.relkind = 'r' AND c.relispartition = %s
+                       AND c.relname ~ '^(events|playerround)_p[0-9]{4}_[0-9]{2}$';""", (attached,))
+    partitions = []
+    for (name,) in cur.fetchall():
+        match = PARTITION_NAME.match(name)
+        partitions.append((match.group(1), name, date(int(match.group(2)), int(match.group(3)), 1)))
+    return sorted(partitions, key=lambda partition: (partition[2], partition[0]))
+
+def apply_retention(con, keep_months: int, drop: bool = False, today: date | None = None) -> list[str]:
+    """Hängt Partitionen ab, die komplett älter als `keep_months` Monate sind.
+
+    Läuft im Autocommit, weil DETACH PARTITION ... CONCURRENTLY keine laufenden Abfragen
+    blockiert, aber nicht in einer Transaktion erlaubt ist. Abgehängte Tabellen bleiben
+    als eigenständige Tabellen erhalten, mit drop=True werden sie gelöscht.
+
+    Args:
+        con: Verbindung (wird für die Dauer auf Autocommit gestellt).
+        keep_months (int): Anzahl der Monate vor dem aktuellen, die erhalten bleiben.
+        drop (bool): Abgehängte Partitionen löschen.
+
+    Returns:
+        list[str]: Namen der abgehängten (bzw. gelöschten) Partitionen.
+    """
+    cutoff = add_months(month_start(today or date.today()), -keep_months)
+    detached = []
+    autocommit = con.autocommit
+    con.autocommit = True
+    try:
+        with con.cursor() as cur:
+            if drop:
+                # Früher abgehängte Tabellen ebenfalls löschen
+                for _, name, month in list_partitions(cur, attached=False):
+                    if month < cutoff:
+                        cur.execute(f"DROP TABLE {name};")
+                        detached.append(name)
+            for table, name, month in list_partitions(cur):
+                if month >= cutoff:
+                    continue
+                try:
+                    cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name} CONCURRENTLY;")
+                except psycopg2.Error as e:
+                    logging.error(f"Could not detach partition {name}: {e}")
+                    continue
+                if drop:
+                    cur.execute(f"DROP TABLE {name};")
+                detached.append(name)
+    finally:
+        con.autocommit = autocommit
+    return detached
+
+if __name__ == "__main__":
+    import sys
+    from db_functions import get_connection
+
+    # Aufruf: python partitions.py retain <Monate> [--drop]
+    if len(sys.argv) < 3 or sys.argv[1] != "retain":
+        print("Aufruf: python partitions.py retain <Monate> [--drop]")
+        sys.exit(2)
+    with get_connection() as con:
+        names = apply_retention(con, int(sys.argv[2]), drop="--drop" in sys.argv)
+    print(f"{'Dropped' if '--drop' in sys.argv else 'Detached'} {len(names)} partitions: {', '.join(names) or '-'}")
@@ -0,0 +1,147 @@
+"""Karriere-Statistiken pro Spieler und Team (Tabelle PlayerCareer).
+
+Die Tabelle wird von save_match in derselben Transaktion wie das Match inkrementell
+erhöht, damit Übersichten nicht bei jeder Anfrage über alle PlayerMatch-Zeilen
+aggregieren müssen. Bestehende Daten können mit `python playerCareer.py` neu aufgebaut werden.
+"""
+from psycopg2.extras import execute_values
+
+# Zählerspalten von PlayerCareer (außer dem Schlüssel team_id, ubisoft_id)
+CAREER_COLUMNS = ("matches", "won_matches", "lost_matches", "rounds", "kills", "deaths",
+                  "headshots", "assists", "kost_rounds", "oks", "oks_atk", "ods", "ods_atk",
+                  "refrags", "got_refraged", "won_rounds", "lost_rounds", "won_atk_rounds",
+                  "lost_atk_rounds", "won_def_rounds", "lost_def_rounds")
+
+CREATE_PLAYER_CAREER_TABLE = f"""CREATE TABLE IF NOT EXISTS PlayerCareer (
+                                 team_id INTEGER NOT NULL,
+                                 ubisoft_id VARCHAR(255) NOT NULL,
+                                 {", ".join(f"{column} INTEGER NOT NULL DEFAULT 0" for column in CAREER_COLUMNS)},
+                                 PRIMARY KEY (team_id, ubisoft_id)
+                             );"""
+
+def career_rows(data: dict, team_id: int) -> list[tuple]:
+    """Beitrag eines extrahierten Matches zu PlayerCareer, eine Zeile pro Spieler (Tabellen als records.py-Datensätze)."""
+    kost_rounds = {}
+    for round_dict in data["player_rounds_data"]:
+        for ubisoft_id, stats in round_dict.items():
+            kost_rounds[ubisoft_id] = kost_rounds.get(ubisoft_id, 0) + (1 if stats.kost else 0)
+
+    rows = []
+    for ubisoft_id, dic in data["player_match_data"].items():
+        rows.append((
+            team_id,
+            ubisoft_id,
+            1,
+            1 if dic.win_match is True else 0,
+            1 if dic.win_match is False else 0,
+            (dic.won_rounds or 0) + (dic.lost_rounds or 0),
+            (dic.kills or 0),
+            (dic.deaths or 0),
+            (dic.headshots or 0),
+            dic.assists or 0,
+            kost_rounds.get(ubisoft_id, 0),
+            (dic.oks or 0),
+            (dic.oks_atk or 0),
+            (dic.ods or 0),
+            (dic.ods_atk or 0),
+            (dic.refrags or 0),
+            (dic.got_refraged or 0),
+            (dic.won_rounds or 0),
+            (dic.lost_rounds or 0),
+            (dic.atk_won_rounds or 0),
+            (dic.atk_lost_rounds or 0),
+            (dic.def_won_rounds or 0),
+            (dic.def_lost_rounds or 0)
+        ))
+    return rows
+
+def upsert_player_career(cur, data: dict, team_id: int) -> None:
+    """Addiert die Statistiken eines Matches auf PlayerCareer (im Cursor des Aufrufers)."""
+    add_player_career(cur, career_rows(data, team_id))
+
+def add_player_career(cur, rows: list[tuple]) -> None:
+    """Addiert Zeilen (team_id, ubisoft_id, *CAREER_COLUMNS) auf PlayerCareer, Werte dürfen negativ sein."""
+    if not rows:
+        return
+    # Sortiert nach dem Konfliktschlüssel, damit gleichzeitige Imports in derselben Reihenfolge sperren
+    rows = sorted(rows, key=lambda row: (row[0], row[1] or ""))
+    execute_values(cur, f"""
+        INSERT INTO PlayerCareer (team_id, ubisoft_id, {", ".join(CAREER_COLUMNS)})
+        VALUES %s
+        ON CONFLICT (team_id, ubisoft_id) DO UPDATE SET
+            {", ".join(f"{column} = PlayerCareer.{column} + EXCLUDED.{column}" for column in CAREER_COLUMNS)};
+    """, rows, page_size=len(rows))
+
+def rebuild_player_career(cur, team_id: int | None = None, ubisoft_ids: list[str] | None = None) -> int:
+    """Berechnet PlayerCareer aus PlayerMatch / PlayerRound neu.
+
+    Args:
+        team_id (int | None): Nur dieses Team neu aufbauen (None = alle Teams).
+        ubisoft_ids (list[str] | None): Nur diese Spieler neu aufbauen (None = alle Spieler).
+
+    Returns:
+        int: Anzahl der geschriebenen Zeilen.
+    """
+    conditions, kost_conditions = [], []
+    params = {"team_id": team_id, "ubisoft_ids": list(ubisoft_ids) if ubisoft_ids is not None else None}
+    if team_id is not None:
+        conditions.append("team_id = %(team_id)s")
+    if ubisoft_ids is not None:
+        conditions.append("ubisoft_id = ANY(%(ubisoft_ids)s)")
+        # KOST-Runden nur für diese Spieler zählen statt über ganz PlayerRound
+        kost_conditions.append("pr.player_id IN (SELECT id FROM Player WHERE ubisoft_id = ANY(%(ubisoft_ids)s))")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    kost_where = f"WHERE {' AND '.join(kost_conditions)}" if kost_conditions else ""
+
+    cur.execute(f"DELETE FROM PlayerCareer {where};", params)
+    cur.execute(f"""
+        INSERT INTO PlayerCareer (team_id, ubisoft_id, {", ".join(CAREER_COLUMNS)})
+        SELECT * FROM (
+            SELECT m.team_id AS team_id,
+                   p.ubisoft_id AS ubisoft_id,
+                   COUNT(*) AS matches,
+                   COUNT(*) FILTER (WHERE pm.win IS TRUE) AS won_matches,
+                   COUNT(*) FILTER (WHERE pm.win IS FALSE) AS lost_matches,
+                   COALESCE(SUM(pm.won_rounds + pm.lost_rounds), 0) AS rounds,
+                   COALESCE(SUM(pm.kills), 0) AS kills,
+                   COALESCE(SUM(pm.deaths), 0) AS deaths,
+                   COALESCE(SUM(pm.headshots), 0) AS headshots,
+                   COALESCE(SUM(pm.assists), 0) AS assists,
+                   COALESCE(SUM(kr.kost_rounds), 0) AS kost_rounds,
+                   COALESCE(SUM(pm.oks), 0) AS oks,
+                   COALESCE(SUM(pm.oks_atk), 0) AS oks_atk,
+                   COALESCE(SUM(pm.ods), 0) AS ods,
+                   COALESCE(SUM(pm.ods_atk), 0) AS ods_atk,
+                   COALESCE(SUM(pm.refrags), 0) AS refrags,
+                   COALESCE(SUM(pm.got_refraged), 0) AS got_refraged,
+                   COALESCE(SUM(pm.won_rounds), 0) AS won_rounds,
+                   COALESCE(SUM(pm.lost_rounds), 0) AS lost_rounds,
+                   COALESCE(SUM(pm.won_atk_rounds), 0) AS won_atk_rounds,
+                   COALESCE(SUM(pm.lost_atk_rounds), 0) AS lost_atk_rounds,
+                   COALESCE(SUM(pm.won_def_rounds), 0) AS won_def_rounds,
+                   COALESCE(SUM(pm.lost_def_rounds), 0) AS lost_def_rounds
+            FROM PlayerMatch pm
+                INNER JOIN Player p ON p.id = pm.player_id
+                INNER JOIN Matches m ON m.match_id = pm.match_id
+                LEFT JOIN (
+                    SELECT pr.player_id, r.match_id, COUNT(*) FILTER (WHERE pr.kostpoint) AS kost_rounds
+                    FROM PlayerRound pr
+                        INNER JOIN Rounds r ON r.id = pr.round_id
+                    {kost_where}
+                    GROUP BY pr.player_id, r.match_id
+                ) kr ON kr.player_id = pm.player_id AND kr.match_id = pm.match_id
+            GROUP BY m.team_id, p.ubisoft_id
+        ) career
+        {where};
+    """, params)
+    return cur.rowcount
+
+if __name__ == "__main__":
+    import sys
+    from db_functions import transaction
+
+    # Aufruf: python playerCareer.py [team_id]
+    team = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    with transaction() as cur:
+        count = rebuild_player_career(cur, team)
+    print(f"PlayerCareer rebuilt: {count} rows{f' for team {team}' if team is not None else ''}")
@@ -0,0 +1,127 @@
+"""Aktueller Name pro Spieler und Team (Tabelle PlayerIdentity) und Antwort-Cache für get_all_player.
+
+Player enthält eine Zeile pro (ubisoft_id, username, team_id). PlayerIdentity hält nur den
+neuesten Namen und wird von save_match in derselben Transaktion aktualisiert. Kommt dabei ein
+Spieler hinzu oder ändert sich ein Name, wird die Version des Teams in PlayerIdentityVersion
+erhöht. Die serialisierte Antwort von get_all_player wird pro Team mit ETag gecacht:
+- Imports in diesem Prozess verwerfen den Eintrag nach dem Commit (invalidate_players).
+- Änderungen aus anderen Prozessen (backfill.py, batchExtract.py, weitere API-Worker) werden
+  über die Version erkannt, die höchstens alle VERSION_CHECK_SECONDS gelesen wird.
+Dazwischen kommt die Antwort ohne Datenbankabfrage aus dem Speicher.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from psycopg2.extras import execute_values
+
+CREATE_PLAYER_IDENTITY_TABLE = """CREATE TABLE IF NOT EXISTS PlayerIdentity (
+                                    team_id INTEGER NOT NULL,
+                                    ubisoft_id VARCHAR(255) NOT NULL,
+                                    username VARCHAR(255),
+                                    timestamp TIMESTAMP,
+                                    PRIMARY KEY (team_id, ubisoft_id)
+                                );"""
+
+# Befüllt PlayerIdentity aus bereits vorhandenen Player-Zeilen
+FILL_PLAYER_IDENTITY = """INSERT INTO PlayerIdentity (team_id, ubisoft_id, username, timestamp)
+                          SELECT DISTINCT ON (team_id, ubisoft_id) team_id, ubisoft_id, username, timestamp
+                          FROM Player
+                          WHERE team_id IS NOT NULL AND ubisoft_id IS NOT NULL
+                          ORDER BY team_id, ubisoft_id, timestamp DESC NULLS LAST
+                          ON CONFLICT (team_id, ubisoft_id) DO NOTHING;"""
+
+# Zählt pro Team die Änderungen an der Spielerliste (neue Spieler, neue Namen)
+CREATE_PLAYER_IDENTITY_VERSION_TABLE = """CREATE TABLE IF NOT EXISTS PlayerIdentityVersion (
+                                            team_id INTEGER PRIMARY KEY,
+                                            version BIGINT NOT NULL
+                                        );"""
+
+# Version eines Teams für cached_players (0, solange das Team keine Zeile hat)
+PLAYER_IDENTITY_VERSION = """SELECT COALESCE(MAX(version), 0)
+                             FROM PlayerIdentityVersion
+                             WHERE team_id = %s;"""
+
+# Seit wann die gecachte Antwort ohne Blick auf die Version ausgeliefert wird
+VERSION_CHECK_SECONDS = 5
+
+def upsert_player_identity(cur, data: dict, team_id: int) -> None:
+    """Übernimmt die Namen eines Matches, wenn sie neuer sind als der gespeicherte Name.
+
+    Erhöht die Version des Teams, wenn dabei ein Spieler hinzukommt oder sich ein Name ändert.
+    Die Abfrage auf PlayerIdentity im Hauptteil sieht noch den Stand vor dem Upsert.
+    """
+    # Sortiert nach dem Konfliktschlüssel, siehe insert_players
+    rows = sorted(((team_id, player.get("ubisoft_id"), player.get("username"), player.get("timestamp"))
+                   for player in data["player_data"].values()), key=lambda row: row[1] or "")
+    if not rows:
+        return
+    changed = execute_values(cur, """
+        WITH incoming (team_id, ubisoft_id, username, timestamp) AS (VALUES %s),
+        upserted AS (
+            INSERT INTO PlayerIdentity (team_id, ubisoft_id, username, timestamp)
+            SELECT team_id, ubisoft_id, username, timestamp FROM incoming
+            ON CONFLICT (team_id, ubisoft_id) DO UPDATE SET
+                username = EXCLUDED.username,
+                timestamp = EXCLUDED.timestamp
+            WHERE PlayerIdentity.timestamp IS NULL OR EXCLUDED.timestamp >= PlayerIdentity.timestamp
+            RETURNING team_id, ubisoft_id, username
+        )
+        SELECT COUNT(*)
+        FROM upserted u
+            LEFT JOIN PlayerIdentity p ON p.team_id = u.team_id AND p.ubisoft_id = u.ubisoft_id
+        WHERE p.ubisoft_id IS NULL OR p.username IS DISTINCT FROM u.username;
+    """, rows, template="(%s::integer, %s, %s, %s::timestamp)", page_size=len(rows), fetch=True)[0][0]
+    if changed:
+        cur.execute("""INSERT INTO PlayerIdentityVersion (team_id, version) VALUES (%s, 1)
+                       ON CONFLICT (team_id) DO UPDATE SET version = PlayerIdentityVersion.version + 1;""",
+                    (team_id,))
+
+# team_id -> (Version, Zeitpunkt der letzten Prüfung, etag, body)
+_responses = {}
+# team_id -> Anzahl der Invalidierungen, damit eine laufende Abfrage keinen veralteten Stand cacht
+_generations = {}
+_lock = threading.Lock()
+
+def cached_players(team_id: int, load, version) -> tuple[str, bytes] | None:
+    """Gibt (etag, JSON-Body) für get_all_player zurück.
+
+    Args:
+        team_id (int): Team, dessen Spieler abgefragt werden.
+        load: Funktion ohne Argumente, die die Spielerliste lädt oder bei einem Fehler None zurückgibt.
+        version: Funktion ohne Argumente, die die Version des Teams (PLAYER_IDENTITY_VERSION)
+            liefert oder bei einem Fehler None zurückgibt. Wird höchstens alle VERSION_CHECK_SECONDS aufgerufen.
+
+    Returns:
+        tuple[str, bytes] | None: ETag und Body oder None, wenn load oder version fehlschlägt.
+    """
+    now = time.monotonic()
+    with _lock:
+        cached = _responses.get(team_id)
+        generation = _generations.get(team_id, 0)
+    if cached is not None and now - cached[1] < VERSION_CHECK_SECONDS:
+        return cached[2:]
+
+    current = version()
+    if current is None:
+        return None
+    if cached is not None and cached[0] == current:
+        cached = (current, now, *cached[2:])
+    else:
+        players = load()
+        if players is None:
+            return None
+        body = json.dumps({"players": players}, separators=(",", ":")).encode()
+        cached = (current, now, hashlib.sha1(body).hexdigest(), body)
+    with _lock:
+        if _generations.get(team_id, 0) == generation:
+            _responses[team_id] = cached
+    return cached[2:]
+
+def invalidate_players(team_ids) -> None:
+    """Verwirft die gecachten Antworten der Teams (nach dem Commit eines Imports aufrufen)."""
+    with _lock:
+        for team_id in set(team_ids):
+            _responses.pop(team_id, None)
+            _generations[team_id] = _generations.get(team_id, 0) + 1
@@ -0,0 +1,100 @@
+"""Archiv der r6-dissect Rohdaten pro Match (Tabelle RawMatch).
+
+Beim Import wird das Match-Dokument (wie von parseMatch, inkl. Match_Info) komprimiert
+gespeichert, zusammen mit der EXTRACTOR_VERSION, mit der die abgeleiteten Tabellen erzeugt
+wurden. backfill.py extrahiert Matches mit älterer Version neu, ohne die Replays erneut zu parsen.
+
+parseMatch liefert standardmäßig nur die Felder aus streamDecode.MATCH_FIELDS. Solche Dokumente
+tragen die Version der Feldauswahl (FIELD_SET_KEY), sie steht in RawMatch.field_set
+(NULL = vollständige Ausgabe von r6-dissect). Braucht eine neue Metrik ein Feld außerhalb der
+Auswahl, wird MATCH_FIELDS_VERSION erhöht und backfill.py lässt ältere gekürzte Archive aus;
+diese Matches müssen neu aus den Replays eingelesen werden (R6_DISSECT_PRUNE=0 archiviert alles).
+
+Kodierung: msgpack und zstd (beide in requirements.txt). Fehlt eines der Pakete, wird mit
+einer Warnung JSON bzw. gzip geschrieben. Die verwendete Kombination steht in
+RawMatch.encoding, so bleiben alle Einträge lesbar, solange die Pakete installiert sind.
+"""
+import gzip
+import json
+import logging
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+    logging.warning("msgpack is not installed, raw matches are archived as JSON")
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+    logging.warning("zstandard is not installed, raw matches are archived with gzip")
+
+from extractData import EXTRACTOR_VERSION
+from streamDecode import FIELD_SET_KEY
+
+CREATE_RAW_MATCH_TABLE = """CREATE TABLE IF NOT EXISTS RawMatch (
+                              match_id VARCHAR(255) PRIMARY KEY,
+                              team_id INTEGER,
+                              extractor_version INTEGER NOT NULL,
+                              encoding VARCHAR(32) NOT NULL,
+                              document BYTEA NOT NULL,
+                              stored_at TIMESTAMP NOT NULL DEFAULT now()
+                          );"""
+# Version der Feldauswahl des Dokuments, NULL = vollständig. Bestehende Einträge stammen aus
+# parseMatch mit der ersten Feldauswahl.
+ADD_RAW_MATCH_FIELD_SET = """ALTER TABLE RawMatch ADD COLUMN IF NOT EXISTS field_set INTEGER;
+                             UPDATE RawMatch SET field_set = 1 WHERE field_set IS NULL;"""
+# backfill.py sucht Matches mit veralteter Version in der Reihenfolge der match_id
+CREATE_RAW_MATCH_INDEX = """CREATE INDEX IF NOT EXISTS idx_rawmatch_extractor_version
+                            ON RawMatch (extractor_version, match_id);"""
+
+ZSTD_LEVEL = 9
+
+def encode_document(document: dict) -> tuple[str, bytes, int | None]:
+    """Serialisiert und komprimiert ein Match-Dokument.
+
+    Returns:
+        tuple[str, bytes, int | None]: encoding, komprimiertes Dokument und die Version der
+            Feldauswahl (None = vollständige Ausgabe von r6-dissect).
+    """
+    field_set = document.get(FIELD_SET_KEY)
+    if msgpack is not None:
+        serializer, payload = "msgpack", msgpack.packb(document)
+    else:
+        serializer, payload = "json", json.dumps(document, separators=(",", ":")).encode()
+    if zstandard is not None:
+        return f"{serializer}+zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload), field_set
+    return f"{serializer}+gzip", gzip.compress(payload, compresslevel=6), field_set
+
+def decode_document(encoding: str, blob: bytes) -> dict:
+    """Gegenstück zu encode_document.
+
+    Raises:
+        ValueError: Unbekannte Kodierung.
+        ImportError: Das Paket für die Kodierung ist nicht installiert.
+    """
+    serializer, _, compression = encoding.partition("+")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("Decoding zstd archives requires the zstandard package")
+        payload = zstandard.ZstdDecompressor().decompress(bytes(blob))
+    elif compression == "gzip":
+        payload = gzip.decompress(blob)
+    else:
+        raise ValueError(f"Unknown raw match encoding: {encoding}")
+    if serializer == "msgpack":
+        if msgpack is None:
+            raise ImportError("Decoding msgpack archives requires the msgpack package")
+        return msgpack.unpackb(payload)
+    if serializer == "json":
+        return json.loads(payload)
+    raise ValueError(f"Unknown raw match encoding: {encoding}")
+
+def store_raw_match(cur, match_id: str, team_id: int, raw: tuple[str, bytes, int | None],
+                    extractor_version: int = EXTRACTOR_VERSION) -> None:
+    """Speichert das kodierte Dokument (aus encode_document). Ein vorhandener Eintrag bleibt erhalten."""
+    encoding, blob, field_set = raw
+    cur.execute("""INSERT INTO RawMatch (match_id, team_id, extractor_version, encoding, document, field_set)
+                   VALUES (%s, %s, %s, %s, %s, %s)
+                   ON CONFLICT (match_id) DO NOTHING;""",
+                (match_id, team_id, extractor_version, encoding, blob, field_set))
@@ -0,0 +1,177 @@
+"""Kompakte Datensätze für die Ergebnisse von extract_data.
+
+Events, Runden, Spieler-Runden und Spieler-Matches werden als Dataclasses mit __slots__
+gespeichert statt als Dictionary pro Zeile. Das spart die Schlüssel und die Hash-Tabelle
+jedes Dictionaries, was beim Extrahieren ganzer Saisons in einem Prozess ins Gewicht fällt.
+
+Für bestehenden Code verhalten sich die Datensätze wie ein Dictionary (record["kills"],
+record.get("kills"), "kills" in record, dict(record), Vergleich mit dict). as_dict() liefert
+ein echtes Dictionary.
+
+Achtung: Datensätze sind keine dict-Instanzen. isinstance(record, dict) ist False und
+json.dumps kann das Ergebnis von extract_data nicht direkt serialisieren. Aufrufer, die ein
+reines Dictionary brauchen (JSON, isinstance-Prüfungen), wandeln es mit to_plain() um.
+"""
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+
+class Record(Mapping):
+    """Basisklasse: Dictionary-Sicht auf die Felder einer Slots-Dataclass.
+
+    ALIASES bildet zusätzliche Schlüssel auf Felder ab (z.B. "round.id" -> db_id).
+    Alias-Schlüssel erscheinen in der Sicht nur, wenn ihr Wert nicht None ist.
+    """
+    __slots__ = ()
+    ALIASES = {}
+
+    def __getitem__(self, key: str):
+        name = self.ALIASES.get(key, key)
+        if name not in self._field_set:
+            raise KeyError(key)
+        return getattr(self, name)
+
+    def __setitem__(self, key: str, value) -> None:
+        name = self.ALIASES.get(key, key)
+        if name not in self._field_set:
+            raise KeyError(f"{type(self).__name__} has no field {key!r}")
+        setattr(self, name, value)
+
+    def __iter__(self):
+        for name in self._keys:
+            yield name
+        for key, name in self.ALIASES.items():
+            if getattr(self, name) is not None:
+                yield key
+
+    def __contains__(self, key) -> bool:
+        # Wie __iter__: ein Alias gilt nur als vorhanden, wenn sein Wert nicht None ist
+        name = self.ALIASES.get(key)
+        if name is not None:
+            return getattr(self, name) is not None
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def as_dict(self) -> dict:
+        return {key: self[key] for key in self}
+
+    @classmethod
+    def from_mapping(cls, values: Mapping):
+        """Erzeugt einen Datensatz aus einem Dictionary, fehlende Felder werden wie bei dict.get None."""
+        if isinstance(values, cls):
+            return values
+        record = cls(**{name: values.get(name) for name in cls._keys})
+        for key, name in cls.ALIASES.items():
+            if key in values:
+                setattr(record, name, values[key])
+        return record
+
+def record(cls):
+    """Dekorator: macht aus der Klasse eine Slots-Dataclass mit Dictionary-Sicht."""
+    cls = dataclass(slots=True, eq=False)(cls)
+    names = tuple(field.name for field in fields(cls))
+    cls._field_set = frozenset(names)
+    # Felder, die nur über einen Alias erreichbar sind, nicht unter eigenem Namen zeigen
+    cls._keys = tuple(name for name in names if name not in cls.ALIASES.values())
+    return cls
+
+@record
+class EventRecord(Record):
+    round_number: int
+    player_ubisoft_id: str
+    target_player_ubisoft_id: str | None
+    type: str
+    phase: str
+    time_elapsed_seconds: int
+    refrag: bool
+    operator: str | None
+    was_refraged: bool = False
+    headshot: bool = False
+
+@record
+class RoundRecord(Record):
+    ALIASES = {"round.id": "db_id"}
+
+    match_id: str
+    round_number: int
+    site: str | None
+    winner_team_index: int
+    atk_team_index: int
+    def_team_index: int
+    time_to_entry: int | None
+    ok_team_index: int | None
+    ok_refrag: bool | None
+    clutch: bool
+    win_condition: str
+    db_id: int | None = None
+
+@record
+class PlayerRoundRecord(Record):
+    round: int
+    operator: str | None
+    spawn: str | None
+    win: bool
+    atk: bool
+    kills: int
+    death: bool
+    headshots: int
+    onevx: int | None
+    plant: bool
+    defuse: bool
+    ok: bool
+    od: bool
+    refrags: int
+    got_refraged: bool
+    kost: bool
+    team_index: int
+
+@record
+class PlayerMatchRecord(Record):
+    match_id: str
+    player_id: str
+    team_index: int
+    win_match: bool | None
+    rounds_played: int = 0
+    kills: int = 0
+    deaths: int = 0
+    headshots: int = 0
+    kost: float = 0
+    won_rounds: int = 0
+    lost_rounds: int = 0
+    atk_won_rounds: int = 0
+    atk_lost_rounds: int = 0
+    def_won_rounds: int = 0
+    def_lost_rounds: int = 0
+    oks: int = 0
+    oks_atk: int = 0
+    ods: int = 0
+    ods_atk: int = 0
+    refrags: int = 0
+    got_refraged: int = 0
+    username: str | None = None
+    assists: int | None = None
+
+def as_records(data: dict) -> dict:
+    """Wandelt die Tabellen eines extrahierten Matches (z.B. aus /upload_json) in Datensätze um.
+
+    Die Umwandlung passiert in data selbst, damit vom Aufrufer gesetzte IDs sichtbar bleiben.
+    Bereits umgewandelte Datensätze bleiben unverändert.
+    """
+    data["events_data"] = [EventRecord.from_mapping(event) for event in data["events_data"]]
+    data["rounds_data"] = [RoundRecord.from_mapping(round_data) for round_data in data["rounds_data"]]
+    data["player_rounds_data"] = [{uid: PlayerRoundRecord.from_mapping(stats) for uid, stats in round_dict.items()}
+                                  for round_dict in data["player_rounds_data"]]
+    data["player_match_data"] = {uid: PlayerMatchRecord.from_mapping(stats)
+                                 for uid, stats in data["player_match_data"].items()}
+    return data
+
+def to_plain(data: dict) -> dict:
+    """Gibt ein extrahiertes Match nur mit Dictionaries und Listen zurück (z.B. für JSON)."""
+    return {"match_data": dict(data["match_data"]),
+            "player_data": {uid: dict(player) for uid, player in data["player_data"].items()},
+            "rounds_data": [dict(round_data) for round_data in data["rounds_data"]],
+            "player_rounds_data": [{uid: dict(stats) for uid, stats in round_dict.items()}
+                                   for round_dict in data["player_rounds_data"]],
+            "player_match_data": {uid: dict(stats) for uid, stats in data["player_match_data"].items()},
+            "events_data": [dict(event) for event in data["events_data"]]}
@@ -0,0 +1,171 @@
+"""Anhängen einzelner Runden an ein laufendes Match (parseRound -> extract_round -> append_round).
+
+Während eines Scrims kann jede Runde einzeln hochgeladen werden. Die erste Runde legt das Match
+wie save_match an, jede weitere schreibt nur ihre eigenen Zeilen in Rounds, PlayerRound und Events.
+PlayerMatch, Matches und PlayerCareer werden um den Beitrag der Runde erhöht, statt das Match
+neu zu berechnen; nur der Match-Gewinner und die daraus folgenden win-Werte werden ersetzt.
+
+Runden müssen in ihrer Reihenfolge ankommen: eine bereits gespeicherte Runde ergibt 409, eine
+Runde nach einer Lücke 422. Refrags werden nur innerhalb der Runde erkannt. Per Runde angelegte
+Matches haben kein Rohdokument in RawMatch und werden von backfill.py nicht erfasst.
+"""
+import logging
+import time
+
+import flask as f
+import psycopg2
+from psycopg2.extras import execute_values
+
+from db_functions import (transaction, write_match, insert_players, insert_rounds, insert_player_rounds,
+                          insert_player_matches, insert_events, prepare_partitions, PoolTimeout)
+from playerCareer import CAREER_COLUMNS, add_player_career, career_rows
+from playerIdentity import upsert_player_identity, invalidate_players
+from knownMatches import remember_matches
+from partitions import NO_TIMESTAMP
+from records import as_records
+from metrics import DB_WRITE_DURATION, Stopwatch
+
+# Zähler in PlayerMatch (Spalte, Feld in PlayerMatchRecord), die pro Runde addiert werden.
+# Die Spaltennamen sind zugleich die Spalten von PlayerCareer.
+ROUND_COUNTERS = (("kills", "kills"), ("deaths", "deaths"), ("headshots", "headshots"),
+                  ("won_rounds", "won_rounds"), ("lost_rounds", "lost_rounds"),
+                  ("won_atk_rounds", "atk_won_rounds"), ("lost_atk_rounds", "atk_lost_rounds"),
+                  ("won_def_rounds", "def_won_rounds"), ("lost_def_rounds", "def_lost_rounds"),
+                  ("oks", "oks"), ("oks_atk", "oks_atk"), ("ods", "ods"), ("ods_atk", "ods_atk"),
+                  ("refrags", "refrags"), ("got_refraged", "got_refraged"))
+
+def save_round(data: dict, team_id: int) -> tuple[dict, int]:
+    """Speichert eine mit extract_round extrahierte Runde in einer Transaktion.
+
+    Returns:
+        tuple[dict, int]: {"match_id", "round"} und 201, wenn die Runde das Match angelegt hat, sonst 200.
+    """
+    match_id = data["match_data"]["match_id"]
+    # Für ein bestehendes Match hat schon Runde 1 die Partition seines Monats angelegt
+    prepare_partitions([data["match_data"].get("timestamp")])
+    try:
+        with transaction() as cur:
+            created = append_round(cur, data, team_id)
+            commit_start = time.perf_counter()
+        DB_WRITE_DURATION.observe(time.perf_counter() - commit_start, region="commit")
+    except (psycopg2.Error, PoolTimeout) as e:
+        logging.error(f"Database error during connect/commit: {e}")
+        f.abort(500, description="Internal Server Error")
+    invalidate_players([team_id])
+    remember_matches([match_id])
+    return {"match_id": match_id, "round": data["rounds_data"][0].round_number}, 201 if created else 200
+
+def append_round(cur, data: dict, team_id: int) -> bool:
+    """Hängt eine Runde an ihr Match an oder legt das Match mit Runde 1 an.
+
+    Bricht mit 409 ab, wenn die Runde schon gespeichert ist oder das Match einem anderen Team
+    gehört, und mit 422, wenn davor eine Runde fehlt. Gibt True zurück, wenn das Match neu ist.
+    """
+    as_records(data)
+    match_id = data["match_data"]["match_id"]
+    round_number = data["rounds_data"][0].round_number
+    regions = Stopwatch(DB_WRITE_DURATION, "region")
+    region = regions.enter("round append lock")
+    try:
+        # Runden desselben Matches nacheinander, auch solange das Match noch nicht existiert
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (match_id,))
+        cur.execute("SELECT team_id, timestamp FROM Matches WHERE match_id = %s;", (match_id,))
+        row = cur.fetchone()
+        if row is None:
+            if round_number != 1:
+                f.abort(422, description=f"Unprocessable Entity: Round 1 of match {match_id} has not been uploaded")
+            regions.stop()
+            write_match(cur, data, team_id)
+            return True
+        match_team_id, match_timestamp = row
+        if match_team_id != team_id:
+            f.abort(409, description="Conflict: Match belongs to another team.")
+        cur.execute("SELECT COUNT(*) FROM Rounds WHERE match_id = %s;", (match_id,))
+        stored_rounds = cur.fetchone()[0]
+        if round_number <= stored_rounds:
+            f.abort(409, description=f"Conflict: Round {round_number} already exists.")
+        if round_number > stored_rounds + 1:
+            f.abort(422, description=f"Unprocessable Entity: Round {stored_rounds + 1} has not been uploaded")
+
+        region = regions.enter("player insert/update")
+        insert_players(cur, data, team_id)
+        region = regions.enter("player identity update")
+        upsert_player_identity(cur, data, team_id)
+
+        region = regions.enter("round insert/update")
+        round_ids = insert_rounds(cur, data["rounds_data"])
+        region = regions.enter("playerRound insert/update")
+        # Partition des Matches, nicht der Zeitstempel aus der Info dieser Runde
+        match_timestamp = match_timestamp or NO_TIMESTAMP
+        insert_player_rounds(cur, data, round_ids, match_timestamp)
+        region = regions.enter("events insert/update")
+        insert_events(cur, data, round_ids, match_timestamp)
+
+        region = regions.enter("playerMatch update")
+        career = add_round_to_player_matches(cur, data, team_id)
+        region = regions.enter("match insert/update")
+        cur.execute("UPDATE Matches SET winner_team_index = %s WHERE match_id = %s;",
+                    (data["match_data"]["winner_team_index"], match_id))
+        region = regions.enter("playerCareer update")
+        add_player_career(cur, career)
+        return False
+    except psycopg2.Error as e:
+        logging.error(f"Database error during {region}: {e}")
+        f.abort(500, description="Internal Server Error")
+    finally:
+        regions.stop()
+
+def add_round_to_player_matches(cur, data: dict, team_id: int) -> list[tuple]:
+    """Addiert die Runde auf PlayerMatch und gibt die passenden Zeilen für add_player_career zurück.
+
+    Spieler, die zum ersten Mal im Match auftauchen, bekommen eine neue PlayerMatch-Zeile. Bei allen
+    Spielern des Matches wird win nach dem aktuellen Punktestand gesetzt, auch ohne Teilnahme an der Runde.
+    """
+    winner = data["match_data"]["winner_team_index"]
+    round_stats = data["player_rounds_data"][0]
+    cur.execute("""SELECT pm.id, p.ubisoft_id, pm.team_index, pm.win, pm.kost, pm.won_rounds + pm.lost_rounds
+                   FROM PlayerMatch pm
+                   INNER JOIN Player p ON p.id = pm.player_id
+                   WHERE pm.match_id = %s
+                   FOR UPDATE OF pm;""", (data["match_data"]["match_id"],))
+    stored = {ubisoft_id: (pm_id, team_index, win, kost, rounds)
+              for pm_id, ubisoft_id, team_index, win, kost, rounds in cur.fetchall()}
+
+    updates, career = [], []
+    for ubisoft_id, (pm_id, team_index, old_win, kost, rounds) in stored.items():
+        win = None if winner is None else winner == team_index
+        stats = data["player_match_data"].get(ubisoft_id)
+        delta = {column: 0 for column in CAREER_COLUMNS}
+        delta["won_matches"] = int(win is True) - int(old_win is True)
+        delta["lost_matches"] = int(win is False) - int(old_win is False)
+        if stats is not None:
+            # kost ist auf zwei Stellen gerundet, bei unter 100 Runden ergibt sich die Anzahl KOST-Runden exakt
+            kost_rounds = round((kost or 0) * (rounds or 0)) + int(round_stats[ubisoft_id].kost)
+            kost = round(kost_rounds / ((rounds or 0) + 1), 2)
+            for column, field in ROUND_COUNTERS:
+                delta[column] = getattr(stats, field) or 0
+            delta.update(rounds=1, assists=stats.assists or 0, kost_rounds=int(round_stats[ubisoft_id].kost))
+        updates.append((pm_id, win, kost, delta["assists"], *(delta[column] for column, _ in ROUND_COUNTERS)))
+        if any(delta.values()):
+            career.append((team_id, ubisoft_id, *(delta[column] for column in CAREER_COLUMNS)))
+
+    if updates:
+        counters = [column for column, _ in ROUND_COUNTERS]
+        execute_values(cur, f"""
+            UPDATE PlayerMatch pm SET
+                win = v.win,
+                kost = v.kost,
+                assists = COALESCE(pm.assists, 0) + v.assists,
+                {", ".join(f"{column} = pm.{column} + v.{column}" for column in counters)}
+            FROM (VALUES %s) AS v(id, win, kost, assists, {", ".join(counters)})
+            WHERE pm.id = v.id;
+        """, updates, template=f"(%s, %s::boolean, %s::float8, {', '.join(['%s::integer'] * (len(counters) + 1))})",
+            page_size=len(updates))
+
+    new_players = {ubisoft_id: stats for ubisoft_id, stats in data["player_match_data"].items()
+                   if ubisoft_id not in stored}
+    if new_players:
+        insert_player_matches(cur, data, new_players)
+        career += career_rows({"player_rounds_data": data["player_rounds_data"],
+                               "player_match_data": new_players}, team_id)
+    return career
@@ -0,0 +1,158 @@
+"""Streaming-Dekodierung der JSON-Ausgabe von r6-dissect mit Feldauswahl.
+
+r6-dissect gibt pro Runde u.a. Telemetrie jedes Spielers aus, die extractData nie liest.
+Statt stdout komplett als Text zu lesen und mit json.loads in einen vollständigen Baum
+umzuwandeln, wird der Stream beim Lesen dekodiert und nur die Felder aus MATCH_FIELDS /
+ROUND_FIELDS werden aufgebaut. Das Ergebnis hat dieselbe Struktur wie json.loads, nur ohne
+die übersprungenen Schlüssel.
+
+Mit ijson (requirements.txt) liegt nie die ganze Ausgabe im Speicher. Fehlt ijson, wird stdout
+als bytes gelesen und mit json.loads dekodiert, wobei jede Runde direkt nach dem Dekodieren
+gekürzt wird; Spitzenspeicher sind dann die ganze Ausgabe plus der Baum, es wird gewarnt.
+
+`python streamDecode.py [match.json]` prüft, dass beide Wege dasselbe Ergebnis liefern.
+"""
+import io
+import json
+import logging
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+    logging.warning("ijson is not installed, r6-dissect output is decoded with json.loads (higher peak memory)")
+
+# Schema: Schlüssel -> Schema des Werts, None = Wert vollständig übernehmen.
+# Listen sind transparent, das Schema gilt für ihre Elemente.
+ROUND_FIELDS = {
+    "players": None,
+    "teams": None,
+    "matchFeedback": None,
+    "map": None,
+    "site": None,
+    # correct_data erkennt unvollständige Runden an der Anzahl der Statistiken
+    "stats": None,
+    # Rundennummer (ab 0) für das Anhängen einzelner Runden (roundIngest.py)
+    "roundNumber": None,
+}
+MATCH_FIELDS = {
+    "rounds": ROUND_FIELDS,
+    "stats": None,
+}
+# Version von MATCH_FIELDS, bei jeder Erweiterung (auch in ROUND_FIELDS) erhöhen. parseMatch
+# schreibt sie in gekürzte Dokumente (FIELD_SET_KEY), RawMatch speichert sie, backfill.py
+# extrahiert nur Archive neu, die mindestens diese Felder enthalten.
+MATCH_FIELDS_VERSION = 1
+FIELD_SET_KEY = "_field_set"
+
+READ_SIZE = 64 * 1024
+
+def decode(stream, fields: dict | None) -> dict:
+    """Dekodiert ein JSON-Dokument aus einem binären Stream und behält nur die Felder aus fields.
+
+    Args:
+        stream: Binärer Stream mit read(), z.B. stdout eines subprocess.Popen.
+        fields (dict | None): MATCH_FIELDS für parseMatch, ROUND_FIELDS für parseRound,
+            None für das vollständige Dokument (dann immer mit json.loads).
+
+    Raises:
+        ValueError: Die Ausgabe ist kein (vollständiges) JSON.
+    """
+    if ijson is None or fields is None:
+        return _decode_buffered(stream, fields)
+    events = ijson.basic_parse(stream, buf_size=READ_SIZE, use_float=True)
+    try:
+        event, value = next(events)
+        document = _build(events, event, value, fields)
+        for _ in events:
+            # ijson meldet erst hier, wenn nach dem Dokument noch Daten folgen
+            pass
+    except StopIteration:
+        raise ValueError("r6-dissect returned no JSON")
+    except ijson.JSONError as e:
+        raise ValueError(f"Invalid JSON from r6-dissect: {e}") from e
+    return document
+
+def _build(events, event: str, value, schema: dict | None):
+    """Baut den Wert auf, der mit (event, value) beginnt, und überspringt Schlüssel außerhalb von schema."""
+    if event == "start_map":
+        result = {}
+        for event, value in events:
+            if event == "end_map":
+                return result
+            key = value
+            event, value = next(events)
+            if schema is None:
+                result[key] = _build(events, event, value, None)
+            elif key in schema:
+                result[key] = _build(events, event, value, schema[key])
+            elif event in ("start_map", "start_array"):
+                _skip(events)
+        raise ValueError("Incomplete JSON object")
+    if event == "start_array":
+        result = []
+        for event, value in events:
+            if event == "end_array":
+                return result
+            result.append(_build(events, event, value, schema))
+        raise ValueError("Incomplete JSON array")
+    return value
+
+def _skip(events) -> None:
+    """Überspringt ein Objekt oder eine Liste, deren start-Event schon gelesen wurde."""
+    depth = 1
+    for event, _ in events:
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+            if depth == 0:
+                return
+    raise ValueError("Incomplete JSON value")
+
+def _decode_buffered(stream, fields: dict | None) -> dict:
+    """Fallback ohne ijson: json.loads auf den bytes, Runden werden schon im object_hook gekürzt."""
+    raw = bytearray()
+    while block := stream.read(READ_SIZE):
+        raw += block
+    if fields is None:
+        return json.loads(raw)
+    round_fields = fields.get("rounds", fields)
+
+    def prune_round(obj: dict) -> dict:
+        # Runden sind die Objekte mit Teams und Spielern
+        if "teams" in obj and "players" in obj:
+            return _prune(obj, round_fields)
+        return obj
+
+    document = json.loads(raw, object_hook=prune_round)
+    return _prune(document, fields)
+
+def _prune(value, schema: dict | None):
+    """Entfernt aus einem fertig dekodierten Wert alle Schlüssel außerhalb von schema."""
+    if schema is None:
+        return value
+    if isinstance(value, dict):
+        return {key: _prune(item, schema[key]) for key, item in value.items() if key in schema}
+    if isinstance(value, list):
+        return [_prune(item, schema) for item in value]
+    return value
+
+if __name__ == "__main__":
+    import sys
+
+    if ijson is None:
+        sys.exit("ijson is not installed")
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            documents = [f.read()]
+    else:
+        from matchGenerator import generate_match
+        matches = [generate_match(seed) for seed in range(20)]
+        documents = [json.dumps(document).encode() for match in matches for document in (match, match["rounds"][0])]
+    for raw in documents:
+        # Match-Dokumente mit MATCH_FIELDS, einzelne Runden (parseRound) mit ROUND_FIELDS
+        fields = MATCH_FIELDS if b'"rounds"' in raw else ROUND_FIELDS
+        if decode(io.BytesIO(raw), fields) != _decode_buffered(io.BytesIO(raw), fields):
+            sys.exit("ijson and json.loads results differ")
+    print(f"ijson and json.loads agree on {len(documents)} documents")
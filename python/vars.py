@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -11,7 +12,45 @@ DB_LOGIN = f"""host={os.environ.get('DB_HOST')}
                 user={os.environ.get('DB_USER')}
                 password={os.environ.get('DB_PSWD')}"""
 
+# Connection Pool
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', 1))
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))  # seconds
+DB_POOL_HEALTHCHECK_INTERVAL = float(os.environ.get('DB_POOL_HEALTHCHECK_INTERVAL', 30))  # seconds
+# Schema-Migrationen beim Start der API ausführen
+DB_AUTO_MIGRATE = os.environ.get('DB_AUTO_MIGRATE', 'true').lower() in ('1', 'true', 'yes')
+# Anzahl der Monate, für die Events/PlayerRound-Partitionen im Voraus angelegt werden
+PARTITION_PREMAKE_MONTHS = int(os.environ.get('PARTITION_PREMAKE_MONTHS', 3))
+
+# Upload Jobs
+UPLOAD_DIR = os.environ.get('UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'r6_uploads'))
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 2))
+UPLOAD_MAX_MB = float(os.environ.get('UPLOAD_MAX_MB', 500))
+JOB_RETENTION = float(os.environ.get('JOB_RETENTION', 3600))  # seconds
+
+# /upload_json: "sync" speichert im Request, "batched" über den Batch-Writer
+UPLOAD_JSON_MODE = os.environ.get('UPLOAD_JSON_MODE', 'sync')
+WRITER_QUEUE_SIZE = int(os.environ.get('WRITER_QUEUE_SIZE', 1000))
+WRITER_BATCH_SIZE = int(os.environ.get('WRITER_BATCH_SIZE', 50))
+WRITER_LINGER_MS = float(os.environ.get('WRITER_LINGER_MS', 200))
+
+# /upload_ndjson
+NDJSON_CHUNK_SIZE = int(os.environ.get('NDJSON_CHUNK_SIZE', 20))  # Matches pro Transaktion
+NDJSON_MAX_LINE_MB = float(os.environ.get('NDJSON_MAX_LINE_MB', 100))
+# Eigene Obergrenze für den ganzen NDJSON-Body statt UPLOAD_MAX_MB (0 = unbegrenzt)
+NDJSON_MAX_MB = float(os.environ.get('NDJSON_MAX_MB', 51200))
+
+# Logging und /metrics
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')  # "text" oder "json"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # wenn gesetzt, verlangt /metrics "Authorization: Bearer <token>"
+
 REQUEST_URL = os.environ.get('AUTH_URL')
+# Auth Token Cache
+AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', 1024))
+AUTH_CACHE_TTL = float(os.environ.get('AUTH_CACHE_TTL', 300))  # seconds, capped by the JWT expiry
+AUTH_NEGATIVE_TTL = float(os.environ.get('AUTH_NEGATIVE_TTL', 10))  # seconds, tokens rejected by the auth server (0 = off)
+AUTH_TIMEOUT = float(os.environ.get('AUTH_TIMEOUT', 10))  # seconds
+AUTH_POOL_SIZE = int(os.environ.get('AUTH_POOL_SIZE', 10))
 BASE_PATH = os.environ.get('BASE_PATH')
 MODE = os.environ.get('MODE', 'production')
 PORT = os.environ.get('PORT', 5000)